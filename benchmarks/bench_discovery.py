@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Discovery Benchmark
+MeshCascadeDiscovery.track_metrics throughput and the audio chunking paths
+used for voice broadcasts
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import struct
+import sys
+import tempfile
+import time
+import wave
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_ingest import make_packets
+from meshtastic_cascade_discovery import MeshCascadeDiscovery
+
+
+def write_tone(path, seconds, sample_rate=8000, frequency=440):
+    """16-bit mono sine WAV like AudioGenerator.generate_tone writes"""
+    frames = b''.join(
+        struct.pack('<h', int(0.5 * 32767 * math.sin(2 * math.pi * frequency * i / sample_rate)))
+        for i in range(int(sample_rate * seconds))
+    )
+    with wave.open(path, 'wb') as wav_file:
+        wav_file.setnchannels(1)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(frames)
+
+
+def run_track_metrics(packet_count, node_count):
+    """Packets per second through track_metrics"""
+    discovery = MeshCascadeDiscovery(port=None)
+    packets = [(packet, packet['fromId']) for packet in make_packets(packet_count, node_count)]
+
+    start = time.perf_counter()
+    for packet, node_id in packets:
+        discovery.track_metrics(packet, node_id)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'packets': packet_count,
+        'seconds': elapsed,
+        'packets_per_second': packet_count / elapsed,
+        'series': discovery.timeseries.stats['series']
+    }
+
+
+def run_audio(seconds, iterations):
+    """Milliseconds to read, base64 encode and chunk a WAV file"""
+    discovery = MeshCascadeDiscovery(port=None)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'tone.wav')
+        write_tone(path, seconds)
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(iterations):
+                audio = discovery.prepare_audio_for_transmission(path)
+        elapsed = time.perf_counter() - start
+
+        result = {
+            'audio_duration': seconds,
+            'chunks': audio['metadata']['total_chunks'],
+            'prepare_ms': elapsed / iterations * 1000
+        }
+
+        # audio_generator needs numpy and gTTS at import time
+        try:
+            from audio_generator import AudioGenerator
+        except ImportError:
+            result['analyze_ms'] = None
+            return result
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(iterations):
+                AudioGenerator.analyze_audio_file(path)
+        result['analyze_ms'] = (time.perf_counter() - start) / iterations * 1000
+
+    return result
+
+
+def run(packet_count=50000, node_count=500, audio_seconds=30, iterations=20):
+    return {
+        'track_metrics': run_track_metrics(packet_count, node_count),
+        'audio': run_audio(audio_seconds, iterations)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--packets', type=int, default=50000)
+    parser.add_argument('--nodes', type=int, default=500)
+    parser.add_argument('--audio-seconds', type=float, default=30)
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = run(args.packets, args.nodes, args.audio_seconds, args.iterations)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    metrics = results['track_metrics']
+    audio = results['audio']
+    print(f"track_metrics: {metrics['packets_per_second']:.0f} pkts/s over {metrics['packets']} packets")
+    print(f"audio ({audio['audio_duration']:g}s, {audio['chunks']} chunks): prepare {audio['prepare_ms']:.2f} ms", end='')
+    if audio['analyze_ms'] is None:
+        print(", analyze skipped (numpy/gTTS not installed)")
+    else:
+        print(f", analyze {audio['analyze_ms']:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Export Benchmark
+Time and peak Python memory to stream export_data over a large in-memory
+message history through a real client session
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from bench_wire_protocol import make_node
+from meshtastic_server import ClientSession, MeshtasticServer
+
+# Per-packet and per-connection info logging would dominate the timings
+logging.disable(logging.INFO)
+
+
+class NullSocket:
+    """Accepts frames as fast as they come and counts the bytes"""
+
+    remote_address = ('benchmark', 0)
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    async def send(self, payload):
+        self.frames += 1
+        self.bytes += len(payload)
+
+
+def make_server(message_count, node_count):
+    """A server with message_count messages in memory and node_count nodes"""
+    server = MeshtasticServer(db_path=None, ws_port=0, history_size=message_count)
+    now = time.time()
+    for i in range(node_count):
+        node = make_node(i, now)
+        server.nodes[node.id] = node
+
+    start = datetime.now() - timedelta(seconds=message_count)
+    for i in range(message_count):
+        server.messages.append({
+            'from': f'Node {i % node_count}',
+            'from_id': f'!{i % node_count:08x}',
+            'text': f'Status report {i}: all stations nominal, battery good',
+            'timestamp': (start + timedelta(seconds=i)).isoformat()
+        })
+    return server
+
+
+async def export(server):
+    """Stream one unfiltered export and wait until the client has it all"""
+    socket = NullSocket()
+    session = ClientSession(socket, server.fanout_stats, max_queue=256, fragments=server.fragments)
+    session.start()
+    await server.stream_export(session, {})
+    while session.queue:
+        await asyncio.sleep(0)
+    session.close()
+    return socket
+
+
+def run(message_count=100000, node_count=1000):
+    """Export once for time, then again under tracemalloc for peak memory"""
+    server = make_server(message_count, node_count)
+
+    start = time.perf_counter()
+    socket = asyncio.run(export(server))
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    asyncio.run(export(server))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    server.cleanup()
+
+    return {
+        'messages': message_count,
+        'nodes': node_count,
+        'seconds': elapsed,
+        'records_per_second': (message_count + node_count) / elapsed,
+        'frames': socket.frames,
+        'bytes': socket.bytes,
+        'peak_memory_mb': peak / 1024 / 1024
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=100000)
+    parser.add_argument('--nodes', type=int, default=1000)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    result = run(args.messages, args.nodes)
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"{result['messages']} messages, {result['nodes']} nodes")
+    print(f"  {result['seconds']:.2f}s ({result['records_per_second']:.0f} records/s), "
+          f"{result['frames']} frames, {result['bytes'] / 1024 / 1024:.1f} MB")
+    print(f"  Peak traced memory: {result['peak_memory_mb']:.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Fan-out Benchmark
+broadcast_to_clients cost and delivery latency for batch_update frames
+with many in-process WebSocket clients connected over loopback
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import resource
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import websockets
+
+from bench_wire_protocol import make_node
+from meshtastic_server import MeshtasticServer
+
+# Per-packet and per-connection info logging would dominate the timings
+logging.disable(logging.INFO)
+
+
+def raise_file_limit(needed):
+    """Two sockets per client; lift the soft descriptor limit if it is too low"""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft < needed:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (min(needed, hard), hard))
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+
+async def run_clients(client_count, rounds=50, node_count=1000, per_frame=20):
+    """Publish rounds batch_update frames and time their arrival at every client"""
+    raise_file_limit(client_count * 2 + 256)
+
+    server = MeshtasticServer(db_path=None, ws_port=0, client_queue_size=1024)
+    now = time.time()
+    for i in range(node_count):
+        node = make_node(i, now)
+        server.nodes[node.id] = node
+
+    arrived = 0
+    round_done = asyncio.Event()
+
+    async def client(port, ready):
+        nonlocal arrived
+        async with websockets.connect(f'ws://127.0.0.1:{port}', max_size=None, compression=None) as ws:
+            await ws.recv()  # init snapshot
+            ready.set()
+            async for _ in ws:
+                arrived += 1
+                if arrived == client_count:
+                    round_done.set()
+
+    listener = await websockets.serve(server.handle_client, '127.0.0.1', 0, compression=None, max_size=None)
+    port = listener.sockets[0].getsockname()[1]
+
+    readies = [asyncio.Event() for _ in range(client_count)]
+    clients = [asyncio.create_task(client(port, ready)) for ready in readies]
+    for ready in readies:
+        await ready.wait()
+
+    nodes = list(server.nodes.values())
+    publish = []
+    delivery = []
+    for index in range(rounds):
+        frame = {
+            'type': 'batch_update',
+            'seq': index,
+            'nodes': nodes[index * per_frame % node_count:][:per_frame],
+            'messages': [],
+            'stats': server.stats
+        }
+        arrived = 0
+        round_done.clear()
+
+        start = time.perf_counter()
+        await server.broadcast_to_clients(frame)
+        publish.append(time.perf_counter() - start)
+        await round_done.wait()
+        delivery.append(time.perf_counter() - start)
+
+    for task in clients:
+        task.cancel()
+    await asyncio.gather(*clients, return_exceptions=True)
+    listener.close()
+    await listener.wait_closed()
+    server.cleanup()
+
+    return {
+        'clients': client_count,
+        'rounds': rounds,
+        'publish_us': statistics.mean(publish) * 1e6,
+        'delivery_p50_ms': percentile(delivery, 0.5) * 1000,
+        'delivery_p95_ms': percentile(delivery, 0.95) * 1000,
+        'delivery_max_ms': max(delivery) * 1000
+    }
+
+
+def run(client_counts=(1, 50, 500), rounds=50, node_count=1000, per_frame=20):
+    """One measurement per client count, each on a fresh server and loop"""
+    return {
+        str(count): asyncio.run(run_clients(count, rounds, node_count, per_frame))
+        for count in client_counts
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', default='1,50,500', help='comma-separated client counts')
+    parser.add_argument('--rounds', type=int, default=50, help='frames published per client count')
+    parser.add_argument('--nodes', type=int, default=1000)
+    parser.add_argument('--per-frame', type=int, default=20, help='nodes in each batch_update')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    counts = [int(count) for count in args.clients.split(',')]
+    results = run(counts, args.rounds, args.nodes, args.per_frame)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'clients':>8}{'publish us':>12}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for result in results.values():
+        print(f"{result['clients']:>8}{result['publish_us']:>12.1f}{result['delivery_p50_ms']:>10.2f}"
+              f"{result['delivery_p95_ms']:>10.2f}{result['delivery_max_ms']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
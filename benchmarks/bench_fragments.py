@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Node Fragment Cache Benchmark
+Times init snapshot and export encoding for a large, busy mesh with many
+clients connecting, with and without cached node fragments, for each
+JSON encoder
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import wire_protocol
+from bench_wire_protocol import make_node
+
+
+def client_encodings(clients):
+    """Encoding of each simulated client, split evenly across what is installed"""
+    return [wire_protocol.ENCODINGS[i % len(wire_protocol.ENCODINGS)] for i in range(clients)]
+
+
+def touch(nodes, rng, now, count, moved, fragments=None):
+    """Mimic a batch window of traffic: bump counters, move a few nodes"""
+    changed = rng.sample(nodes, count)
+    for node in changed:
+        node.heard(now)
+        node.snr = round(rng.uniform(-10, 10), 2)
+        if fragments:
+            fragments.invalidate(node.id)
+    for node in changed[:moved]:
+        node.set_position(node.latitude + 1e-5, node.longitude, node.altitude)
+    return changed
+
+
+def run(node_count=5000, clients=50, ticks=500, per_tick=20, moved=5, cached=True, seed=1):
+    """Milliseconds spent encoding init snapshots and an export"""
+    rng = random.Random(seed)
+    now = time.time()
+    nodes = [make_node(i, now) for i in range(node_count)]
+    stats = {'total_messages': 0, 'total_nodes': node_count, 'start_time': datetime.now().isoformat()}
+    fragments = wire_protocol.FragmentCache() if cached else None
+    encodings = client_encodings(clients)
+
+    # Clients connect one by one while traffic keeps changing nodes; each
+    # gets its own init frame
+    every = max(ticks // clients, 1)
+    snapshot = 0.0
+    for tick in range(ticks):
+        now += 0.1
+        touch(nodes, rng, now, per_tick, moved, fragments)
+        if tick % every == 0 and tick // every < clients:
+            frame = {'type': 'init', 'seq': tick, 'nodes': nodes, 'messages': [], 'stats': stats}
+            start = time.perf_counter()
+            wire_protocol.encode(frame, encodings[tick // every], fragments)
+            snapshot += time.perf_counter() - start
+
+    # NDJSON export of every node
+    start = time.perf_counter()
+    for node in nodes:
+        if fragments:
+            '{"kind":"node",' + fragments.fragment(node)[1:]
+        else:
+            wire_protocol.dumps({'kind': 'node', **node.to_dict()})
+    export = time.perf_counter() - start
+
+    result = {
+        'snapshot_ms': snapshot * 1000,
+        'export_ms': export * 1000
+    }
+    if fragments:
+        result['cache_hits'] = fragments.stats['hits']
+        result['cache_misses'] = fragments.stats['misses']
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=5000)
+    parser.add_argument('--clients', type=int, default=50)
+    parser.add_argument('--ticks', type=int, default=500, help='batch windows to simulate')
+    parser.add_argument('--per-tick', type=int, default=20, help='nodes changed per batch window')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = {}
+    for encoder in wire_protocol.JSON_ENCODERS:
+        wire_protocol.set_json_encoder(encoder)
+        for cached in (False, True):
+            name = f"{encoder}{'+cache' if cached else ''}"
+            results[name] = run(args.nodes, args.clients, args.ticks, args.per_tick, cached=cached)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    if 'orjson' not in wire_protocol.JSON_ENCODERS:
+        print("orjson not installed - only the stdlib encoder measured (pip install orjson)\n")
+
+    print(f"{args.nodes} nodes, {args.clients} clients ({', '.join(sorted(set(client_encodings(args.clients))))})\n")
+    print(f"{'variant':<16}{'snapshot ms':>14}{'export ms':>12}")
+    for name, result in results.items():
+        print(f"{name:<16}{result['snapshot_ms']:>14.1f}{result['export_ms']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Ingest Benchmark
+Packets per second through MeshtasticServer.on_receive, both processed
+inline and handed from a reader thread to the event loop consumer
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from mesh_simulator import SyntheticMesh
+from meshtastic_server import MeshtasticServer
+
+# Per-packet and per-connection info logging would dominate the timings
+logging.disable(logging.INFO)
+
+
+def make_packets(count, node_count=500, duplicates=0.2, seed=1):
+    """Synthetic packets with the default portnum mix and rebroadcast copies"""
+    mesh = SyntheticMesh(node_count=node_count, rate=0, duplicates=duplicates, seed=seed)
+    return [packet for _, (_, packet) in zip(range(count), mesh.packets())]
+
+
+def make_server():
+    """A server that is never started: no radio, no store, no listener"""
+    return MeshtasticServer(db_path=None, ws_port=0)
+
+
+def run_inline(packets):
+    """on_receive with no event loop running, so each packet is processed immediately"""
+    server = make_server()
+    start = time.perf_counter()
+    for packet in packets:
+        server.on_receive(packet)
+    elapsed = time.perf_counter() - start
+    server.cleanup()
+    return {
+        'packets': len(packets),
+        'seconds': elapsed,
+        'packets_per_second': len(packets) / elapsed,
+        'nodes': len(server.nodes)
+    }
+
+
+async def run_threaded(packets):
+    """A reader thread calls on_receive while the ingest consumer drains on the loop"""
+    server = make_server()
+    server.loop = asyncio.get_running_loop()
+    server.ingest_event = asyncio.Event()
+    server.ingest_task = asyncio.create_task(server.ingest_events())
+
+    def reader():
+        for packet in packets:
+            server.on_receive(packet)
+
+    start = time.perf_counter()
+    thread = threading.Thread(target=reader)
+    thread.start()
+    while server.ingest_stats['events_received'] < len(packets):
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    thread.join()
+    server.cleanup()
+
+    return {
+        'packets': len(packets),
+        'seconds': elapsed,
+        'packets_per_second': len(packets) / elapsed,
+        'batches': server.ingest_stats['batches'],
+        'max_backlog': server.ingest_stats['max_backlog']
+    }
+
+
+def run(packet_count=50000, node_count=500, duplicates=0.2):
+    """Both ingest modes over the same packet list"""
+    packets = make_packets(packet_count, node_count, duplicates)
+    return {
+        'inline': run_inline(packets),
+        'threaded': asyncio.run(run_threaded(packets))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--packets', type=int, default=50000)
+    parser.add_argument('--nodes', type=int, default=500)
+    parser.add_argument('--duplicates', type=float, default=0.2, help='share of rebroadcast copies')
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = run(args.packets, args.nodes, args.duplicates)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{args.packets} packets from {args.nodes} nodes\n")
+    print(f"{'mode':<10}{'pkts/s':>12}{'seconds':>10}")
+    for mode, result in results.items():
+        print(f"{mode:<10}{result['packets_per_second']:>12.0f}{result['seconds']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
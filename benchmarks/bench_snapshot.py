@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Snapshot Benchmark
+Time to build and encode the init frame a new client receives, by node
+count and encoding, with a cold and a warm node fragment cache
+"""
+
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import wire_protocol
+from bench_wire_protocol import make_node
+from meshtastic_server import MeshtasticServer
+
+# Per-packet and per-connection info logging would dominate the timings
+logging.disable(logging.INFO)
+
+
+def make_server(node_count, message_count=50):
+    """A server holding node_count nodes and a short message history"""
+    server = MeshtasticServer(db_path=None, ws_port=0)
+    now = time.time()
+    for i in range(node_count):
+        node = make_node(i, now)
+        server.nodes[node.id] = node
+    for i in range(message_count):
+        server.messages.append({
+            'from': f'Node {i}',
+            'from_id': f'!{i:08x}',
+            'text': 'Status OK, moving to checkpoint 3',
+            'timestamp': datetime.now().isoformat()
+        })
+    return server
+
+
+def measure(server, encoding, iterations):
+    """Milliseconds per snapshot with a fresh cache, then with a warm one"""
+    cold = 0.0
+    for _ in range(iterations):
+        server.fragments = wire_protocol.FragmentCache()
+        start = time.perf_counter()
+        payload = wire_protocol.encode(server.snapshot_frame(None), encoding, server.fragments)
+        cold += time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        wire_protocol.encode(server.snapshot_frame(None), encoding, server.fragments)
+    warm = time.perf_counter() - start
+
+    return {
+        'bytes': len(payload),
+        'cold_ms': cold / iterations * 1000,
+        'warm_ms': warm / iterations * 1000
+    }
+
+
+def run(node_counts=(100, 1000, 10000), iterations=5):
+    """Every node count with every available encoding"""
+    results = {}
+    for count in node_counts:
+        server = make_server(count)
+        results[str(count)] = {
+            encoding: measure(server, encoding, iterations)
+            for encoding in wire_protocol.ENCODINGS
+        }
+        server.cleanup()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--nodes', default='100,1000,10000', help='comma-separated node counts')
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = run([int(count) for count in args.nodes.split(',')], args.iterations)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    print(f"{'nodes':>8}  {'encoding':<10}{'bytes':>12}{'cold ms':>10}{'warm ms':>10}")
+    for count, by_encoding in results.items():
+        for encoding, result in by_encoding.items():
+            print(f"{count:>8}  {encoding:<10}{result['bytes']:>12}{result['cold_ms']:>10.2f}{result['warm_ms']:>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Wire Protocol Benchmark
+Compares bytes per frame and encode time of each available encoding
+against the plain JSON frames the server used to send
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import zlib
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import wire_protocol
+from node_record import NodeRecord
+
+
+def make_node(i, now):
+    """A node record like the ones MeshtasticServer keeps (now in epoch seconds)"""
+    node = NodeRecord(f'!{i:08x}', now - 7200)
+    node.name = f'Node {i}'
+    node.short_name = f'N{i % 1000}'
+    node.hw_model = 'TLORA_T3_S3'
+    node.last_seen = now
+    node.packets = 100 + i
+    node.snr = 6.25
+    node.rssi = -92
+    node.hops = i % 4
+    node.battery = 87
+    node.voltage = 4.01
+    node.channel_utilization = 12.5
+    node.air_util_tx = 1.8
+    node.set_position(45.4981 + i * 1e-4, -122.4404, 61)
+    return node
+
+
+def make_frames(node_count):
+    """Representative frames: an init snapshot, a batch delta and a chat message"""
+    now = datetime.now()
+    nodes = [make_node(i, now.timestamp()) for i in range(node_count)]
+    messages = [
+        {'id': i, 'from': f'Node {i}', 'from_id': f'!{i:08x}', 'text': 'Status OK, moving to checkpoint 3',
+         'timestamp': now.isoformat()}
+        for i in range(50)
+    ]
+    stats = {'total_messages': 4200, 'total_nodes': node_count, 'start_time': now.isoformat()}
+
+    return {
+        'init': {'type': 'init', 'nodes': nodes, 'messages': messages, 'stats': stats},
+        'batch_update': {'type': 'batch_update', 'nodes': nodes[:5], 'messages': messages[:1], 'stats': stats},
+        'message': {'type': 'message', **messages[0]}
+    }
+
+
+def measure(data, encoding, iterations):
+    """Encoded size, deflated size and mean encode time in microseconds"""
+    payload = wire_protocol.encode(data, encoding)
+    raw = payload.encode('utf-8') if isinstance(payload, str) else payload
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        wire_protocol.encode(data, encoding)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'bytes': len(raw),
+        'deflate_bytes': len(zlib.compress(raw, 6)),
+        'encode_us': elapsed / iterations * 1e6
+    }
+
+
+def run(node_count=200, iterations=200):
+    """Benchmark every frame kind with every available encoding"""
+    results = {}
+    for name, data in make_frames(node_count).items():
+        rounds = max(iterations // 20, 5) if name == 'init' else iterations
+        results[name] = {
+            encoding: measure(data, encoding, rounds)
+            for encoding in wire_protocol.ENCODINGS
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--nodes', type=int, default=200, help='nodes in the init snapshot')
+    parser.add_argument('--iterations', type=int, default=200)
+    parser.add_argument('--json', action='store_true', help='print results as JSON')
+    args = parser.parse_args()
+
+    results = run(args.nodes, args.iterations)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    if 'msgpack' not in wire_protocol.ENCODINGS:
+        print("msgpack not installed - only JSON measured (pip install msgpack)\n")
+
+    print(f"{'frame':<14}{'encoding':<10}{'bytes':>10}{'deflated':>10}{'encode us':>12}")
+    for frame, by_encoding in results.items():
+        for encoding, result in by_encoding.items():
+            print(f"{frame:<14}{encoding:<10}{result['bytes']:>10}"
+                  f"{result['deflate_bytes']:>10}{result['encode_us']:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
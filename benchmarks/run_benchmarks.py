@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Benchmark Suite Runner
+Runs every benchmark, writes one JSON document tagged with the commit and
+environment, and compares it against an earlier run to flag regressions
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import bench_discovery
+import bench_export
+import bench_fanout
+import bench_fragments
+import bench_ingest
+import bench_snapshot
+import bench_wire_protocol
+import wire_protocol
+
+# name -> (full run, quick run)
+SUITE = {
+    'ingest': (
+        lambda: bench_ingest.run(50000, 500),
+        lambda: bench_ingest.run(5000, 100)
+    ),
+    'fanout': (
+        lambda: bench_fanout.run((1, 50, 500), rounds=50),
+        lambda: bench_fanout.run((1, 50), rounds=10)
+    ),
+    'snapshot': (
+        lambda: bench_snapshot.run((100, 1000, 10000), iterations=5),
+        lambda: bench_snapshot.run((100, 1000), iterations=2)
+    ),
+    'export': (
+        lambda: bench_export.run(100000, 1000),
+        lambda: bench_export.run(10000, 200)
+    ),
+    'discovery': (
+        lambda: bench_discovery.run(50000, 500, audio_seconds=30, iterations=20),
+        lambda: bench_discovery.run(5000, 100, audio_seconds=5, iterations=5)
+    ),
+    'wire_protocol': (
+        lambda: bench_wire_protocol.run(200, 200),
+        lambda: bench_wire_protocol.run(100, 20)
+    ),
+    'fragments': (
+        lambda: bench_fragments.run(5000, 50, 500, 20),
+        lambda: bench_fragments.run(1000, 10, 100, 20)
+    )
+}
+
+# Leaf names where a larger number is better; everything else timed is
+# lower-is-better. Counts and sizes that are not timings are not compared.
+HIGHER_IS_BETTER = ('per_second',)
+LOWER_IS_BETTER = ('_ms', '_us', 'seconds', 'memory_mb')
+
+
+def git_commit():
+    """Short hash of HEAD, with a + when the tree has local changes"""
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=root,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+            capture_output=True, text=True
+        ).stdout.strip()
+        return commit + ('+' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'encodings': list(wire_protocol.ENCODINGS),
+        'json_encoders': list(wire_protocol.JSON_ENCODERS)
+    }
+
+
+def flatten(data, prefix=''):
+    """{'a': {'b': 1}} -> {'a.b': 1}, numbers only"""
+    flat = {}
+    for key, value in data.items():
+        name = f'{prefix}.{key}' if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def direction(name):
+    """+1 when higher is better, -1 when lower is better, 0 when not compared"""
+    leaf = name.rsplit('.', 1)[-1]
+    if any(leaf.endswith(suffix) for suffix in HIGHER_IS_BETTER):
+        return 1
+    if any(leaf.endswith(suffix) for suffix in LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(baseline, current, threshold):
+    """Changed metrics as (name, old, new, percent change, regressed)"""
+    old = flatten(baseline['results'])
+    new = flatten(current['results'])
+    rows = []
+    for name, value in new.items():
+        better = direction(name)
+        if not better or name not in old or not old[name]:
+            continue
+        change = (value - old[name]) / old[name] * 100
+        rows.append((name, old[name], value, change, change * better < -threshold))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--only', help=f"comma-separated subset of: {', '.join(SUITE)}")
+    parser.add_argument('--quick', action='store_true', help='smaller sizes for a fast smoke run')
+    parser.add_argument('--out', help='write results JSON here (default: stdout)')
+    parser.add_argument('--compare', metavar='BASELINE', help='results JSON from an earlier run')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='percent change that counts as a regression (default 10)')
+    args = parser.parse_args()
+
+    names = args.only.split(',') if args.only else list(SUITE)
+    unknown = [name for name in names if name not in SUITE]
+    if unknown:
+        parser.error(f"unknown benchmark: {', '.join(unknown)}")
+
+    report = {'environment': environment(), 'quick': args.quick, 'results': {}, 'durations': {}}
+    for name in names:
+        print(f"Running {name}...", file=sys.stderr)
+        start = time.perf_counter()
+        report['results'][name] = SUITE[name][1 if args.quick else 0]()
+        report['durations'][name] = round(time.perf_counter() - start, 2)
+
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(output + '\n')
+        print(f"Results written to {args.out}", file=sys.stderr)
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('quick') != args.quick:
+            print("\nBaseline was run with different sizes (--quick); not comparing", file=sys.stderr)
+            sys.exit(2)
+        rows = compare(baseline, report, args.threshold)
+        commit = baseline.get('environment', {}).get('commit')
+        print(f"\nCompared with {commit or args.compare} (threshold {args.threshold:g}%):", file=sys.stderr)
+        regressions = 0
+        for name, old, new, change, regressed in rows:
+            flag = ' REGRESSION' if regressed else ''
+            regressions += regressed
+            print(f"  {name:<48}{old:>14.3f}{new:>14.3f}{change:>+9.1f}%{flag}", file=sys.stderr)
+        if regressions:
+            print(f"\n{regressions} regression(s)", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
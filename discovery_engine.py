@@ -0,0 +1,236 @@
+"""
+Discovery Engine for Meshtastic Command Center
+Probes known nodes with a bounded window of ROUTING_APP pings in flight,
+matches acks back to their requests and keeps per-node round-trip estimates
+for adaptive timeouts and retries
+"""
+
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Smoothing gains for the round-trip estimator (as in TCP, RFC 6298)
+RTT_GAIN = 0.125
+RTTVAR_GAIN = 0.25
+
+
+def packet_id(sent):
+    """Id of a packet returned by sendData (MeshPacket or dict)"""
+    if sent is None:
+        return None
+    if isinstance(sent, dict):
+        return sent.get('id')
+    return getattr(sent, 'id', None)
+
+
+class LinkEstimate:
+    """Smoothed round-trip time and last probe outcome for one node"""
+
+    __slots__ = ('srtt', 'rttvar', 'rtt', 'reachable', 'attempts', 'error', 'probed_at')
+
+    def __init__(self):
+        self.srtt = None
+        self.rttvar = None
+        self.rtt = None
+        self.reachable = None
+        self.attempts = 0
+        self.error = None
+        self.probed_at = None
+
+    def observe(self, rtt):
+        """Fold one round-trip sample into the estimate"""
+        self.rtt = rtt
+        if self.srtt is None:
+            self.srtt = rtt
+            self.rttvar = rtt / 2
+        else:
+            self.rttvar += RTTVAR_GAIN * (abs(self.srtt - rtt) - self.rttvar)
+            self.srtt += RTT_GAIN * (rtt - self.srtt)
+
+    def timeout(self, default, minimum, maximum):
+        """Retransmission timeout: srtt + 4 * rttvar once anything was measured"""
+        if self.srtt is None:
+            return default
+        return min(max(self.srtt + 4 * self.rttvar, minimum), maximum)
+
+    def describe(self):
+        return {
+            'reachable': self.reachable,
+            'rtt': round(self.rtt, 3) if self.rtt is not None else None,
+            'srtt': round(self.srtt, 3) if self.srtt is not None else None,
+            'attempts': self.attempts,
+            'error': self.error,
+            'probed_at': self.probed_at
+        }
+
+
+class NodeProbe:
+    """One node's probes within a run; every attempt gets its own packet id"""
+
+    __slots__ = ('node_id', 'attempt', 'current', 'sent', 'answer', 'nak', 'error')
+
+    def __init__(self, node_id, loop):
+        self.node_id = node_id
+        self.attempt = 0
+        self.current = None
+        self.sent = {}
+        self.answer = loop.create_future()
+        self.nak = None
+        self.error = None
+
+
+class DiscoveryEngine:
+    """
+    send_probe(node_id) is awaited to put one probe on the air and returns
+    its packet id; on_routing is fed every ROUTING_APP packet. A run keeps at
+    most window probes waiting for an answer at once, so its length grows
+    with node count / window instead of node count.
+    """
+
+    def __init__(self, send_probe, window=8, retries=2, initial_timeout=20.0,
+                 hop_timeout=10.0, min_timeout=5.0, max_timeout=120.0,
+                 backoff=2.0, retry_delay=2.0):
+        self.send_probe = send_probe
+        self.window_size = window
+        self.retries = retries
+        self.initial_timeout = initial_timeout
+        self.hop_timeout = hop_timeout
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.backoff = backoff
+        self.retry_delay = retry_delay
+
+        self.links = {}
+        self.pending = {}
+        self.stats = {
+            'runs': 0,
+            'probes': 0,
+            'acks': 0,
+            'naks': 0,
+            'timeouts': 0,
+            'retries': 0,
+            'send_errors': 0,
+            'late_answers': 0,
+            'last_run_seconds': None
+        }
+
+    def timeout_for(self, link, hops, attempt):
+        """Adaptive timeout for one attempt, growing by backoff per retry"""
+        default = self.initial_timeout + self.hop_timeout * (hops or 0)
+        timeout = link.timeout(default, self.min_timeout, self.max_timeout)
+        return min(timeout * self.backoff ** attempt, self.max_timeout)
+
+    async def run(self, node_ids, hops=None):
+        """Probe every node and return per-node reachability and RTT"""
+        hops = hops or {}
+        started = time.monotonic()
+        self.stats['runs'] += 1
+        window = asyncio.Semaphore(self.window_size)
+
+        await asyncio.gather(*(
+            self.probe_node(node_id, hops.get(node_id), window) for node_id in node_ids
+        ))
+
+        duration = time.monotonic() - started
+        self.stats['last_run_seconds'] = round(duration, 2)
+        nodes = {node_id: self.links[node_id].describe() for node_id in node_ids}
+        return {
+            'nodes': nodes,
+            'reachable': sum(1 for node in nodes.values() if node['reachable']),
+            'duration': round(duration, 2)
+        }
+
+    async def probe_node(self, node_id, hops, window):
+        """Probe one node until it answers or the retries run out"""
+        loop = asyncio.get_running_loop()
+        link = self.links.setdefault(node_id, LinkEstimate())
+        probe = NodeProbe(node_id, loop)
+
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    self.stats['retries'] += 1
+                probe.attempt = attempt
+                probe.nak = loop.create_future()
+                timeout = self.timeout_for(link, hops, attempt)
+
+                async with window:
+                    try:
+                        request_id = packet_id(await self.send_probe(node_id))
+                    except Exception as e:
+                        self.stats['send_errors'] += 1
+                        probe.error = str(e)
+                        request_id = None
+                    else:
+                        if request_id is None:
+                            probe.error = 'no packet id to match acks against'
+                            break
+
+                    if request_id is not None:
+                        probe.current = request_id
+                        probe.sent[request_id] = time.monotonic()
+                        self.pending[request_id] = probe
+                        self.stats['probes'] += 1
+                        # An ack for an earlier attempt still counts, and
+                        # still times that attempt correctly
+                        done, _ = await asyncio.wait(
+                            (probe.answer, probe.nak), timeout=timeout,
+                            return_when=asyncio.FIRST_COMPLETED
+                        )
+                        if probe.answer.done():
+                            break
+                        if not done:
+                            self.stats['timeouts'] += 1
+                            probe.error = 'timeout'
+
+                # Radio errors and NAKs come back early; space those retries out
+                if attempt < self.retries and (request_id is None or probe.nak.done()):
+                    await asyncio.sleep(self.retry_delay * self.backoff ** attempt)
+        finally:
+            for request_id in probe.sent:
+                self.pending.pop(request_id, None)
+
+        link.attempts = probe.attempt + 1
+        link.probed_at = time.time()
+        if probe.answer.done():
+            link.observe(probe.answer.result())
+            link.reachable = True
+            link.error = None
+        else:
+            link.reachable = False
+            link.error = probe.error
+            logger.debug(f"No answer from {node_id} after {link.attempts} probes: {probe.error}")
+        return link
+
+    def on_routing(self, packet, from_id):
+        """Match a ROUTING_APP ack, response or NAK to the probe it answers"""
+        decoded = packet.get('decoded', {})
+        request_id = decoded.get('requestId')
+        if not request_id:
+            return
+
+        probe = self.pending.get(request_id)
+        if probe is None:
+            return
+        if probe.answer.done():
+            self.stats['late_answers'] += 1
+            return
+
+        error = decoded.get('routing', {}).get('errorReason', 'NONE')
+        if from_id == probe.node_id:
+            # Anything from the destination itself proves it is reachable
+            self.stats['acks'] += 1
+            probe.answer.set_result(time.monotonic() - probe.sent[request_id])
+        elif error != 'NONE':
+            # Our radio (or a relay) gave up on this attempt
+            self.stats['naks'] += 1
+            probe.error = error
+            if request_id == probe.current and not probe.nak.done():
+                probe.nak.set_result(error)
+        # Otherwise an implicit ack from a relay; keep waiting for the node
+
+    def describe(self):
+        """Last known reachability of every probed node"""
+        return {node_id: link.describe() for node_id, link in self.links.items()}
@@ -0,0 +1,311 @@
+"""
+Fan-out Workers for Meshtastic Command Center
+Optional multi-process client serving: the main process keeps the radios and
+all state and streams every broadcast frame over a Unix socket to worker
+processes, which share the WebSocket port and do the per-client encoding
+"""
+
+import asyncio
+import itertools
+import logging
+import pickle
+import struct
+
+logger = logging.getLogger(__name__)
+
+# Messages are pickled tuples behind a 4-byte length. The socket lives in a
+# private directory, so only processes of the same user can connect.
+HEADER = struct.Struct('!I')
+
+# A worker this far behind on frames is disconnected (and restarted) rather
+# than buffered without bound
+MAX_WORKER_BACKLOG = 64 * 1024 * 1024
+
+
+def pack(message):
+    """Frame one message for the socket"""
+    body = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    return HEADER.pack(len(body)) + body
+
+
+async def read_message(reader):
+    """Read one framed message"""
+    (size,) = HEADER.unpack(await reader.readexactly(HEADER.size))
+    return pickle.loads(await reader.readexactly(size))
+
+
+class RemoteSession:
+    """
+    Stands in for a client connected to a worker while the main process
+    runs one of its commands: replies go back to the worker, which queues
+    them on the real session
+    """
+
+    encoding = 'json'
+    filter = None
+
+    def __init__(self, connection, token):
+        self.connection = connection
+        self.token = token
+        self.closed = False
+        self.task = None
+
+    def send(self, data):
+        """Send a reply frame to the client"""
+        if not self.closed:
+            self.connection.send(('reply', self.token, data))
+
+    async def wait_writable(self):
+        """Wait until the worker's queue for this client has room"""
+        if not self.closed:
+            self.closed = await self.connection.call('wait', self.token)
+
+    def submit(self, run_command, data):
+        """Run commands one at a time in arrival order, as for a direct client"""
+        self.task = asyncio.create_task(self.run(self.task, run_command, data))
+
+    async def run(self, previous, run_command, data):
+        if previous is not None:
+            await asyncio.wait((previous,))
+        if not self.closed:
+            await run_command(self, data)
+
+
+class WorkerConnection:
+    """Main-process end of one worker's socket"""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.index = None
+        self.status = {}
+        self.sessions = {}
+        self.calls = {}
+        self.call_ids = itertools.count(1)
+
+    def send(self, message):
+        self.write(pack(message))
+
+    def write(self, payload):
+        if not self.writer.is_closing():
+            self.writer.write(payload)
+
+    def backlog(self):
+        return self.writer.transport.get_write_buffer_size()
+
+    def call(self, kind, token):
+        """Ask the worker something about a client and wait for its answer"""
+        call_id = next(self.call_ids)
+        future = self.calls[call_id] = asyncio.get_running_loop().create_future()
+        self.send((kind, token, call_id))
+        return future
+
+    def close(self):
+        """Release sessions and waiters after the worker went away"""
+        for session in self.sessions.values():
+            session.closed = True
+        for future in self.calls.values():
+            if not future.done():
+                future.set_result(True)
+        self.sessions.clear()
+        self.calls.clear()
+        self.writer.close()
+
+
+class FanoutHub:
+    """
+    Main-process side. A new worker first gets a snapshot of current state,
+    then every published frame on the same ordered stream, so its copy never
+    misses or repeats an update. Each frame is pickled once for all workers.
+    """
+
+    def __init__(self, path, snapshot, run_command, answer_request):
+        self.path = path
+        self.snapshot = snapshot
+        self.run_command = run_command
+        self.answer_request = answer_request
+        self.server = None
+        self.workers = {}
+        self.stats = {
+            'workers': 0,
+            'frames': 0,
+            'bytes': 0,
+            'commands': 0,
+            'workers_dropped': 0
+        }
+
+    async def start(self):
+        """Listen for workers on the Unix socket"""
+        self.server = await asyncio.start_unix_server(self.handle_worker, path=self.path)
+
+    def close(self):
+        if self.server:
+            self.server.close()
+        for connection in list(self.workers.values()):
+            connection.close()
+
+    def publish(self, frame, node_portnums=None, moved_from=None):
+        """Hand a broadcast frame to every worker"""
+        if not self.workers:
+            return
+        payload = pack(('publish', frame, node_portnums, moved_from))
+        self.stats['frames'] += 1
+        self.stats['bytes'] += len(payload)
+        for connection in list(self.workers.values()):
+            if connection.backlog() > MAX_WORKER_BACKLOG:
+                logger.warning(f"Fan-out worker {connection.index} is not keeping up; disconnecting it")
+                self.stats['workers_dropped'] += 1
+                connection.close()
+                continue
+            connection.write(payload)
+
+    def total(self, key):
+        """Sum of one status counter across workers"""
+        return sum(connection.status.get(key, 0) for connection in self.workers.values())
+
+    def describe(self):
+        """Latest status reported by each worker"""
+        return {connection.index: connection.status for connection in self.workers.values()}
+
+    async def handle_worker(self, reader, writer):
+        """Sync a new worker, then serve its commands until it disconnects"""
+        connection = WorkerConnection(writer)
+        connection.send(('sync', self.snapshot()))
+        self.workers[writer] = connection
+        self.stats['workers'] = len(self.workers)
+
+        try:
+            while True:
+                message = await read_message(reader)
+                kind = message[0]
+
+                if kind == 'hello':
+                    connection.index = message[1]
+                    logger.info(f"Fan-out worker {connection.index} connected")
+
+                elif kind == 'command':
+                    _, token, data = message
+                    session = connection.sessions.get(token)
+                    if session is None:
+                        session = connection.sessions[token] = RemoteSession(connection, token)
+                    self.stats['commands'] += 1
+                    session.submit(self.run_command, data)
+
+                elif kind == 'closed':
+                    session = connection.sessions.pop(message[1], None)
+                    if session:
+                        session.closed = True
+
+                elif kind == 'ready':
+                    _, call_id, closed = message
+                    future = connection.calls.pop(call_id, None)
+                    if future and not future.done():
+                        future.set_result(closed)
+
+                elif kind == 'request':
+                    _, call_id, name = message
+                    connection.send(('response', call_id, self.answer_request(name)))
+
+                elif kind == 'status':
+                    connection.status = message[1]
+
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            # The worker went away, or the hub is shutting down; a cancelled
+            # error escaping here would be logged by the stream callback
+            pass
+        except Exception as e:
+            logger.error(f"Error on fan-out worker {connection.index} link: {e}")
+        finally:
+            writer.close()
+            del self.workers[writer]
+            self.stats['workers'] = len(self.workers)
+            connection.close()
+            logger.info(f"Fan-out worker {connection.index} disconnected")
+
+
+class HubLink:
+    """
+    Worker side of the socket: receives state and frames, forwards commands
+    for its clients and relays their replies
+    """
+
+    def __init__(self, path, index, on_frame):
+        self.path = path
+        self.index = index
+        self.on_frame = on_frame
+        self.reader = None
+        self.writer = None
+        self.sessions = {}
+        self.calls = {}
+        self.call_ids = itertools.count(1)
+        self.stats = {
+            'frames': 0,
+            'commands': 0
+        }
+
+    async def connect(self):
+        """Connect to the main process; returns the initial state"""
+        self.reader, self.writer = await asyncio.open_unix_connection(self.path)
+        self.send(('hello', self.index))
+        kind, state = await read_message(self.reader)
+        if kind != 'sync':
+            raise ConnectionError(f"Expected sync from the main process, got {kind}")
+        return state
+
+    def send(self, message):
+        if not self.writer.is_closing():
+            self.writer.write(pack(message))
+
+    def forward(self, session, data):
+        """Run a command in the main process on behalf of a client"""
+        self.sessions[id(session)] = session
+        self.stats['commands'] += 1
+        self.send(('command', id(session), data))
+
+    def session_closed(self, session):
+        if self.sessions.pop(id(session), None) is not None:
+            self.send(('closed', id(session)))
+
+    async def request(self, name):
+        """Ask the main process for something (e.g. rendered metrics)"""
+        call_id = next(self.call_ids)
+        future = self.calls[call_id] = asyncio.get_running_loop().create_future()
+        self.send(('request', call_id, name))
+        return await future
+
+    async def run(self):
+        """Apply frames and replies until the main process goes away"""
+        try:
+            while True:
+                message = await read_message(self.reader)
+                kind = message[0]
+
+                if kind == 'publish':
+                    self.stats['frames'] += 1
+                    self.on_frame(*message[1:])
+
+                elif kind == 'reply':
+                    session = self.sessions.get(message[1])
+                    if session:
+                        session.send(message[2])
+
+                elif kind == 'wait':
+                    _, token, call_id = message
+                    asyncio.create_task(self.wait_writable(self.sessions.get(token), call_id))
+
+                elif kind == 'response':
+                    future = self.calls.pop(message[1], None)
+                    if future and not future.done():
+                        future.set_result(message[2])
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for future in self.calls.values():
+                if not future.done():
+                    future.set_exception(ConnectionError('main process went away'))
+            self.writer.close()
+
+    async def wait_writable(self, session, call_id):
+        if session is not None:
+            await session.wait_writable()
+        self.send(('ready', call_id, session is None or session.closed))
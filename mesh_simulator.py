@@ -0,0 +1,523 @@
+#!/usr/bin/env python3
+"""
+Mesh Simulator for Meshtastic Command Center
+Synthetic mesh traffic and packet record/replay behind a fake interface, so
+the server can be load tested without hardware. Use a port such as
+sim://?nodes=200&rate=500 or replay://capture.jsonl.gz?speed=0
+"""
+
+import argparse
+import gzip
+import json
+import logging
+import math
+import random
+import threading
+import time
+from urllib.parse import parse_qs
+
+from pubsub import pub
+
+from packet_store import encode_value
+
+logger = logging.getLogger(__name__)
+
+SCHEMES = ('sim://', 'replay://')
+
+BROADCAST_NUM = 0xFFFFFFFF
+
+# Portnum weights resembling a quiet mesh: mostly position, telemetry and
+# node info beacons, some chat and acks
+DEFAULT_MIX = {
+    'POSITION_APP': 30,
+    'TELEMETRY_APP': 30,
+    'NODEINFO_APP': 15,
+    'TEXT_MESSAGE_APP': 10,
+    'ROUTING_APP': 15
+}
+
+# pubsub subtopics the meshtastic library publishes each portnum under
+TOPICS = {
+    'TEXT_MESSAGE_APP': 'meshtastic.receive.text',
+    'POSITION_APP': 'meshtastic.receive.position',
+    'NODEINFO_APP': 'meshtastic.receive.user',
+    'TELEMETRY_APP': 'meshtastic.receive.telemetry',
+    'ROUTING_APP': 'meshtastic.receive.routing',
+    'NEIGHBORINFO_APP': 'meshtastic.receive.neighborinfo'
+}
+
+HW_MODELS = ('TBEAM', 'HELTEC_V3', 'RAK4631', 'T_ECHO', 'TLORA_V2_1_1P6', 'STATION_G2')
+
+RECORDING_FORMAT = 'meshtastic-recording'
+
+
+def topic_for(packet):
+    """pubsub topic for a packet, as the meshtastic library would pick it"""
+    portnum = packet.get('decoded', {}).get('portnum')
+    if portnum is None:
+        return 'meshtastic.receive'
+    return TOPICS.get(portnum, f'meshtastic.receive.data.{portnum}')
+
+
+def parse_mix(text):
+    """'POSITION_APP:3,TEXT_MESSAGE_APP:1' -> {'POSITION_APP': 3.0, ...}"""
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition(':')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+class SyntheticMesh:
+    """Endless stream of realistic packet dicts from a fake mesh"""
+
+    def __init__(self, node_count=50, rate=100.0, mix=None, duplicates=0.2,
+                 jitter=0.0005, center=(45.5152, -122.6784), radius_km=15.0, seed=None):
+        self.rate = rate
+        self.duplicates = duplicates
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.packet_id = self.rng.randrange(1 << 31)
+
+        mix = mix or DEFAULT_MIX
+        self.portnums = list(mix)
+        self.weights = [mix[name] for name in self.portnums]
+
+        self.nodes = [self.make_node(i, center, radius_km) for i in range(node_count)]
+        self.by_id = {node['id']: node for node in self.nodes}
+
+        # Each node relays through a few nodes one hop closer to the gateway
+        layers = {}
+        for node in self.nodes:
+            layers.setdefault(node['hops'], []).append(node['num'])
+        for node in self.nodes:
+            closer = layers.get(node['hops'] - 1) or layers[node['hops']]
+            candidates = [num for num in closer if num != node['num']]
+            node['neighbors'] = self.rng.sample(candidates, min(3, len(candidates)))
+
+    def make_node(self, index, center, radius_km):
+        """One fake node scattered around center"""
+        rng = self.rng
+        num = 0x10000000 + index
+        distance = radius_km * math.sqrt(rng.random())
+        bearing = rng.uniform(0, 2 * math.pi)
+        latitude = center[0] + distance / 111.0 * math.cos(bearing)
+        longitude = center[1] + distance / (111.0 * math.cos(math.radians(center[0]))) * math.sin(bearing)
+        return {
+            'num': num,
+            'id': f'!{num:08x}',
+            'long_name': f'Sim Node {index:04d}',
+            'short_name': f'S{index % 1000:03d}',
+            'hw_model': rng.choice(HW_MODELS),
+            'latitude': latitude,
+            'longitude': longitude,
+            'altitude': rng.randint(0, 400),
+            'battery': rng.randint(20, 100),
+            'hops': min(int(distance / 4), 3),
+            'snr': rng.uniform(-15, 12) - distance / 3
+        }
+
+    def packets(self):
+        """Yield (offset seconds, packet) pairs spaced at the configured rate"""
+        interval = 1.0 / self.rate if self.rate else 0.0
+        count = 0
+        while True:
+            packet = self.make_packet()
+            yield count * interval, packet
+            count += 1
+
+            # A rebroadcast copy: same (from, id), fewer hops left, another SNR
+            if self.rng.random() < self.duplicates:
+                yield count * interval, self.rebroadcast(packet)
+                count += 1
+
+    def make_packet(self):
+        """One packet from a random node with a portnum drawn from the mix"""
+        rng = self.rng
+        node = rng.choice(self.nodes)
+        portnum = rng.choices(self.portnums, self.weights)[0]
+        self.packet_id = (self.packet_id + 1) & 0x7FFFFFFF
+        now = int(time.time())
+
+        hop_start = 3
+        packet = {
+            'from': node['num'],
+            'to': BROADCAST_NUM,
+            'fromId': node['id'],
+            'toId': '^all',
+            'id': self.packet_id,
+            'rxTime': now,
+            'rxSnr': round(node['snr'] + rng.gauss(0, 1.5), 2),
+            'rxRssi': int(-60 + node['snr'] * 2 + rng.gauss(-40, 5)),
+            'hopLimit': hop_start - node['hops'],
+            'hopStart': hop_start,
+            'decoded': self.make_payload(node, portnum, now)
+        }
+        return packet
+
+    def make_payload(self, node, portnum, now):
+        """Decoded section for one portnum"""
+        rng = self.rng
+        decoded = {'portnum': portnum, 'payload': b''}
+
+        if portnum == 'POSITION_APP':
+            node['latitude'] += rng.gauss(0, self.jitter)
+            node['longitude'] += rng.gauss(0, self.jitter)
+            decoded['position'] = {
+                'latitudeI': int(node['latitude'] * 1e7),
+                'longitudeI': int(node['longitude'] * 1e7),
+                'altitude': node['altitude'],
+                'time': now,
+                'latitude': node['latitude'],
+                'longitude': node['longitude']
+            }
+        elif portnum == 'TELEMETRY_APP':
+            node['battery'] = max(node['battery'] - (rng.random() < 0.05), 0)
+            decoded['telemetry'] = {
+                'time': now,
+                'deviceMetrics': {
+                    'batteryLevel': node['battery'],
+                    'voltage': round(3.3 + node['battery'] / 100, 3),
+                    'channelUtilization': round(rng.uniform(2, 30), 2),
+                    'airUtilTx': round(rng.uniform(0, 5), 2),
+                    'uptimeSeconds': now % 864000
+                }
+            }
+        elif portnum == 'NODEINFO_APP':
+            decoded['user'] = {
+                'id': node['id'],
+                'longName': node['long_name'],
+                'shortName': node['short_name'],
+                'macaddr': f"{node['num']:012x}",
+                'hwModel': node['hw_model']
+            }
+        elif portnum == 'TEXT_MESSAGE_APP':
+            decoded['text'] = f"Test {self.packet_id % 10000} from {node['short_name']}"
+        elif portnum == 'ROUTING_APP':
+            decoded['routing'] = {'errorReason': 'NONE'}
+        elif portnum == 'NEIGHBORINFO_APP':
+            decoded['neighborinfo'] = {
+                'nodeId': node['num'],
+                'nodeBroadcastIntervalSecs': 900,
+                'neighbors': [
+                    {'nodeId': num, 'snr': round(node['snr'] + rng.gauss(3, 2), 2)}
+                    for num in node['neighbors']
+                ]
+            }
+
+        return decoded
+
+    def answer(self, destination, request_id, gateway_id):
+        """
+        (delay, packet) answering a wantAck send: an ack from the node after
+        a hop-dependent round trip, or our radio's NAK when it is lost
+        """
+        rng = self.rng
+        node = self.by_id.get(destination)
+        gateway_num = int(gateway_id[1:], 16)
+        lost = node is None or rng.random() < 0.05 + 0.1 * node['hops']
+        source = {'num': gateway_num, 'id': gateway_id, 'snr': 10.0, 'hops': 0} if lost else node
+
+        hop_start = 3
+        packet = {
+            'from': source['num'],
+            'to': gateway_num,
+            'fromId': source['id'],
+            'toId': gateway_id,
+            'id': rng.randrange(1 << 31),
+            'rxTime': int(time.time()),
+            'rxSnr': round(source['snr'] + rng.gauss(0, 1.5), 2),
+            'rxRssi': int(-60 + source['snr'] * 2 + rng.gauss(-40, 5)),
+            'hopLimit': hop_start - source['hops'],
+            'hopStart': hop_start,
+            'decoded': {
+                'portnum': 'ROUTING_APP',
+                'payload': b'',
+                'requestId': request_id,
+                'routing': {'errorReason': 'MAX_RETRANSMIT' if lost else 'NONE'}
+            }
+        }
+        if lost:
+            return 5.0 + rng.uniform(0, 2), packet
+        return (0.3 + 0.7 * node['hops']) * rng.uniform(0.8, 1.6), packet
+
+    def rebroadcast(self, packet):
+        """A copy of packet as heard again after one more relay"""
+        copy = dict(packet)
+        copy['hopLimit'] = max(packet['hopLimit'] - 1, 0)
+        copy['rxSnr'] = round(packet['rxSnr'] + self.rng.gauss(-2, 2), 2)
+        copy['rxRssi'] = packet['rxRssi'] - self.rng.randint(0, 10)
+        return copy
+
+
+def strip_raw(value):
+    """Copy of a packet dict without the protobuf objects under 'raw' keys"""
+    if isinstance(value, dict):
+        return {key: strip_raw(item) for key, item in value.items() if key != 'raw'}
+    return value
+
+
+class PacketRecorder:
+    """Appends every received packet, with its arrival time, to a gzip NDJSON file"""
+
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+        self.start = None
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def open(self, subscribe=True):
+        """Create the file and, unless told otherwise, subscribe to received packets"""
+        self.file = gzip.open(self.path, 'wt', encoding='utf-8')
+        self.start = time.time()
+        self.file.write(json.dumps({'format': RECORDING_FORMAT, 'version': 1, 'start': self.start}) + '\n')
+        if subscribe:
+            pub.subscribe(self.on_receive, 'meshtastic.receive')
+            logger.info(f"Recording packets to {self.path}")
+
+    def on_receive(self, packet, interface=None):
+        """pubsub handler (reader thread)"""
+        self.write(packet)
+
+    def write(self, packet, received=None):
+        """Append one packet; received defaults to now"""
+        received = time.time() if received is None else received
+        line = json.dumps([round(received - self.start, 4), strip_raw(packet)], separators=(',', ':'), default=encode_value)
+        with self.lock:
+            if self.file:
+                self.file.write(line + '\n')
+                self.count += 1
+
+    def close(self):
+        """Stop recording and flush the file"""
+        try:
+            pub.unsubscribe(self.on_receive, 'meshtastic.receive')
+        except Exception:
+            pass
+        with self.lock:
+            if self.file:
+                self.file.close()
+                self.file = None
+        logger.info(f"Recorded {self.count} packets to {self.path}")
+
+
+def read_recording(path):
+    """Yield (offset seconds, packet) pairs from a recording"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get('format') != RECORDING_FORMAT:
+            raise ValueError(f"{path} is not a packet recording")
+        for line in f:
+            if line.strip():
+                offset, packet = json.loads(line)
+                yield offset, packet
+
+
+def replay(path, speed=1.0, loop=False):
+    """
+    Recorded packets with offsets scaled by speed (2.0 plays twice as fast);
+    with loop, the recording repeats with offsets continuing from the end
+    """
+    base = 0.0
+    while True:
+        offset = 0.0
+        for offset, packet in read_recording(path):
+            yield base + offset / speed if speed else 0.0, packet
+        if not loop:
+            return
+        base += offset / speed if speed else 0.0
+
+
+class SimulatedInterface:
+    """
+    Stand-in for SerialInterface: publishes packets from a source on its
+    own reader thread through pubsub, like the meshtastic library does
+    """
+
+    def __init__(self, source, paced=True, node_id='!0000beef', mesh=None):
+        self.source = source
+        self.paced = paced
+        self.node_id = node_id
+        # A synthetic mesh also answers wantAck sends
+        self.mesh = mesh
+        self.stopped = threading.Event()
+        self.stats = {
+            'published': 0,
+            'sent': 0,
+            'behind_seconds': 0.0
+        }
+        self.thread = threading.Thread(target=self.reader, name='sim-reader', daemon=True)
+
+    def start(self):
+        """Start publishing; call once the owner can recognize this interface"""
+        self.thread.start()
+
+    def reader(self):
+        """Publish packets at their offsets, or as fast as possible when not paced"""
+        pub.sendMessage('meshtastic.connection.established', interface=self)
+        start = time.monotonic()
+        try:
+            for offset, packet in self.source:
+                if self.stopped.is_set():
+                    return
+                if self.paced:
+                    delay = start + offset - time.monotonic()
+                    # Sleep only when noticeably ahead; otherwise keep
+                    # publishing so high rates are not capped by sleep granularity
+                    if delay > 0.002:
+                        if self.stopped.wait(delay):
+                            return
+                    elif delay < 0:
+                        self.stats['behind_seconds'] = -delay
+                self.publish(packet)
+        except Exception as e:
+            logger.error(f"Simulated interface stopped: {e}")
+
+    def publish(self, packet):
+        if self.stopped.is_set():
+            return
+        pub.sendMessage(topic_for(packet), packet=packet, interface=self)
+        self.stats['published'] += 1
+
+    def acknowledge(self, sent, kwargs):
+        """Publish the mesh's answer to a wantAck send after its round trip"""
+        if self.mesh is None or not kwargs.get('wantAck'):
+            return
+        delay, packet = self.mesh.answer(kwargs.get('destinationId'), sent['id'], self.node_id)
+        timer = threading.Timer(delay, self.publish, (packet,))
+        timer.daemon = True
+        timer.start()
+
+    def getMyUser(self):
+        return {'id': self.node_id, 'longName': 'Simulated Gateway', 'shortName': 'SIM'}
+
+    def sendText(self, text, **kwargs):
+        self.stats['sent'] += 1
+        sent = {'id': random.randrange(1 << 31), 'decoded': {'portnum': 'TEXT_MESSAGE_APP', 'text': text}}
+        self.acknowledge(sent, kwargs)
+        return sent
+
+    def sendData(self, data, **kwargs):
+        self.stats['sent'] += 1
+        sent = {'id': random.randrange(1 << 31), 'decoded': {'portnum': kwargs.get('portNum')}}
+        self.acknowledge(sent, kwargs)
+        return sent
+
+    def close(self):
+        self.stopped.set()
+        if self.thread.is_alive() and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+
+
+def is_simulated(port):
+    """Whether a port string names a simulator instead of a serial device"""
+    return isinstance(port, str) and port.startswith(SCHEMES)
+
+
+def open_interface(port):
+    """
+    SimulatedInterface for a port string:
+    sim://?nodes=200&rate=500&duplicates=0.2&jitter=0.0005&seed=1&mix=POSITION_APP:3,TEXT_MESSAGE_APP:1
+    replay://capture.jsonl.gz?speed=1&loop=1 (speed=0 replays as fast as possible)
+    """
+    scheme, _, rest = port.partition('://')
+    target, _, query = rest.partition('?')
+    options = {key: values[-1] for key, values in parse_qs(query).items()}
+
+    if scheme == 'sim':
+        mesh = SyntheticMesh(
+            node_count=int(options.get('nodes', 50)),
+            rate=float(options.get('rate', 100)),
+            mix=parse_mix(options['mix']) if 'mix' in options else None,
+            duplicates=float(options.get('duplicates', 0.2)),
+            jitter=float(options.get('jitter', 0.0005)),
+            seed=int(options['seed']) if 'seed' in options else None
+        )
+        logger.info(f"Simulating {len(mesh.nodes)} nodes at {mesh.rate:g} pkts/s")
+        return SimulatedInterface(mesh.packets(), paced=mesh.rate > 0, mesh=mesh)
+
+    if scheme == 'replay':
+        speed = float(options.get('speed', 1))
+        loop = options.get('loop', '0') not in ('0', 'false', '')
+        logger.info(f"Replaying {target} at {f'{speed:g}x' if speed else 'max speed'}")
+        return SimulatedInterface(replay(target, speed, loop), paced=bool(speed))
+
+    raise ValueError(f"Unknown simulator port: {port}")
+
+
+def record_synthetic(path, count, **options):
+    """Write count synthetic packets to a recording (for sharing fixed load profiles)"""
+    mesh = SyntheticMesh(**options)
+    recorder = PacketRecorder(path)
+    recorder.open(subscribe=False)
+    for _, (offset, packet) in zip(range(count), mesh.packets()):
+        recorder.write(packet, recorder.start + offset)
+    recorder.close()
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Record, generate and replay Meshtastic packet traffic')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    record = commands.add_parser('record', help='capture packets from a real radio')
+    record.add_argument('--port', default='/dev/ttyACM0')
+    record.add_argument('--out', default='capture.jsonl.gz')
+    record.add_argument('--duration', type=float, default=None, help='seconds (default: until Ctrl-C)')
+
+    generate = commands.add_parser('generate', help='write a synthetic recording')
+    generate.add_argument('--out', default='synthetic.jsonl.gz')
+    generate.add_argument('--packets', type=int, default=10000)
+    generate.add_argument('--nodes', type=int, default=50)
+    generate.add_argument('--rate', type=float, default=100.0)
+    generate.add_argument('--duplicates', type=float, default=0.2)
+    generate.add_argument('--seed', type=int, default=1)
+
+    info = commands.add_parser('info', help='summarize a recording')
+    info.add_argument('path')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    if args.command == 'record':
+        import meshtastic.serial_interface
+        recorder = PacketRecorder(args.out)
+        recorder.open()
+        interface = meshtastic.serial_interface.SerialInterface(args.port)
+        try:
+            deadline = time.time() + args.duration if args.duration else None
+            while deadline is None or time.time() < deadline:
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            interface.close()
+            recorder.close()
+
+    elif args.command == 'generate':
+        record_synthetic(
+            args.out, args.packets, node_count=args.nodes, rate=args.rate,
+            duplicates=args.duplicates, seed=args.seed
+        )
+        print(f"Wrote {args.packets} packets to {args.out}")
+
+    elif args.command == 'info':
+        count = 0
+        portnums = {}
+        senders = set()
+        duration = 0.0
+        for offset, packet in read_recording(args.path):
+            count += 1
+            duration = offset
+            senders.add(packet.get('fromId'))
+            portnum = packet.get('decoded', {}).get('portnum', 'ENCRYPTED')
+            portnums[portnum] = portnums.get(portnum, 0) + 1
+        print(f"{count} packets from {len(senders)} nodes over {duration:.1f}s "
+              f"({count / duration if duration else 0:.1f} pkts/s)")
+        for portnum, n in sorted(portnums.items(), key=lambda item: -item[1]):
+            print(f"  {portnum:<20}{n:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+"""
+Mesh Topology for Meshtastic Command Center
+Weighted link graph built from zero-hop packets, NEIGHBORINFO and TRACEROUTE
+reports, with fewest-hop and most-reliable paths from the gateway radios
+kept up to date one link change at a time
+"""
+
+import heapq
+import math
+import time
+from operator import attrgetter
+
+BROADCAST_NUM = 0xFFFFFFFF
+
+# Chance a hop gets through, from its SNR: a logistic curve that is about
+# even near the LongFast demodulation floor and close to 1 above 0 dB
+SNR_MIDPOINT = -12.0
+SNR_SCALE = 2.5
+UNKNOWN_QUALITY = 0.5
+MIN_QUALITY = 0.01
+
+# traceroute SNRs are int8 in quarter dB; this value means "not measured"
+TRACEROUTE_SNR_UNKNOWN = -128
+
+INFINITY = float('inf')
+EPSILON = 1e-9
+
+
+def node_id(num):
+    """'!0a1b2c3d' form of a node number"""
+    return f'!{num:08x}'
+
+
+def link_quality(snr):
+    """Estimated delivery probability of one hop"""
+    if snr is None:
+        return UNKNOWN_QUALITY
+    # Whole dB steps, so small SNR jitter does not move paths around
+    return max(1 / (1 + math.exp(-(round(snr) - SNR_MIDPOINT) / SNR_SCALE)), MIN_QUALITY)
+
+
+class Link:
+    """Undirected link between two nodes, shared by both adjacency entries"""
+
+    __slots__ = ('snr', 'source', 'seen', 'count', 'loss_cost', 'hop_cost')
+
+    def __init__(self, snr, source, seen):
+        self.source = source
+        self.seen = seen
+        self.count = 1
+        self.set_snr(snr)
+
+    def set_snr(self, snr):
+        # Path searches read the weights far more often than SNR changes
+        self.snr = snr
+        self.loss_cost = -math.log(link_quality(snr))
+        # One per hop; the loss term only breaks ties between equal hop counts
+        self.hop_cost = 1 + self.loss_cost * 1e-3
+
+
+class PathTree:
+    """
+    Least-cost tree from the roots, maintained incrementally: a cheaper link
+    relaxes outward from its ends, and a dearer or removed tree link only
+    re-attaches the subtree that hung below it
+    """
+
+    def __init__(self, adjacency, weight):
+        self.adjacency = adjacency
+        self.weight = weight
+        self.cost = {}
+        self.parent = {}
+        self.children = {}
+
+    def set_parent(self, node, parent):
+        old = self.parent.get(node)
+        if old is not None:
+            self.children[old].discard(node)
+        self.parent[node] = parent
+        if parent is not None:
+            self.children.setdefault(parent, set()).add(node)
+
+    def add_root(self, node):
+        self.cost[node] = 0.0
+        self.set_parent(node, None)
+        self.relax([node])
+
+    def relax(self, seeds):
+        """Propagate lower costs outward from seeds (Dijkstra)"""
+        heap = [(self.cost[node], node) for node in seeds if node in self.cost]
+        heapq.heapify(heap)
+        self.run(heap)
+
+    def run(self, heap):
+        cost_of = self.cost
+        weight = self.weight
+        while heap:
+            cost, node = heapq.heappop(heap)
+            if cost > cost_of.get(node, INFINITY):
+                continue
+            for neighbor, link in self.adjacency.get(node, {}).items():
+                candidate = cost + weight(link)
+                if candidate < cost_of.get(neighbor, INFINITY) - EPSILON:
+                    cost_of[neighbor] = candidate
+                    self.set_parent(neighbor, node)
+                    heapq.heappush(heap, (candidate, neighbor))
+
+    def link_changed(self, a, b, old_weight, new_weight):
+        """Update paths after the a-b link's weight changed (INFINITY: gone)"""
+        if new_weight < old_weight:
+            self.relax([a, b])
+        elif new_weight > old_weight:
+            if self.parent.get(b) == a:
+                self.detach(b)
+            elif self.parent.get(a) == b:
+                self.detach(a)
+
+    def detach(self, top):
+        """Re-attach the subtree rooted at top through its cheapest outside link"""
+        subtree = []
+        stack = [top]
+        while stack:
+            node = stack.pop()
+            subtree.append(node)
+            stack.extend(self.children.get(node, ()))
+
+        members = set(subtree)
+        for node in subtree:
+            self.set_parent(node, None)
+            del self.parent[node]
+            del self.cost[node]
+
+        # Paths outside the subtree did not use the dearer link, so they
+        # are still optimal and can seed the search
+        heap = []
+        for node in subtree:
+            best, via = INFINITY, None
+            for neighbor, link in self.adjacency.get(node, {}).items():
+                if neighbor in members or neighbor not in self.cost:
+                    continue
+                candidate = self.cost[neighbor] + self.weight(link)
+                if candidate < best:
+                    best, via = candidate, neighbor
+            if via is not None:
+                self.cost[node] = best
+                self.set_parent(node, via)
+                heap.append((best, node))
+        heapq.heapify(heap)
+        self.run(heap)
+
+    def forget(self, node):
+        """Drop every entry for a node that no longer has any links"""
+        if node in self.parent:
+            self.set_parent(node, None)
+            del self.parent[node]
+        self.cost.pop(node, None)
+        self.children.pop(node, None)
+
+    def path(self, node):
+        """Nodes from a root to node, or None when node is unreachable"""
+        if node not in self.cost:
+            return None
+        path = []
+        while node is not None:
+            path.append(node)
+            node = self.parent[node]
+        return path[::-1]
+
+
+class MeshTopology:
+    """
+    Links come from three places: a gateway hearing a packet with zero hops,
+    NEIGHBORINFO reports and TRACEROUTE routes. SNR is smoothed per link and
+    direction is ignored. Links not refreshed within link_ttl are dropped.
+    """
+
+    def __init__(self, link_ttl=43200.0, snr_gain=0.3, prune_interval=300.0):
+        self.link_ttl = link_ttl
+        self.snr_gain = snr_gain
+        self.prune_interval = prune_interval
+        self.pruned_at = 0.0
+
+        self.adjacency = {}
+        self.roots = set()
+        self.shortest = PathTree(self.adjacency, attrgetter('hop_cost'))
+        self.reliable = PathTree(self.adjacency, attrgetter('loss_cost'))
+        self.trees = (self.shortest, self.reliable)
+        self.stats = {
+            'nodes': 0,
+            'links': 0,
+            'link_updates': 0,
+            'links_expired': 0
+        }
+
+    def add_root(self, node):
+        """Add a gateway radio's node as a path root"""
+        if not node or node in self.roots:
+            return
+        self.roots.add(node)
+        self.adjacency.setdefault(node, {})
+        self.stats['nodes'] = len(self.adjacency)
+        for tree in self.trees:
+            tree.add_root(node)
+
+    def link(self, a, b, snr, source, now=None):
+        """Record that a and b heard each other, with an optional SNR reading"""
+        if not a or not b or a == b:
+            return
+        now = now or time.time()
+        self.stats['link_updates'] += 1
+
+        link = self.adjacency.get(a, {}).get(b)
+        if link is None:
+            link = Link(snr, source, now)
+            self.adjacency.setdefault(a, {})[b] = link
+            self.adjacency.setdefault(b, {})[a] = link
+            self.stats['links'] += 1
+            self.stats['nodes'] = len(self.adjacency)
+            for tree in self.trees:
+                tree.link_changed(a, b, INFINITY, tree.weight(link))
+        else:
+            old_weights = [tree.weight(link) for tree in self.trees]
+            if snr is not None:
+                link.set_snr(snr if link.snr is None else link.snr + self.snr_gain * (snr - link.snr))
+            link.source = source
+            link.seen = now
+            link.count += 1
+            for tree, old_weight in zip(self.trees, old_weights):
+                new_weight = tree.weight(link)
+                if new_weight != old_weight:
+                    tree.link_changed(a, b, old_weight, new_weight)
+
+        if now - self.pruned_at > self.prune_interval:
+            self.prune(now)
+
+    def unlink(self, a, b):
+        """Drop the a-b link and re-route anything that used it"""
+        link = self.adjacency[a].pop(b)
+        del self.adjacency[b][a]
+        self.stats['links'] -= 1
+        for tree in self.trees:
+            tree.link_changed(a, b, tree.weight(link), INFINITY)
+        for node in (a, b):
+            if not self.adjacency[node] and node not in self.roots:
+                del self.adjacency[node]
+                for tree in self.trees:
+                    tree.forget(node)
+        self.stats['nodes'] = len(self.adjacency)
+
+    def prune(self, now=None):
+        """Drop links not refreshed within link_ttl"""
+        now = now or time.time()
+        self.pruned_at = now
+        cutoff = now - self.link_ttl
+        stale = [
+            (a, b) for a, links in self.adjacency.items()
+            for b, link in links.items() if a < b and link.seen < cutoff
+        ]
+        for a, b in stale:
+            self.unlink(a, b)
+        self.stats['links_expired'] += len(stale)
+
+    def observe_packet(self, packet, from_id, gateway, now=None):
+        """A packet with no hops used is a direct link to the gateway that heard it"""
+        if gateway and packet.get('hopStart') and packet['hopStart'] == packet.get('hopLimit'):
+            self.link(gateway, from_id, packet.get('rxSnr'), 'direct', now)
+
+    def observe_neighbors(self, packet, from_id, now=None):
+        """NEIGHBORINFO_APP: the sender's neighbours and the SNR it hears them at"""
+        info = packet['decoded'].get('neighborinfo', {})
+        node = node_id(info['nodeId']) if info.get('nodeId') else from_id
+        for neighbor in info.get('neighbors', ()):
+            if neighbor.get('nodeId'):
+                self.link(node, node_id(neighbor['nodeId']), neighbor.get('snr'), 'neighbor', now)
+
+    def observe_traceroute(self, packet, from_id, now=None):
+        """TRACEROUTE_APP: every consecutive pair on the recorded routes is a link"""
+        route = packet['decoded'].get('traceroute', {})
+        source, destination = packet.get('from'), packet.get('to')
+        if source is None or destination is None or destination == BROADCAST_NUM:
+            return
+
+        if packet['decoded'].get('requestId'):
+            # A reply: route runs from the requester (to) to the replier
+            # (from) and routeBack is the way the reply came
+            self.link_route([destination, *route.get('route', ()), source], route.get('snrTowards', ()), now)
+            if 'routeBack' in route or 'snrBack' in route:
+                self.link_route([source, *route.get('routeBack', ()), destination], route.get('snrBack', ()), now)
+        else:
+            # A request still on its way: only the hops taken so far
+            self.link_route([source, *route.get('route', ())], route.get('snrTowards', ()), now)
+
+    def link_route(self, nums, snrs, now):
+        for i in range(len(nums) - 1):
+            snr = snrs[i] if i < len(snrs) else TRACEROUTE_SNR_UNKNOWN
+            snr = None if snr == TRACEROUTE_SNR_UNKNOWN else snr / 4
+            self.link(node_id(nums[i]), node_id(nums[i + 1]), snr, 'traceroute', now)
+
+    def path(self, node, reliable=False):
+        """Node ids from a gateway to node, or None when no path is known"""
+        return (self.reliable if reliable else self.shortest).path(node)
+
+    def describe(self, now=None):
+        """
+        Compact form for clients: nodes by index, links as index pairs and
+        each path tree as one parent index per node (null for gateways and
+        unreachable nodes), so any path is a walk up the parents
+        """
+        now = now or time.time()
+        if now - self.pruned_at > self.prune_interval:
+            self.prune(now)
+
+        nodes = list(self.adjacency)
+        index = {node: i for i, node in enumerate(nodes)}
+        shortest = self.shortest
+        reliable = self.reliable
+
+        def parents(tree):
+            return [index.get(tree.parent.get(node)) for node in nodes]
+
+        return {
+            'node_ids': nodes,
+            'roots': [index[node] for node in self.roots],
+            'links': [
+                [index[a], index[b], round(link.snr, 2) if link.snr is not None else None,
+                 link.source, round(now - link.seen)]
+                for a, links in self.adjacency.items()
+                for b, link in links.items() if index[a] < index[b]
+            ],
+            'shortest': parents(shortest),
+            'reliable': parents(reliable),
+            'hops': [round(shortest.cost[node]) if node in shortest.cost else None for node in nodes],
+            'reliability': [
+                round(math.exp(-reliable.cost[node]), 4) if node in reliable.cost else None
+                for node in nodes
+            ]
+        }
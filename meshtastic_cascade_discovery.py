@@ -16,8 +16,15 @@ import base64
 import wave
 import struct
 
+from node_record import NodeRecord
+from packet_dedup import PacketDedup
+from packet_handlers import PacketHandlers
+from packet_store import PacketStore
+from timeseries import TimeSeriesStore
+
 class MeshCascadeDiscovery:
-    def __init__(self, port='/dev/ttyACM0'):
+    def __init__(self, port='/dev/ttyACM0', db_path=None, dedup_window=60.0, merge_duplicates=True,
+                 plugins=(), disabled_handlers=()):
         """Initialize the mesh discovery system"""
         self.interface = None
         self.port = port
@@ -32,6 +39,29 @@ class MeshCascadeDiscovery:
         self.max_discovery_time = 300  # 5 minutes max discovery time
         self.discovery_start_time = None
         
+        # Rebroadcast copies of a packet are only counted once; with
+        # merge_duplicates their SNR and hop readings still feed the metrics
+        self.dedup = PacketDedup(dedup_window)
+        self.merge_duplicates = merge_duplicates
+        
+        # Signal and telemetry history, bounded per node
+        self.timeseries = TimeSeriesStore()
+        
+        # Portnum dispatch table; plugins register handlers for other apps
+        self.handlers = PacketHandlers(disabled_handlers)
+        self.handlers.register('TEXT_MESSAGE_APP', self.handle_text, 'text')
+        self.handlers.register('POSITION_APP', self.handle_position, 'position')
+        self.handlers.register('NODEINFO_APP', self.handle_nodeinfo, 'nodeinfo')
+        self.handlers.register('TELEMETRY_APP', self.handle_telemetry, 'telemetry')
+        self.handlers.register('ROUTING_APP', self.handle_routing_response, 'routing')
+        for plugin in plugins:
+            self.handlers.load_plugin(plugin, self)
+        
+        # Optional durable packet log, written on a background thread
+        self.store = PacketStore(db_path) if db_path else None
+        if self.store:
+            self.store.start()
+        
     def connect(self):
         """Connect to the Meshtastic device"""
         try:
@@ -63,42 +93,32 @@ class MeshCascadeDiscovery:
             from_id = packet.get('fromId', 'unknown')
             to_id = packet.get('toId', 'unknown')
             
+            with self.lock:
+                duplicate, _ = self.dedup.check(packet)
+            if duplicate:
+                if self.merge_duplicates and from_id in self.discovered_nodes:
+                    self.track_metrics(packet, from_id)
+                return
+            
+            if self.store:
+                self.store.append_packet(packet)
+            
             # Track node discovery
             with self.lock:
-                if from_id not in self.discovered_nodes:
-                    self.discovered_nodes[from_id] = {
-                        'first_seen': datetime.now().isoformat(),
-                        'last_seen': datetime.now().isoformat(),
-                        'packet_count': 0,
-                        'hops_away': packet.get('hopLimit', 0)
-                    }
+                node = self.discovered_nodes.get(from_id)
+                if node is None:
+                    node = self.discovered_nodes[from_id] = NodeRecord(from_id)
                     print(f"\n🎯 NEW NODE DISCOVERED: {from_id}")
-                else:
-                    self.discovered_nodes[from_id]['last_seen'] = datetime.now().isoformat()
                 
-                self.discovered_nodes[from_id]['packet_count'] += 1
+                node.heard()
+                if 'hopStart' in packet and 'hopLimit' in packet:
+                    node.hops = packet['hopStart'] - packet['hopLimit']
             
             # Track metrics
             self.track_metrics(packet, from_id)
             
             # Handle different message types
-            portnum = decoded.get('portnum', '')
-            
-            if portnum == 'TEXT_MESSAGE_APP':
-                text = decoded.get('text', '')
-                print(f"📨 Message from {from_id}: {text}")
-            
-            elif portnum == 'POSITION_APP':
-                self.handle_position(packet, from_id)
-            
-            elif portnum == 'NODEINFO_APP':
-                self.handle_nodeinfo(packet, from_id)
-            
-            elif portnum == 'TELEMETRY_APP':
-                self.handle_telemetry(packet, from_id)
-            
-            elif portnum == 'ROUTING_APP':
-                self.handle_routing_response(packet, from_id)
+            self.handlers.dispatch(decoded.get('portnum', ''), packet, from_id)
                 
         except Exception as e:
             print(f"Error processing packet: {e}")
@@ -108,18 +128,18 @@ class MeshCascadeDiscovery:
         with self.lock:
             metrics = self.node_metrics[node_id]
             
-            # Signal metrics
+            # Signal metrics: running averages here, history in the time series
             if 'rxSnr' in packet:
-                if 'snr_values' not in metrics:
-                    metrics['snr_values'] = []
-                metrics['snr_values'].append(packet['rxSnr'])
-                metrics['avg_snr'] = sum(metrics['snr_values']) / len(metrics['snr_values'])
+                count = metrics.get('snr_samples', 0) + 1
+                metrics['avg_snr'] = metrics.get('avg_snr', 0.0) + (packet['rxSnr'] - metrics.get('avg_snr', 0.0)) / count
+                metrics['snr_samples'] = count
+                self.timeseries.record(node_id, 'snr', packet['rxSnr'])
             
             if 'rxRssi' in packet:
-                if 'rssi_values' not in metrics:
-                    metrics['rssi_values'] = []
-                metrics['rssi_values'].append(packet['rxRssi'])
-                metrics['avg_rssi'] = sum(metrics['rssi_values']) / len(metrics['rssi_values'])
+                count = metrics.get('rssi_samples', 0) + 1
+                metrics['avg_rssi'] = metrics.get('avg_rssi', 0.0) + (packet['rxRssi'] - metrics.get('avg_rssi', 0.0)) / count
+                metrics['rssi_samples'] = count
+                self.timeseries.record(node_id, 'rssi', packet['rxRssi'])
             
             # Hop count
             if 'hopStart' in packet:
@@ -127,18 +147,22 @@ class MeshCascadeDiscovery:
                 if 'hopLimit' in packet:
                     metrics['current_hop'] = packet['hopStart'] - packet['hopLimit']
     
+    def handle_text(self, packet, node_id):
+        """Handle text messages"""
+        text = packet.get('decoded', {}).get('text', '')
+        print(f"📨 Message from {node_id}: {text}")
+    
     def handle_position(self, packet, node_id):
         """Handle position information"""
         decoded = packet.get('decoded', {})
         position = decoded.get('position', {})
         
         with self.lock:
-            self.node_metrics[node_id]['position'] = {
-                'latitude': position.get('latitude'),
-                'longitude': position.get('longitude'),
-                'altitude': position.get('altitude'),
-                'time': datetime.now().isoformat()
-            }
+            self.discovered_nodes[node_id].set_position(
+                position.get('latitude'),
+                position.get('longitude'),
+                position.get('altitude')
+            )
         
         print(f"📍 Position update from {node_id}")
     
@@ -154,6 +178,10 @@ class MeshCascadeDiscovery:
                 'macaddr': user.get('macaddr', ''),
                 'hwModel': user.get('hwModel', 'unknown')
             }
+            node = self.discovered_nodes[node_id]
+            node.name = user.get('longName', node_id)
+            node.short_name = user.get('shortName', '????')
+            node.hw_model = user.get('hwModel', 'unknown')
         
         long_name = user.get('longName', node_id)
         print(f"ℹ️  Node info: {long_name} ({node_id})")
@@ -165,7 +193,12 @@ class MeshCascadeDiscovery:
         
         with self.lock:
             if 'deviceMetrics' in telemetry:
-                self.node_metrics[node_id]['device_metrics'] = telemetry['deviceMetrics']
+                device = telemetry['deviceMetrics']
+                self.node_metrics[node_id]['device_metrics'] = device
+                self.timeseries.record(node_id, 'battery', device.get('batteryLevel'))
+                self.timeseries.record(node_id, 'voltage', device.get('voltage'))
+                self.timeseries.record(node_id, 'channel_utilization', device.get('channelUtilization'))
+                self.timeseries.record(node_id, 'air_util_tx', device.get('airUtilTx'))
             
             if 'environmentMetrics' in telemetry:
                 self.node_metrics[node_id]['environment_metrics'] = telemetry['environmentMetrics']
@@ -281,14 +314,18 @@ class MeshCascadeDiscovery:
         """Display final discovery summary"""
         print(f"\n📈 DISCOVERY SUMMARY:")
         print(f"   Total nodes found: {len(self.discovered_nodes)}")
+        print(f"   Duplicate packets skipped: {self.dedup.stats['duplicates']}")
+        if self.handlers.unhandled:
+            unhandled = ', '.join(f"{portnum} ({count})" for portnum, count in self.handlers.unhandled.items())
+            print(f"   Unhandled packet types: {unhandled}")
         print(f"   Discovery time: {time.time() - self.discovery_start_time:.1f} seconds")
         
         print("\n📋 DISCOVERED NODES:")
         with self.lock:
-            for node_id, data in self.discovered_nodes.items():
+            for node_id, node in self.discovered_nodes.items():
                 info = self.node_metrics[node_id].get('info', {})
                 name = info.get('longName', node_id)
-                packets = data['packet_count']
+                packets = node.packets
                 
                 print(f"\n   🔹 {name} ({node_id})")
                 print(f"      Packets: {packets}")
@@ -421,9 +458,14 @@ class MeshCascadeDiscovery:
             data = {
                 'discovery_time': time.time() - self.discovery_start_time,
                 'total_nodes': len(self.discovered_nodes),
+                'dedup': dict(self.dedup.stats),
                 'timestamp': datetime.now().isoformat(),
-                'nodes': self.discovered_nodes,
-                'metrics': dict(self.node_metrics)
+                'nodes': {node_id: node.to_dict() for node_id, node in self.discovered_nodes.items()},
+                'metrics': dict(self.node_metrics),
+                'timeseries': {
+                    node_id: self.timeseries.query(node_id, since=self.discovery_start_time)
+                    for node_id in self.discovered_nodes
+                }
             }
         
         try:
@@ -441,6 +483,9 @@ class MeshCascadeDiscovery:
             print("\nDisconnecting...")
             self.interface.close()
             print("✓ Disconnected")
+        
+        if self.store:
+            self.store.close()
 
 
 def main():
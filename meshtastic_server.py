@@ -5,18 +5,47 @@ WebSocket server that bridges Meshtastic hardware with web interface
 """
 
 import asyncio
+import hashlib
 import json
 import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+from collections import deque
 from datetime import datetime
-from typing import Dict, Set
+from http import HTTPStatus
+from typing import Dict
 import signal
 import sys
+import time
+import uuid
+from urllib.parse import parse_qs, urlparse
 
 import websockets
+from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
 import meshtastic
-import meshtastic.serial_interface
 from pubsub import pub
 
+from discovery_engine import DiscoveryEngine
+from fanout_workers import FanoutHub, HubLink
+from mesh_topology import MeshTopology
+from message_history import MessageHistory, epoch_seconds
+from metrics import CONTENT_TYPE, MetricsRegistry
+from node_record import NodeRecord
+from packet_dedup import PacketDedup
+from packet_handlers import PacketHandlers
+from packet_store import PacketStore
+from radio_worker import RadioWorker
+from spatial_index import SpatialIndex
+from static_assets import DEFAULT_FILES, StaticAssets
+import wire_protocol
+from subscriptions import EVENT_TYPES, SubscriptionFilter
+from timeseries import TimeSeriesStore
+from tx_scheduler import (
+    TxScheduler, PRIORITY_DM, PRIORITY_BROADCAST, PRIORITY_DISCOVERY, PRIORITY_BULK
+)
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -25,233 +54,1204 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+SLOW_CLIENT_POLICIES = ('drop_oldest', 'collapse', 'disconnect')
+MERGEABLE_TYPES = ('node_update', 'batch_update', 'stats_update')
+
+# Commands a fan-out worker answers from its own state; all others run in
+# the main process
+WORKER_COMMANDS = ('subscribe', 'set_viewport', 'nodes_in_bbox', 'nodes_in_radius',
+                   'nearest_nodes', 'client_stats')
+
+
+def merge_updates(frames):
+    """Fold node, batch and stats update frames into one batch_update frame"""
+    nodes = {}
+    messages = []
+    stats = None
+    seq = None
+    
+    for data in frames:
+        frame_type = data.get('type')
+        if frame_type == 'node_update':
+            nodes[data['node'].id] = data['node']
+        elif frame_type == 'batch_update':
+            for node in data['nodes']:
+                nodes[node.id] = node
+            messages.extend(data['messages'])
+            stats = data['stats']
+        elif frame_type == 'stats_update':
+            stats = data['stats']
+        seq = data.get('seq', seq)
+    
+    frame = {
+        'type': 'batch_update',
+        'nodes': list(nodes.values()),
+        'messages': messages,
+        'stats': stats
+    }
+    if seq is not None:
+        frame['seq'] = seq
+    return frame
+
+
+class ClientSession:
+    """Bounded outbound queue and writer task for one WebSocket client"""
+    
+    def __init__(self, websocket, fanout_stats, max_queue=256, policy='collapse',
+                 encoding='json', fragments=None):
+        self.websocket = websocket
+        self.fanout_stats = fanout_stats
+        self.max_queue = max_queue
+        self.policy = policy
+        self.encoding = encoding
+        self.fragments = fragments
+        self.filter = None
+        
+        self.queue = deque()
+        self.wakeup = asyncio.Event()
+        self.room = asyncio.Event()
+        self.writer_task = None
+        self.closed = False
+        self.stats = {
+            'sent': 0,
+            'dropped': 0,
+            'collapsed': 0,
+            'max_depth': 0
+        }
+    
+    def start(self):
+        """Start the writer task"""
+        self.fanout_stats['tasks_created'] += 1
+        self.writer_task = asyncio.create_task(self.writer())
+    
+    def send(self, data):
+        """Serialize and queue a frame for this client only"""
+        self.enqueue(data, wire_protocol.encode(data, self.encoding, self.fragments))
+    
+    def enqueue(self, data, payload):
+        """Queue an already-serialized frame, applying the slow-client policy"""
+        if self.closed:
+            return
+        
+        if len(self.queue) >= self.max_queue:
+            self.handle_overflow()
+            if self.closed:
+                return
+        
+        self.queue.append((data, payload))
+        self.stats['max_depth'] = max(self.stats['max_depth'], len(self.queue))
+        self.wakeup.set()
+    
+    def handle_overflow(self):
+        """Make room in a full queue according to the configured policy"""
+        if self.policy == 'disconnect':
+            logger.warning(f"Disconnecting slow client {self.websocket.remote_address}")
+            self.drop(len(self.queue))
+            self.close()
+            self.fanout_stats['tasks_created'] += 1
+            asyncio.create_task(self.websocket.close(code=1013, reason='slow consumer'))
+            return
+        
+        if self.policy == 'collapse':
+            self.collapse()
+        
+        if len(self.queue) >= self.max_queue:
+            self.drop(len(self.queue) - self.max_queue + 1)
+    
+    def drop(self, count):
+        """Drop the oldest queued frames"""
+        for _ in range(count):
+            self.queue.popleft()
+        self.stats['dropped'] += count
+        self.fanout_stats['frames_dropped'] += count
+    
+    def collapse(self):
+        """Merge each run of queued node and batch updates into one frame with the latest state per node"""
+        # Only neighbouring updates are merged, so an update never moves
+        # ahead of a system or reply frame that was queued before it
+        kept = deque()
+        run = []
+        collapsed = 0
+        for item in list(self.queue) + [None]:
+            if item is not None and item[0].get('type') in MERGEABLE_TYPES:
+                run.append(item)
+                continue
+            
+            if len(run) > 1:
+                frame = merge_updates(data for data, _ in run)
+                kept.append((frame, wire_protocol.encode(frame, self.encoding)))
+                collapsed += len(run) - 1
+            else:
+                kept.extend(run)
+            run = []
+            if item is not None:
+                kept.append(item)
+        
+        if collapsed:
+            self.queue = kept
+            self.stats['collapsed'] += collapsed
+    
+    async def writer(self):
+        """Send queued frames to the client one at a time"""
+        try:
+            while not self.closed:
+                if not self.queue:
+                    self.wakeup.clear()
+                    await self.wakeup.wait()
+                    continue
+                
+                _, payload = self.queue.popleft()
+                if len(self.queue) <= self.max_queue // 2:
+                    self.room.set()
+                await self.websocket.send(payload)
+                self.stats['sent'] += 1
+                self.fanout_stats['frames_sent'] += 1
+        except websockets.exceptions.ConnectionClosed:
+            pass
+        except Exception as e:
+            self.fanout_stats['send_errors'] += 1
+            logger.error(f"Error sending to client: {e}")
+    
+    async def wait_writable(self):
+        """Wait until the queue is at most half full (for bulk senders like export)"""
+        while len(self.queue) > self.max_queue // 2 and not self.closed:
+            self.room.clear()
+            await self.room.wait()
+    
+    def close(self):
+        """Stop the writer and discard anything still queued"""
+        self.closed = True
+        self.queue.clear()
+        self.wakeup.set()
+        self.room.set()
+    
+    def describe(self):
+        """Per-client queue statistics"""
+        return {
+            'address': str(self.websocket.remote_address),
+            'encoding': self.encoding,
+            'filter': self.filter.describe() if self.filter else None,
+            'policy': self.policy,
+            'queue_depth': len(self.queue),
+            **self.stats
+        }
+
+
 class MeshtasticServer:
     """WebSocket server that connects Meshtastic device to web clients"""
     
-    def __init__(self, port='/dev/ttyACM0', ws_host='localhost', ws_port=8765):
-        self.port = port
+    def __init__(self, port='/dev/ttyACM0', ws_host='localhost', ws_port=8765,
+                 batch_window=0.1, client_queue_size=256, slow_client_policy='collapse',
+                 ingest_batch_size=200, history_size=1000, history_overflow_path=None,
+                 db_path=None, export_chunk_size=64 * 1024, compression=True, journal_size=2000,
+                 region='US', modem_preset='LONG_FAST',
+                 tx_share=0.5, discovery_share=0.8, bulk_share=0.5,
+                 dedup_window=60.0, dedup_size=10000, merge_duplicates=True, link_window=600.0,
+                 metrics_path='/metrics', plugins=(), disabled_handlers=(),
+                 discovery_window=8, discovery_retries=2, fanout_workers=0,
+                 static_dir=None, static_files=DEFAULT_FILES):
+        if slow_client_policy not in SLOW_CLIENT_POLICIES:
+            raise ValueError(f"Unknown slow client policy: {slow_client_policy}")
+        
+        # One port or a list of ports; the first is the primary radio
+        self.ports = [port] if isinstance(port, str) else list(port)
+        self.port = self.ports[0]
         self.ws_host = ws_host
         self.ws_port = ws_port
         
-        self.interface = None
-        self.connected_clients: Set[websockets.WebSocketServerProtocol] = set()
+        # One radio worker per port, each owning its serial interface on
+        # its own thread
+        self.radios = {
+            radio_port: RadioWorker(radio_port, on_change=self.on_radio_change)
+            for radio_port in self.ports
+        }
+        
+        # Rebroadcast copies and copies heard by several radios are
+        # recognized by (from, id) and only processed once
+        self.dedup = PacketDedup(dedup_window, dedup_size)
+        self.merge_duplicates = merge_duplicates
+        
+        # How old a per-radio link reading may be when picking the radio to
+        # send through
+        self.link_window = link_window
+        self.connected_clients: Dict[websockets.WebSocketServerProtocol, ClientSession] = {}
+        self.client_queue_size = client_queue_size
+        self.slow_client_policy = slow_client_policy
+        self.compression = compression
         
         # Data storage
         self.nodes = {}
-        self.messages = []
+        self.messages = MessageHistory(history_size, history_overflow_path)
         self.stats = {
             'total_messages': 0,
             'total_nodes': 0,
-            'start_time': datetime.now().isoformat()
+            'start_time': datetime.now().isoformat(),
+            'radios': {radio.port: radio.describe() for radio in self.radios.values()}
         }
         
-        # Discovery state
-        self.discovery_active = False
-        self.pending_pings = set()
+        # Batched fan-out state: changes are merged per node and flushed
+        # to clients as one compound frame every batch_window seconds
+        self.batch_window = batch_window
+        self.pending_nodes = {}
+        self.pending_portnums = {}
+        self.pending_moves = {}
+        self.pending_messages = []
+        self.stats_dirty = False
+        self.fanout_stats = {
+            'updates_queued': 0,
+            'updates_coalesced': 0,
+            'frames_broadcast': 0,
+            'frames_sent': 0,
+            'frames_dropped': 0,
+            'frames_filtered': 0,
+            'tasks_created': 0,
+            'send_errors': 0,
+            'snapshots': 0,
+            'resumes': 0
+        }
+        self.stats['fanout'] = self.fanout_stats
+        self.flush_task = None
+        
+        # Encoded nodes are cached per encoding and spliced into init,
+        # batch and export frames until queue_node_update reports a change
+        self.fragments = wire_protocol.FragmentCache()
+        
+        # Bounded per-node metric history with rollups for charts
+        self.timeseries = TimeSeriesStore()
+        self.stats['timeseries'] = self.timeseries.stats
+        
+        # Grid index over node positions for map queries and viewports
+        self.spatial = SpatialIndex()
+        self.stats['spatial'] = self.spatial.stats
+        
+        # Every batch_update is stamped with a sequence number and kept in a
+        # bounded journal so reconnecting clients can fetch only what they
+        # missed. instance_id changes on restart, invalidating old cursors.
+        self.seq = 0
+        self.journal = deque(maxlen=journal_size)
+        self.instance_id = uuid.uuid4().hex[:12]
+        
+        # Ingest bridge: the meshtastic reader thread only appends raw events
+        # here; a single consumer on the event loop owns all state changes
+        self.loop = None
+        self.ingest_queue = deque()
+        self.ingest_event = None
+        self.ingest_wakeup_pending = False
+        self.ingest_batch_size = ingest_batch_size
+        self.ingest_task = None
+        
+        # Events from an interface that is still being opened, held until
+        # its radio worker knows it (see radio_for)
+        self.unclaimed_events = deque(maxlen=10000)
+        self.ingest_stats = {
+            'events_received': 0,
+            'batches': 0,
+            'max_backlog': 0
+        }
+        self.stats['ingest'] = self.ingest_stats
+        self.stats['dedup'] = self.dedup.stats
+        
+        # Streaming export
+        self.export_chunk_size = export_chunk_size
+        self.export_counter = 0
+        
+        # Durable packet log (optional)
+        self.store = PacketStore(db_path) if db_path else None
+        if self.store:
+            self.stats['store'] = self.store.stats
+        
+        # All outbound radio traffic goes through one paced priority queue
+        # that shares a single airtime budget; discovery probes and bulk
+        # pings may use only part of it
+        self.tx = TxScheduler(
+            region=region,
+            modem_preset=modem_preset,
+            tx_share=tx_share,
+            discovery_share=discovery_share,
+            bulk_share=bulk_share,
+            on_change=self.on_tx_change
+        )
+        self.tx_dirty = True
+        self.my_node_ids = set()
+        self.gateway_ids = {}
+        
+        # Link graph with fewest-hop and most-reliable paths from the
+        # gateway radios, updated as packets arrive
+        self.topology = MeshTopology()
+        self.stats['topology'] = self.topology.stats
+        
+        # Discovery probes a bounded window of nodes at a time; acks come
+        # back through the routing handler. Every start_discovery joins the
+        # run already in progress, if any.
+        self.discovery = DiscoveryEngine(self.send_probe, window=discovery_window, retries=discovery_retries)
+        self.discovery_task = None
+        self.stats['discovery'] = self.discovery.stats
+        
+        # Prometheus-style metrics, served over plain HTTP on the WebSocket
+        # port at metrics_path (None disables the endpoint)
+        self.metrics_path = metrics_path
+        self.pending_received = {}
+        
+        # Web pages served on the WebSocket port, read and compressed once
+        # here (static_dir=None disables them)
+        self.static_dir = static_dir
+        self.static_files = static_files
+        self.static = StaticAssets(static_dir, static_files) if static_dir else None
+        
+        # Optional fan-out worker processes that share the WebSocket port
+        # (SO_REUSEPORT) and serve the clients; this process then only
+        # feeds them through the hub. hub_link is set inside a worker.
+        self.fanout_workers = fanout_workers
+        self.hub = None
+        self.hub_link = None
+        self.fanout_dir = None
+        self.worker_processes = []
+        self.supervisor_task = None
+        
+        # Portnum dispatch table; plugins register handlers for other apps
+        self.handlers = PacketHandlers(disabled_handlers)
+        self.setup_handlers()
+        for plugin in plugins:
+            self.handlers.load_plugin(plugin, self)
+        
+        self.setup_metrics()
         
+    def setup_handlers(self):
+        """Register the built-in portnum handlers"""
+        table = (
+            ('text', 'TEXT_MESSAGE_APP',
+             lambda packet, from_id: self.handle_text_message(from_id, packet['decoded'].get('text', ''))),
+            ('position', 'POSITION_APP',
+             lambda packet, from_id: self.handle_position(from_id, packet['decoded'].get('position', {}))),
+            ('nodeinfo', 'NODEINFO_APP',
+             lambda packet, from_id: self.handle_nodeinfo(from_id, packet['decoded'].get('user', {}))),
+            ('telemetry', 'TELEMETRY_APP',
+             lambda packet, from_id: self.handle_telemetry(from_id, packet['decoded'].get('telemetry', {}))),
+            ('routing', 'ROUTING_APP', self.discovery.on_routing),
+            ('neighbors', 'NEIGHBORINFO_APP', self.topology.observe_neighbors),
+            ('traceroute', 'TRACEROUTE_APP', self.topology.observe_traceroute)
+        )
+        for name, portnum, func in table:
+            self.handlers.register(portnum, func, name)
+    
+    def setup_metrics(self):
+        """Register hot-path histograms and counters plus gauges read from live state"""
+        registry = self.metrics = MetricsRegistry('meshtastic_')
+        self.started = time.time()
+        
+        self.packets_metric = registry.counter(
+            'packets_total', 'Decoded packets processed (first copies)', ['portnum'])
+        self.ingest_wait_metric = registry.histogram(
+            'ingest_wait_seconds', 'Time packets wait between the radio thread and the event loop')
+        self.handler_metric = registry.histogram(
+            'handler_seconds', 'Time spent processing one packet', ['portnum'])
+        self.latency_metric = registry.histogram(
+            'update_latency_seconds', 'Time from packet receipt to the batch_update that carries it')
+        self.broadcast_metric = registry.histogram(
+            'broadcast_seconds', 'Time to filter, encode and queue one frame for every client', ['type'])
+        self.radio_send_metric = registry.histogram(
+            'radio_send_seconds', 'Duration of sends through a radio', ['radio', 'result'])
+        
+        registry.counter(
+            'duplicate_packets_total', 'Rebroadcast or multi-radio copies skipped',
+            collect=lambda: self.dedup.stats['duplicates'])
+        registry.counter(
+            'ingest_events_total', 'Events handed over by the radio threads',
+            collect=lambda: self.ingest_stats['events_received'])
+        registry.gauge(
+            'ingest_backlog', 'Events waiting for the event loop',
+            collect=lambda: len(self.ingest_queue))
+        registry.gauge(
+            'nodes', 'Known nodes', collect=lambda: len(self.nodes))
+        registry.counter(
+            'messages_total', 'Text messages received', collect=lambda: self.stats['total_messages'])
+        registry.gauge(
+            'clients', 'Connected WebSocket clients',
+            collect=lambda: len(self.connected_clients) + self.worker_total('clients'))
+        registry.gauge(
+            'client_queue_frames', 'Frames queued across all clients',
+            collect=lambda: sum(len(session.queue) for session in self.connected_clients.values())
+            + self.worker_total('queue_frames'))
+        registry.counter(
+            'frames_total', 'Client frame outcomes', ['outcome'],
+            collect=lambda: {
+                (outcome,): self.fanout_stats[key] + self.worker_total(key)
+                for outcome, key in (
+                    ('sent', 'frames_sent'), ('dropped', 'frames_dropped'),
+                    ('filtered', 'frames_filtered'), ('failed', 'send_errors')
+                )
+            })
+        registry.gauge(
+            'fanout_worker_clients', 'Clients connected to each fan-out worker', ['worker'],
+            collect=lambda: {
+                (str(index),): status.get('clients', 0)
+                for index, status in (self.hub.describe().items() if self.hub else ())
+            })
+        registry.gauge(
+            'radio_connected', 'Whether each radio is connected', ['radio'],
+            collect=lambda: {(port,): int(radio.connected) for port, radio in self.radios.items()})
+        registry.counter(
+            'radio_disconnects_total', 'Serial links lost', ['radio'],
+            collect=lambda: {(port,): radio.stats['disconnects'] for port, radio in self.radios.items()})
+        registry.counter(
+            'radio_send_errors_total', 'Failed sends per radio', ['radio'],
+            collect=lambda: {(port,): radio.stats['send_errors'] for port, radio in self.radios.items()})
+        registry.gauge(
+            'tx_queue_depth', 'Transmissions waiting for airtime', collect=lambda: self.tx.queue_depth)
+        registry.counter(
+            'tx_total', 'Transmissions by outcome', ['result'],
+            collect=lambda: {('sent',): self.tx.stats['sent'], ('failed',): self.tx.stats['failed']})
+        registry.counter(
+            'packet_handler_calls_total', 'Calls per packet handler', ['handler'],
+            collect=lambda: {(h.name,): h.calls for h in self.handlers.handlers.values()})
+        registry.counter(
+            'packet_handler_errors_total', 'Exceptions raised by each packet handler', ['handler'],
+            collect=lambda: {(h.name,): h.errors for h in self.handlers.handlers.values()})
+        registry.counter(
+            'packet_handler_seconds_total', 'Time spent in each packet handler', ['handler'],
+            collect=lambda: {(h.name,): h.seconds for h in self.handlers.handlers.values()})
+        registry.counter(
+            'unhandled_packets_total', 'Packets whose portnum has no enabled handler', ['portnum'],
+            collect=lambda: {(portnum,): count for portnum, count in self.handlers.unhandled.items()})
+        registry.counter(
+            'discovery_probes_total', 'Discovery probes by outcome', ['outcome'],
+            collect=lambda: {
+                (outcome,): self.discovery.stats[key]
+                for outcome, key in (('sent', 'probes'), ('ack', 'acks'), ('nak', 'naks'), ('timeout', 'timeouts'))
+            })
+        registry.gauge(
+            'discovery_reachable_nodes', 'Nodes that answered their last discovery probe',
+            collect=lambda: sum(1 for link in self.discovery.links.values() if link.reachable))
+        registry.counter(
+            'store_packets_written_total', 'Packets written to the SQLite store',
+            collect=lambda: self.store.stats['packets_written'] if self.store else 0)
+        registry.counter(
+            'store_write_errors_total', 'Failed packet store transactions',
+            collect=lambda: self.store.stats['write_errors'] if self.store else 0)
+        registry.gauge(
+            'store_queue_depth', 'Writes waiting for the packet store thread',
+            collect=lambda: self.store.queue.qsize() if self.store else 0)
+        registry.gauge(
+            'topology_links', 'Links in the mesh topology graph',
+            collect=lambda: self.topology.stats['links'])
+        registry.gauge(
+            'uptime_seconds', 'Seconds since the server started',
+            collect=lambda: round(time.time() - self.started, 3))
+    
+    def worker_total(self, key):
+        """Sum of a client counter across fan-out workers (0 without any)"""
+        return self.hub.total(key) if self.hub else 0
+    
+    async def process_request(self, path, request_headers):
+        """Answer plain HTTP page loads and metrics scrapes before the WebSocket handshake"""
+        url_path = urlparse(path).path
+        if not self.metrics_path or url_path != self.metrics_path:
+            # Upgrade requests for / go on to the handshake
+            if self.static and 'Upgrade' not in request_headers:
+                return self.static.respond(url_path, request_headers)
+            return None
+        if self.hub_link:
+            # Metrics describe the main process, which has the radios
+            text = await self.hub_link.request('metrics')
+        else:
+            text = self.metrics.render()
+        body = text.encode('utf-8')
+        return HTTPStatus.OK, [('Content-Type', CONTENT_TYPE), ('Content-Length', str(len(body)))], body
+    
     async def start(self):
         """Start the server and connect to Meshtastic device"""
         logger.info("Starting Meshtastic Command Center Server...")
         
-        # Connect to Meshtastic device
-        try:
-            logger.info(f"Connecting to Meshtastic device on {self.port}...")
-            self.interface = meshtastic.serial_interface.SerialInterface(self.port)
-            
-            # Subscribe to Meshtastic events
-            pub.subscribe(self.on_receive, "meshtastic.receive")
-            pub.subscribe(self.on_connection, "meshtastic.connection.established")
-            
-            logger.info("✓ Connected to Meshtastic device")
-            
-            # Wait for connection to stabilize
-            await asyncio.sleep(2)
-            
-        except Exception as e:
-            logger.error(f"Failed to connect to Meshtastic device: {e}")
-            logger.info("Server will run in demo mode")
+        # Start the ingest consumer before any packets can arrive
+        self.loop = asyncio.get_running_loop()
+        self.ingest_event = asyncio.Event()
+        self.ingest_task = asyncio.create_task(self.ingest_events())
+        self.fanout_stats['tasks_created'] += 1
+        
+        # Rebuild state from the packet store
+        if self.store:
+            await self.restore_state()
+            self.store.start()
+        
+        # Subscribe to Meshtastic events
+        pub.subscribe(self.on_receive, "meshtastic.receive")
+        pub.subscribe(self.on_connection, "meshtastic.connection.established")
+        for radio in self.radios.values():
+            pub.subscribe(radio.on_connection_lost, "meshtastic.connection.lost")
+        
+        # Connect to every Meshtastic device, each on its own radio thread
+        await asyncio.gather(*(self.connect_radio(radio) for radio in self.radios.values()))
+        if not self.radio_connected():
+            logger.info("Server will run in demo mode and keep retrying in the background")
         
-        # Start WebSocket server
+        # Start the transmit scheduler
+        self.tx.start()
+        self.fanout_stats['tasks_created'] += 1
+        
+        # Start batched fan-out
+        self.flush_task = asyncio.create_task(self.flush_updates())
+        self.fanout_stats['tasks_created'] += 1
+        
+        if self.fanout_workers:
+            # The workers own the WebSocket port; this process feeds them
+            await self.start_fanout()
+            await asyncio.Future()
+        else:
+            await self.serve_clients()
+    
+    async def serve_clients(self, reuse_port=False):
+        """Run the WebSocket server until cancelled"""
         logger.info(f"Starting WebSocket server on {self.ws_host}:{self.ws_port}")
-        async with websockets.serve(self.handle_client, self.ws_host, self.ws_port):
+        # permessage-deflate is negotiated per connection; a small window keeps
+        # per-client memory low while still shrinking init and export frames
+        extensions = []
+        if self.compression:
+            extensions.append(ServerPerMessageDeflateFactory(
+                server_max_window_bits=11,
+                client_max_window_bits=11,
+                compress_settings={'memLevel': 4}
+            ))
+        
+        async with websockets.serve(
+            self.handle_client,
+            self.ws_host,
+            self.ws_port,
+            subprotocols=wire_protocol.available_subprotocols(),
+            extensions=extensions,
+            compression=None,
+            process_request=self.process_request,
+            reuse_port=reuse_port
+        ):
             logger.info("✓ WebSocket server running")
-            logger.info(f"Open http://{self.ws_host}:{self.ws_port} in your browser")
+            if self.metrics_path:
+                logger.info(f"Metrics at http://{self.ws_host}:{self.ws_port}{self.metrics_path}")
+            if self.static and '/' in self.static.assets:
+                logger.info(f"Open http://{self.ws_host}:{self.ws_port}/ in your browser")
             
             # Run forever
             await asyncio.Future()
     
+    async def start_fanout(self):
+        """Start the hub and the fan-out worker processes"""
+        # mkdtemp makes a 0700 directory, so only this user can reach the socket
+        self.fanout_dir = tempfile.mkdtemp(prefix='meshtastic-fanout-')
+        path = os.path.join(self.fanout_dir, 'hub.sock')
+        self.hub = FanoutHub(path, self.replica_state, self.handle_command, self.answer_worker_request)
+        self.stats['fanout_workers'] = self.hub.stats
+        await self.hub.start()
+        
+        self.worker_processes = [self.spawn_worker(index) for index in range(self.fanout_workers)]
+        self.supervisor_task = asyncio.create_task(self.supervise_workers())
+        self.fanout_stats['tasks_created'] += 1
+        logger.info(f"✓ Started {self.fanout_workers} fan-out workers on {self.ws_host}:{self.ws_port}")
+    
+    def spawn_worker(self, index):
+        """Start one worker process serving clients from a replica of this one"""
+        options = {
+            'port': self.ports,
+            'ws_host': self.ws_host,
+            'ws_port': self.ws_port,
+            'client_queue_size': self.client_queue_size,
+            'slow_client_policy': self.slow_client_policy,
+            'history_size': self.messages.capacity,
+            'compression': self.compression,
+            'journal_size': self.journal.maxlen,
+            'metrics_path': self.metrics_path,
+            'static_dir': self.static_dir,
+            'static_files': self.static_files
+        }
+        # spawn rather than fork: the radio threads must not be copied
+        process = multiprocessing.get_context('spawn').Process(
+            target=run_fanout_worker,
+            args=(index, self.hub.path, options),
+            name=f'fanout-worker-{index}',
+            daemon=True
+        )
+        process.start()
+        return process
+    
+    async def supervise_workers(self):
+        """Restart worker processes that exit"""
+        while True:
+            await asyncio.sleep(5)
+            for index, process in enumerate(self.worker_processes):
+                if not process.is_alive():
+                    logger.warning(f"Fan-out worker {index} exited ({process.exitcode}); restarting it")
+                    self.worker_processes[index] = self.spawn_worker(index)
+    
+    def replica_state(self):
+        """Everything a new worker needs to answer snapshots and resumes"""
+        return {
+            'instance_id': self.instance_id,
+            'seq': self.seq,
+            'nodes': self.nodes,
+            'messages': list(self.messages),
+            'journal': list(self.journal),
+            'stats': self.stats
+        }
+    
+    def answer_worker_request(self, name):
+        """Data a worker fetches on behalf of an HTTP request"""
+        if name == 'metrics':
+            return self.metrics.render()
+        raise ValueError(f"Unknown worker request: {name}")
+    
+    async def serve_worker(self, index, hub_path):
+        """Fan-out worker: mirror the main process's state and serve clients"""
+        self.loop = asyncio.get_running_loop()
+        self.hub_link = HubLink(hub_path, index, self.apply_frame)
+        self.apply_sync(await self.hub_link.connect())
+        
+        link_task = asyncio.create_task(self.hub_link.run())
+        status_task = asyncio.create_task(self.report_status())
+        serve_task = asyncio.create_task(self.serve_clients(reuse_port=True))
+        
+        # Without the main process there is nothing left to serve
+        await asyncio.wait((link_task, serve_task), return_when=asyncio.FIRST_COMPLETED)
+        logger.info(f"Fan-out worker {index} stopping")
+        for task in (link_task, status_task, serve_task):
+            task.cancel()
+    
+    def apply_sync(self, state):
+        """Take over the main process's state when a worker starts"""
+        self.instance_id = state['instance_id']
+        self.seq = state['seq']
+        self.stats = state['stats']
+        self.nodes = state['nodes']
+        for message in state['messages']:
+            self.messages.replicate(message)
+        self.journal.extend(state['journal'])
+        for node in self.nodes.values():
+            self.spatial.update(node.id, node.latitude, node.longitude)
+    
+    def apply_frame(self, frame, node_portnums=None, moved_from=None):
+        """Fold a batch_update from the main process into the replica, then fan it out"""
+        if frame.get('type') == 'batch_update':
+            for node in frame['nodes']:
+                self.fragments.invalidate(node.id)
+                self.nodes[node.id] = node
+                self.spatial.update(node.id, node.latitude, node.longitude)
+            for message in frame['messages']:
+                self.messages.replicate(message)
+            self.seq = frame['seq']
+            self.stats = frame['stats']
+            self.journal.append(frame)
+        self.publish(frame, node_portnums, moved_from)
+    
+    async def report_status(self):
+        """Send this worker's client counters to the main process for metrics"""
+        while True:
+            self.hub_link.send(('status', {
+                'clients': len(self.connected_clients),
+                'queue_frames': sum(len(session.queue) for session in self.connected_clients.values()),
+                **self.fanout_stats,
+                **self.hub_link.stats
+            }))
+            await asyncio.sleep(1)
+    
+    async def restore_state(self):
+        """Load nodes and recent messages saved by a previous run"""
+        nodes, messages, total_messages = await self.loop.run_in_executor(
+            None, self.load_stored_state
+        )
+        
+        self.nodes.update((node_id, NodeRecord.from_dict(node)) for node_id, node in nodes.items())
+        for node in self.nodes.values():
+            self.spatial.update(node.id, node.latitude, node.longitude)
+        for message in messages:
+            self.messages.append(message)
+        self.stats['total_nodes'] = len(self.nodes)
+        self.stats['total_messages'] = total_messages
+        
+        logger.info(f"Restored {len(nodes)} nodes and {len(messages)} messages from {self.store.path}")
+    
+    def load_stored_state(self):
+        """Read saved state (runs in an executor)"""
+        return (
+            self.store.load_nodes(),
+            self.store.load_messages(self.messages.capacity),
+            self.store.count_messages()
+        )
+    
+    async def connect_radio(self, radio):
+        """Connect one radio at startup, falling back to background retries"""
+        try:
+            logger.info(f"Connecting to Meshtastic device on {radio.port}...")
+            await radio.connect()
+            logger.info(f"✓ Connected to Meshtastic device on {radio.port}")
+        except Exception as e:
+            logger.error(f"Failed to connect to Meshtastic device on {radio.port}: {e}")
+            radio.start_reconnect()
+    
+    def radio_for(self, interface):
+        """
+        Port of the radio that owns a Meshtastic interface, or None when it
+        may belong to a radio that is still opening it: SerialInterface()
+        delivers packets before the constructor returns and the worker can
+        record the interface
+        """
+        if interface is None:
+            return self.port
+        for radio in self.radios.values():
+            if radio.interface is interface:
+                return radio.port
+        if any(radio.state in ('connecting', 'reconnecting') for radio in self.radios.values()):
+            return None
+        return self.port
+    
+    def claim_events(self):
+        """Replay held events now that another radio has recorded its interface"""
+        events = self.unclaimed_events
+        self.unclaimed_events = deque(maxlen=events.maxlen)
+        for kind, payload in events:
+            self.process_event(kind, payload)
+    
+    def radio_connected(self):
+        """Whether at least one radio is connected"""
+        return any(radio.connected for radio in self.radios.values())
+    
+    def pick_radio(self, destination=None):
+        """
+        Connected radio to send through: the one that heard the destination
+        best within link_window, otherwise the first connected radio
+        """
+        connected = [radio for radio in self.radios.values() if radio.connected]
+        if not connected:
+            raise ConnectionError("No Meshtastic radio connected")
+        
+        node = self.nodes.get(destination) if destination else None
+        links = (node.radios or {}) if node else {}
+        cutoff = time.time() - self.link_window
+        best = None
+        for radio in connected:
+            link = links.get(radio.port)
+            if not link or link['time'] < cutoff or link.get('snr') is None:
+                continue
+            if best is None or link['snr'] > links[best.port]['snr']:
+                best = radio
+        
+        return best or connected[0]
+    
     def on_connection(self, interface, topic=None):
-        """Handle Meshtastic connection established"""
-        logger.info("Meshtastic connection established")
-        asyncio.create_task(self.broadcast_to_clients({
-            'type': 'system_message',
-            'from': 'System',
-            'text': '✓ Meshtastic device connected',
-            'timestamp': datetime.now().isoformat()
-        }))
+        """Handle Meshtastic connection established (called from the reader thread)"""
+        self.submit_event('connection', interface)
     
     def on_receive(self, packet, interface=None):
-        """Handle incoming Meshtastic packets"""
+        """Handle incoming Meshtastic packets (called from the reader thread)"""
+        self.submit_event('packet', (packet, interface, time.monotonic()))
+    
+    def submit_event(self, kind, payload):
+        """Hand a raw event from the reader thread to the event loop"""
+        if self.loop is None:
+            # Not serving yet (e.g. driven directly from a script), so there
+            # is no other thread to race with
+            self.process_event(kind, payload)
+            return
+        
+        # deque.append is atomic; only wake the loop if the consumer has
+        # not already been woken for an earlier event
+        self.ingest_queue.append((kind, payload))
+        if not self.ingest_wakeup_pending:
+            self.ingest_wakeup_pending = True
+            try:
+                self.loop.call_soon_threadsafe(self.ingest_event.set)
+            except RuntimeError:
+                # Loop already closed during shutdown
+                pass
+    
+    async def ingest_events(self):
+        """Drain queued reader-thread events in batches on the event loop"""
+        while True:
+            await self.ingest_event.wait()
+            self.ingest_event.clear()
+            self.ingest_wakeup_pending = False
+            
+            backlog = len(self.ingest_queue)
+            self.ingest_stats['max_backlog'] = max(self.ingest_stats['max_backlog'], backlog)
+            
+            processed = 0
+            while self.ingest_queue:
+                kind, payload = self.ingest_queue.popleft()
+                self.process_event(kind, payload)
+                processed += 1
+                
+                # Yield between batches so client I/O keeps flowing
+                if processed % self.ingest_batch_size == 0:
+                    self.ingest_stats['batches'] += 1
+                    await asyncio.sleep(0)
+            
+            if processed % self.ingest_batch_size:
+                self.ingest_stats['batches'] += 1
+    
+    def process_event(self, kind, payload):
+        """Apply one reader-thread event to server state"""
+        interface = payload[1] if kind == 'packet' else payload
+        radio_port = self.radio_for(interface)
+        if radio_port is None:
+            self.unclaimed_events.append((kind, payload))
+            return
+        self.ingest_stats['events_received'] += 1
+        
+        if kind == 'packet':
+            packet, _, received = payload
+            self.ingest_wait_metric.observe(time.monotonic() - received)
+            self.process_packet(packet, radio_port, received)
+        elif kind == 'connection':
+            logger.info(f"Meshtastic connection established on {radio_port}")
+            try:
+                gateway_id = payload.getMyUser().get('id')
+                self.my_node_ids.add(gateway_id)
+                self.gateway_ids[radio_port] = gateway_id
+                self.topology.add_root(gateway_id)
+            except Exception:
+                pass
+            self.publish({
+                'type': 'system_message',
+                'from': 'System',
+                'text': f'✓ Meshtastic device connected on {radio_port}',
+                'timestamp': datetime.now().isoformat()
+            })
+    
+    def process_packet(self, packet, radio_port=None, received=None):
+        """Update node state from one decoded packet"""
+        started = time.perf_counter()
         try:
             if 'decoded' not in packet:
                 return
             
             from_id = packet.get('fromId', 'unknown')
             decoded = packet['decoded']
+            radio_port = radio_port or self.port
+            
+            # Only the first copy of a packet runs the handlers; later copies
+            # can still improve hop and link data
+            duplicate, new_source = self.dedup.check(packet, radio_port)
+            if duplicate:
+                if self.merge_duplicates and from_id in self.nodes:
+                    self.merge_duplicate(from_id, packet, radio_port, new_source)
+                return
+            
+            if self.store:
+                self.store.append_packet(packet)
             
             # Update or create node
-            if from_id not in self.nodes:
-                self.nodes[from_id] = {
-                    'id': from_id,
-                    'name': from_id,
-                    'first_seen': datetime.now().isoformat(),
-                    'last_seen': datetime.now().isoformat(),
-                    'packets': 0
-                }
+            now = time.time()
+            node = self.nodes.get(from_id)
+            if node is None:
+                node = self.nodes[from_id] = NodeRecord(from_id, now)
                 logger.info(f"New node discovered: {from_id}")
             
-            node = self.nodes[from_id]
-            node['last_seen'] = datetime.now().isoformat()
-            node['packets'] += 1
+            node.heard(now)
             
             # Update metrics
-            if 'rxSnr' in packet:
-                node['snr'] = packet['rxSnr']
-            if 'rxRssi' in packet:
-                node['rssi'] = packet['rxRssi']
+            self.update_link(node, packet, radio_port, now)
+            self.timeseries.record(from_id, 'snr', packet.get('rxSnr'), now)
+            self.timeseries.record(from_id, 'rssi', packet.get('rxRssi'), now)
             if 'hopLimit' in packet and 'hopStart' in packet:
-                node['hops'] = packet['hopStart'] - packet['hopLimit']
+                node.hops = packet['hopStart'] - packet['hopLimit']
+            self.topology.observe_packet(packet, from_id, self.gateway_ids.get(radio_port), now)
             
             # Handle different packet types
             portnum = decoded.get('portnum', '')
+            self.packets_metric.labels(portnum).inc()
+            self.handlers.dispatch(portnum, packet, from_id)
             
-            if portnum == 'TEXT_MESSAGE_APP':
-                text = decoded.get('text', '')
-                self.handle_text_message(from_id, text)
-            
-            elif portnum == 'POSITION_APP':
-                self.handle_position(from_id, decoded.get('position', {}))
-            
-            elif portnum == 'NODEINFO_APP':
-                self.handle_nodeinfo(from_id, decoded.get('user', {}))
-            
-            elif portnum == 'TELEMETRY_APP':
-                self.handle_telemetry(from_id, decoded.get('telemetry', {}))
-            
-            # Broadcast node update to all clients
-            asyncio.create_task(self.broadcast_to_clients({
-                'type': 'node_update',
-                'node': node
-            }))
+            # Queue node update for the next batched frame
+            self.queue_node_update(from_id, portnum, received)
             
             # Update stats
             self.stats['total_nodes'] = len(self.nodes)
-            asyncio.create_task(self.broadcast_to_clients({
-                'type': 'stats_update',
-                'stats': self.stats
-            }))
+            self.stats_dirty = True
+            
+            self.handler_metric.labels(portnum).observe(time.perf_counter() - started)
             
         except Exception as e:
             logger.error(f"Error processing packet: {e}")
     
+    def merge_duplicate(self, from_id, packet, radio_port, new_source):
+        """Fold a duplicate copy's hop count and link reading into its node"""
+        node = self.nodes[from_id]
+        changed = False
+        
+        # The first radio to hear a packet already recorded its reading
+        if new_source and ('rxSnr' in packet or 'rxRssi' in packet):
+            self.update_link(node, packet, radio_port)
+            self.topology.observe_packet(packet, from_id, self.gateway_ids.get(radio_port))
+            changed = True
+        
+        # Keep the shortest path any copy took
+        if 'hopLimit' in packet and 'hopStart' in packet:
+            hops = packet['hopStart'] - packet['hopLimit']
+            if node.hops is None or hops < node.hops:
+                node.hops = hops
+                changed = True
+        
+        if changed:
+            self.queue_node_update(from_id)
+    
+    def update_link(self, node, packet, radio_port, now=None):
+        """Keep per-radio SNR/RSSI and report the best receiver's readings"""
+        if 'rxSnr' not in packet and 'rxRssi' not in packet:
+            return
+        
+        if now is None:
+            now = time.time()
+        if node.radios is None:
+            node.radios = {}
+        links = node.radios
+        links[radio_port] = {
+            'snr': packet.get('rxSnr'),
+            'rssi': packet.get('rxRssi'),
+            'time': now
+        }
+        
+        fresh = {
+            port: link for port, link in links.items()
+            if now - link['time'] < self.link_window and link['snr'] is not None
+        }
+        best = max(fresh, key=lambda port: fresh[port]['snr']) if fresh else radio_port
+        node.best_radio = best
+        node.snr = links[best]['snr']
+        node.rssi = links[best]['rssi']
+    
     def handle_text_message(self, from_id, text):
         """Handle text message"""
-        node = self.nodes.get(from_id, {})
-        name = node.get('name', from_id)
+        node = self.nodes.get(from_id)
+        name = node.name if node else from_id
         
-        message = {
+        message = self.messages.append({
             'from': name,
             'from_id': from_id,
             'text': text,
             'timestamp': datetime.now().isoformat()
-        }
+        })
         
-        self.messages.append(message)
         self.stats['total_messages'] += 1
         
         logger.info(f"Message from {name}: {text}")
         
-        asyncio.create_task(self.broadcast_to_clients({
-            'type': 'message',
-            **message
-        }))
+        self.pending_messages.append(message)
+        self.stats_dirty = True
+        
+        if self.store:
+            self.store.save_message(message)
     
     def handle_position(self, from_id, position):
         """Handle position update"""
         if from_id in self.nodes:
-            self.nodes[from_id]['position'] = {
-                'latitude': position.get('latitude'),
-                'longitude': position.get('longitude'),
-                'altitude': position.get('altitude')
-            }
+            node = self.nodes[from_id]
+            node.set_position(
+                position.get('latitude'),
+                position.get('longitude'),
+                position.get('altitude')
+            )
             
-            logger.info(f"Position update from {from_id}")
+            # Remember where the node was when clients last saw it, so
+            # viewport filters also pass the update that moves it out
+            previous = self.spatial.update(from_id, node.latitude, node.longitude)
+            if previous:
+                self.pending_moves.setdefault(from_id, previous)
             
-            asyncio.create_task(self.broadcast_to_clients({
-                'type': 'node_update',
-                'node': self.nodes[from_id]
-            }))
+            logger.debug(f"Position update from {from_id}")
+            
+            self.queue_node_update(from_id)
     
     def handle_nodeinfo(self, from_id, user):
         """Handle node info update"""
         if from_id in self.nodes:
-            self.nodes[from_id]['name'] = user.get('longName', from_id)
-            self.nodes[from_id]['short_name'] = user.get('shortName', '????')
-            self.nodes[from_id]['hw_model'] = user.get('hwModel', 'unknown')
+            node = self.nodes[from_id]
+            node.name = user.get('longName', from_id)
+            node.short_name = user.get('shortName', '????')
+            node.hw_model = user.get('hwModel', 'unknown')
             
             logger.info(f"Node info: {user.get('longName', from_id)}")
             
-            asyncio.create_task(self.broadcast_to_clients({
-                'type': 'node_update',
-                'node': self.nodes[from_id]
-            }))
+            self.queue_node_update(from_id)
     
     def handle_telemetry(self, from_id, telemetry):
         """Handle telemetry update"""
         if from_id in self.nodes:
             if 'deviceMetrics' in telemetry:
                 metrics = telemetry['deviceMetrics']
-                self.nodes[from_id]['battery'] = metrics.get('batteryLevel')
-                self.nodes[from_id]['voltage'] = metrics.get('voltage')
-                self.nodes[from_id]['channel_utilization'] = metrics.get('channelUtilization')
-                self.nodes[from_id]['air_util_tx'] = metrics.get('airUtilTx')
-            
-            asyncio.create_task(self.broadcast_to_clients({
-                'type': 'node_update',
-                'node': self.nodes[from_id]
-            }))
+                node = self.nodes[from_id]
+                node.battery = metrics.get('batteryLevel')
+                node.voltage = metrics.get('voltage')
+                node.channel_utilization = metrics.get('channelUtilization')
+                node.air_util_tx = metrics.get('airUtilTx')
+                
+                for name in NodeRecord.TELEMETRY:
+                    self.timeseries.record(from_id, name, getattr(node, name))
+                
+                # Feed channel load into transmit backoff; airtime used
+                # for TX only matters for our own radio
+                self.tx.report_utilization(
+                    metrics.get('channelUtilization'),
+                    metrics.get('airUtilTx') if from_id in self.my_node_ids else None
+                )
+            
+            self.queue_node_update(from_id)
+    
+    def queue_node_update(self, node_id, portnum=None, received=None):
+        """Mark a node as changed so it goes out with the next batched frame"""
+        self.fanout_stats['updates_queued'] += 1
+        self.fragments.invalidate(node_id)
+        if node_id in self.pending_nodes:
+            self.fanout_stats['updates_coalesced'] += 1
+        self.pending_nodes[node_id] = self.nodes[node_id]
+        
+        # Latency is measured from the oldest packet still waiting per node
+        if received is not None:
+            self.pending_received.setdefault(node_id, received)
+        
+        # Remember which apps touched the node for portnum subscriptions
+        if portnum:
+            self.pending_portnums.setdefault(node_id, set()).add(portnum)
+    
+    async def flush_updates(self):
+        """Flush pending node, message and stats changes once per batch window"""
+        while True:
+            await asyncio.sleep(self.batch_window)
+            try:
+                await self.flush_pending()
+            except Exception as e:
+                logger.error(f"Error flushing updates: {e}")
+    
+    async def flush_pending(self):
+        """Send all changes since the last tick as one batch_update frame"""
+        if not (self.pending_nodes or self.pending_messages or self.stats_dirty or self.tx_dirty):
+            return
+        
+        if self.tx_dirty:
+            self.tx_dirty = False
+            self.stats['tx'] = self.tx.status()
+        
+        nodes = list(self.pending_nodes.values())
+        messages = self.pending_messages
+        node_portnums = self.pending_portnums
+        moved_from = self.pending_moves
+        received = self.pending_received
+        self.pending_nodes = {}
+        self.pending_portnums = {}
+        self.pending_moves = {}
+        self.pending_received = {}
+        self.pending_messages = []
+        self.stats_dirty = False
+        
+        # Persist each changed node once per tick rather than per packet
+        if self.store:
+            for node in nodes:
+                self.store.save_node(node.to_dict())
+        
+        self.seq += 1
+        frame = {
+            'type': 'batch_update',
+            'seq': self.seq,
+            'nodes': nodes,
+            'messages': messages,
+            'stats': self.stats
+        }
+        self.journal.append(frame)
+        
+        self.publish(frame, node_portnums, moved_from)
+        
+        now = time.monotonic()
+        for arrived in received.values():
+            self.latency_metric.observe(now - arrived)
+    
+    def snapshot_frame(self, path):
+        """Initial frame for a new connection: missed deltas if resumable, else full state"""
+        query = parse_qs(urlparse(path or '').query)
+        resume_from = query.get('resume_from', [None])[0]
+        instance = query.get('instance', [None])[0]
+        
+        if resume_from and resume_from.isdigit() and instance == self.instance_id:
+            resume_from = int(resume_from)
+            oldest = self.journal[0]['seq'] if self.journal else self.seq + 1
+            
+            # Resumable when nothing after resume_from has rolled off the journal
+            if resume_from <= self.seq and resume_from >= oldest - 1:
+                self.fanout_stats['resumes'] += 1
+                frame = merge_updates(data for data in self.journal if data['seq'] > resume_from)
+                frame.update({
+                    'type': 'resume',
+                    'instance': self.instance_id,
+                    'from_seq': resume_from,
+                    'seq': self.seq,
+                    'stats': self.stats
+                })
+                return frame
+        
+        self.fanout_stats['snapshots'] += 1
+        return {
+            'type': 'init',
+            'instance': self.instance_id,
+            'seq': self.seq,
+            'nodes': list(self.nodes.values()),
+            'messages': self.messages.recent(50),  # Last 50 messages
+            'stats': self.stats
+        }
     
     async def handle_client(self, websocket, path):
         """Handle WebSocket client connection"""
-        logger.info(f"Client connected from {websocket.remote_address}")
-        self.connected_clients.add(websocket)
+        encoding = wire_protocol.negotiate_encoding(websocket.subprotocol, path)
+        logger.info(f"Client connected from {websocket.remote_address} ({encoding})")
+        session = ClientSession(
+            websocket,
+            self.fanout_stats,
+            max_queue=self.client_queue_size,
+            policy=self.slow_client_policy,
+            encoding=encoding,
+            fragments=self.fragments
+        )
+        self.connected_clients[websocket] = session
+        session.start()
         
         try:
-            # Send initial state to new client
-            await websocket.send(json.dumps({
-                'type': 'init',
-                'nodes': list(self.nodes.values()),
-                'messages': self.messages[-50:],  # Last 50 messages
-                'stats': self.stats
-            }))
+            # Binary clients first get the tag tables as a JSON text frame
+            if encoding != 'json':
+                description = wire_protocol.describe(encoding)
+                session.enqueue(description, wire_protocol.dumps(description))
+            
+            # Send initial state (or just the missed deltas) to new client
+            session.send(self.snapshot_frame(path))
             
             # Handle client messages
             async for message in websocket:
-                await self.handle_client_message(websocket, message)
+                await self.handle_client_message(session, message)
                 
         except websockets.exceptions.ConnectionClosed:
             logger.info(f"Client disconnected from {websocket.remote_address}")
         finally:
-            self.connected_clients.remove(websocket)
+            del self.connected_clients[websocket]
+            session.close()
+            if self.hub_link:
+                self.hub_link.session_closed(session)
     
-    async def handle_client_message(self, websocket, message):
+    async def handle_client_message(self, session, message):
         """Handle incoming messages from web client"""
         try:
-            data = json.loads(message)
+            data = wire_protocol.decode(message)
+        except json.JSONDecodeError:
+            logger.error(f"Invalid JSON received: {message}")
+            return
+        except Exception as e:
+            logger.error(f"Error handling client message: {e}")
+            return
+        
+        if self.hub_link and data.get('command') not in WORKER_COMMANDS:
+            # Radios, history and the packet store live in the main process
+            self.hub_link.forward(session, data)
+            return
+        
+        await self.handle_command(session, data)
+    
+    async def handle_command(self, session, data):
+        """Run one decoded client command (session may be a fan-out worker's client)"""
+        try:
             command = data.get('command')
             
             if command == 'start_discovery':
-                await self.start_discovery()
+                self.begin_discovery(session)
             
             elif command == 'ping_all':
                 await self.ping_all_nodes()
@@ -275,25 +1275,281 @@ class MeshtasticServer:
                 )
             
             elif command == 'export_data':
-                await websocket.send(json.dumps({
-                    'type': 'export_data',
-                    'data': {
-                        'nodes': list(self.nodes.values()),
-                        'messages': self.messages,
-                        'stats': self.stats,
-                        'timestamp': datetime.now().isoformat()
-                    }
-                }))
+                await self.stream_export(session, data)
+            
+            elif command == 'subscribe':
+                # An empty subscribe clears the filter
+                criteria = ('events', 'nodes', 'portnums', 'bbox')
+                if any(data.get(name) for name in criteria):
+                    session.filter = SubscriptionFilter.from_command(data)
+                else:
+                    session.filter = None
+                session.send({
+                    'type': 'subscribed',
+                    'filter': session.filter.describe() if session.filter else None
+                })
+            
+            elif command == 'set_viewport':
+                # Replace only the bbox of the current filter and send the
+                # nodes now in view
+                criteria = session.filter.describe() if session.filter else {}
+                if criteria.get('events') == sorted(EVENT_TYPES):
+                    criteria['events'] = None
+                criteria['bbox'] = data.get('bbox')
+                if any(criteria.values()):
+                    session.filter = SubscriptionFilter.from_command(criteria)
+                else:
+                    session.filter = None
+                bbox = session.filter.bbox if session.filter else None
+                node_ids = self.spatial.bbox(*bbox) if bbox else list(self.nodes)
+                session.send({
+                    'type': 'viewport',
+                    'filter': session.filter.describe() if session.filter else None,
+                    'nodes': [self.nodes[node_id] for node_id in node_ids if node_id in self.nodes]
+                })
+            
+            elif command in ('nodes_in_bbox', 'nodes_in_radius', 'nearest_nodes'):
+                session.send(self.spatial_query(command, data))
+            
+            elif command == 'get_history':
+                limit = min(int(data.get('limit', 50)), 500)
+                messages, next_before = self.messages.page(
+                    before=data.get('before'),
+                    before_time=data.get('before_time'),
+                    limit=limit
+                )
+                session.send({
+                    'type': 'history',
+                    'messages': messages,
+                    'next_before': next_before
+                })
+            
+            elif command == 'get_packets':
+                if not self.store:
+                    session.send({
+                        'type': 'error',
+                        'command': command,
+                        'error': "Packet log is disabled: db_path is not configured"
+                    })
+                    return
+                # Same bounds as get_timeseries: ISO strings or epoch
+                # seconds/milliseconds, stored as epoch seconds
+                try:
+                    since, until = (
+                        epoch_seconds(data[name]) if data.get(name) is not None else None
+                        for name in ('since', 'until')
+                    )
+                except (TypeError, ValueError) as e:
+                    session.send({
+                        'type': 'error',
+                        'command': command,
+                        'error': f"Invalid since/until: {e}"
+                    })
+                    return
+                packets = await self.loop.run_in_executor(None, lambda: self.store.query_packets(
+                    from_id=data.get('node'),
+                    portnum=data.get('portnum'),
+                    since=since,
+                    until=until,
+                    limit=min(int(data.get('limit', 100)), 1000)
+                ))
+                session.send({
+                    'type': 'packets',
+                    'packets': packets
+                })
+            
+            elif command == 'get_timeseries':
+                node_id = data.get('node')
+                since = data.get('since')
+                until = data.get('until')
+                session.send({
+                    'type': 'timeseries',
+                    'node_id': node_id,
+                    'series': self.timeseries.query(
+                        node_id,
+                        metrics=data.get('metrics'),
+                        since=epoch_seconds(since) if since is not None else None,
+                        until=epoch_seconds(until) if until is not None else None,
+                        max_points=min(int(data.get('max_points', 200)), 2000)
+                    )
+                })
+            
+            elif command == 'get_topology':
+                session.send({'type': 'topology', **self.topology.describe()})
+            
+            elif command == 'get_handlers':
+                session.send({'type': 'handlers', **self.handlers.describe()})
+            
+            elif command == 'client_stats':
+                session.send({
+                    'type': 'client_stats',
+                    'clients': [client.describe() for client in self.connected_clients.values()]
+                })
             
-        except json.JSONDecodeError:
-            logger.error(f"Invalid JSON received: {message}")
         except Exception as e:
             logger.error(f"Error handling client message: {e}")
     
+    def spatial_query(self, command, data):
+        """Answer a bbox, radius or nearest-nodes query from the spatial index"""
+        if command == 'nodes_in_bbox':
+            south, west, north, east = (float(value) for value in data['bbox'])
+            found = [(None, node_id) for node_id in self.spatial.bbox(south, west, north, east)]
+        else:
+            latitude = float(data['latitude'])
+            longitude = float(data['longitude'])
+            if command == 'nodes_in_radius':
+                found = self.spatial.radius(latitude, longitude, float(data['radius']))
+            else:
+                found = self.spatial.nearest(latitude, longitude, min(int(data.get('k', 10)), 1000))
+        
+        limit = min(int(data.get('limit', 1000)), 5000)
+        found = [(distance, node_id) for distance, node_id in found if node_id in self.nodes][:limit]
+        reply = {
+            'type': 'spatial_result',
+            'query': command,
+            'nodes': [self.nodes[node_id] for _, node_id in found]
+        }
+        if command != 'nodes_in_bbox':
+            reply['distances'] = [round(distance, 1) for distance, _ in found]
+        return reply
+    
+    async def stream_export(self, session, options):
+        """Stream nodes and messages to one client as NDJSON chunk frames"""
+        since = options.get('since')
+        until = options.get('until')
+        node_ids = set(options['nodes']) if options.get('nodes') else None
+        
+        self.export_counter += 1
+        export_id = self.export_counter
+        
+        session.send({
+            'type': 'export_start',
+            'export_id': export_id,
+            'format': 'ndjson',
+            'filters': {
+                'since': since,
+                'until': until,
+                'nodes': sorted(node_ids) if node_ids else None
+            },
+            'stats': self.stats,
+            'timestamp': datetime.now().isoformat()
+        })
+        
+        digest = hashlib.sha256()
+        counts = {'node': 0, 'message': 0}
+        lines = []
+        pending = 0
+        chunks = 0
+        total_bytes = 0
+        
+        async def send_chunk():
+            nonlocal lines, pending, chunks, total_bytes
+            body = '\n'.join(lines) + '\n'
+            digest.update(body.encode('utf-8'))
+            total_bytes += len(body)
+            session.send({
+                'type': 'export_chunk',
+                'export_id': export_id,
+                'index': chunks,
+                'data': body
+            })
+            chunks += 1
+            lines = []
+            pending = 0
+            
+            # Let the client drain and the loop run between chunks
+            await session.wait_writable()
+            await asyncio.sleep(0)
+        
+        async for kind, record in self.export_records(since, until, node_ids):
+            if session.closed:
+                return
+            if kind == 'node':
+                # Reuse the node's cached JSON rather than re-encoding it
+                line = '{"kind":"node",' + self.fragments.fragment(record)[1:]
+            else:
+                line = wire_protocol.dumps({'kind': kind, **record})
+            lines.append(line)
+            pending += len(line) + 1
+            counts[kind] += 1
+            if pending >= self.export_chunk_size:
+                await send_chunk()
+        
+        if lines:
+            await send_chunk()
+        
+        session.send({
+            'type': 'export_end',
+            'export_id': export_id,
+            'nodes': counts['node'],
+            'messages': counts['message'],
+            'chunks': chunks,
+            'bytes': total_bytes,
+            'sha256': digest.hexdigest()
+        })
+    
+    async def export_records(self, since=None, until=None, node_ids=None):
+        """Lazily yield ('node', dict) then ('message', dict) records matching the filters"""
+        since_epoch = epoch_seconds(since) if since is not None else None
+        until_epoch = epoch_seconds(until) if until is not None else None
+        
+        for node in list(self.nodes.values()):
+            if node_ids and node.id not in node_ids:
+                continue
+            if since_epoch is not None and node.last_seen < since_epoch:
+                continue
+            if until_epoch is not None and node.first_seen >= until_epoch:
+                continue
+            yield 'node', node
+        
+        if self.store:
+            # Full history lives in SQLite; read it page by page off the loop
+            loop = asyncio.get_running_loop()
+            after_seq = 0
+            while True:
+                rows = await loop.run_in_executor(None, lambda: self.store.read_messages(
+                    after_seq,
+                    since=epoch_seconds(since) if since is not None else None,
+                    until=epoch_seconds(until) if until is not None else None,
+                    from_ids=sorted(node_ids) if node_ids else None
+                ))
+                if not rows:
+                    break
+                for seq, message in rows:
+                    yield 'message', message
+                after_seq = rows[-1][0]
+        else:
+            for message in self.messages.iter_messages(since, until):
+                if node_ids and message['from_id'] not in node_ids:
+                    continue
+                yield 'message', message
+    
+    @property
+    def discovery_active(self):
+        return self.discovery_task is not None and not self.discovery_task.done()
+    
+    def begin_discovery(self, session=None):
+        """Start cascade discovery, or join the run already in progress"""
+        if self.discovery_active:
+            logger.info("Discovery already running; joining it")
+            if session:
+                session.send({
+                    'type': 'system_message',
+                    'from': 'System',
+                    'text': '🔍 Discovery already in progress...',
+                    'timestamp': datetime.now().isoformat()
+                })
+        else:
+            self.discovery_task = asyncio.create_task(self.run_discovery())
+        return self.discovery_task
+    
     async def start_discovery(self):
-        """Start cascade discovery process"""
+        """Start or join cascade discovery and wait for it to finish"""
+        return await asyncio.shield(self.begin_discovery())
+    
+    async def run_discovery(self):
+        """Cascade discovery: broadcast ping, then windowed probes of every node"""
         logger.info("Starting cascade discovery...")
-        self.discovery_active = True
         
         await self.broadcast_to_clients({
             'type': 'system_message',
@@ -302,47 +1558,48 @@ class MeshtasticServer:
             'timestamp': datetime.now().isoformat()
         })
         
-        if self.interface:
-            try:
-                # Send initial broadcast ping
-                self.interface.sendText("DISCOVERY_PING", channelIndex=0)
-                
-                # Wait and send targeted pings to discovered nodes
-                await asyncio.sleep(5)
-                
-                for node_id in self.nodes.keys():
-                    try:
-                        self.interface.sendData(
-                            b"",
-                            destinationId=node_id,
-                            portNum=meshtastic.portnums_pb2.ROUTING_APP,
-                            wantAck=True,
-                            wantResponse=True
-                        )
-                        await asyncio.sleep(2)
-                    except Exception as e:
-                        logger.error(f"Error pinging {node_id}: {e}")
-                
-                await self.broadcast_to_clients({
-                    'type': 'system_message',
-                    'from': 'System',
-                    'text': f'✅ Discovery complete! Found {len(self.nodes)} nodes.',
-                    'timestamp': datetime.now().isoformat()
-                })
-                
-            except Exception as e:
-                logger.error(f"Discovery error: {e}")
-                await self.broadcast_to_clients({
-                    'type': 'system_message',
-                    'from': 'System',
-                    'text': f'❌ Discovery error: {str(e)}',
-                    'timestamp': datetime.now().isoformat()
-                })
-        else:
+        if not self.radio_connected():
             # Demo mode - simulate discovery
             await self.simulate_discovery()
+            return None
         
-        self.discovery_active = False
+        try:
+            # Send initial broadcast ping; nodes it wakes up are probed too
+            await self.transmit_text("DISCOVERY_PING", PRIORITY_DISCOVERY)
+            await asyncio.sleep(5)
+            
+            hops = {node_id: node.hops for node_id, node in self.nodes.items()}
+            result = await self.discovery.run(list(hops), hops)
+            
+            await self.broadcast_to_clients({'type': 'discovery_result', **result})
+            await self.broadcast_to_clients({
+                'type': 'system_message',
+                'from': 'System',
+                'text': (f"✅ Discovery complete! {result['reachable']} of {len(result['nodes'])} "
+                         f"nodes answered in {result['duration']:.0f}s."),
+                'timestamp': datetime.now().isoformat()
+            })
+            return result
+            
+        except Exception as e:
+            logger.error(f"Discovery error: {e}")
+            await self.broadcast_to_clients({
+                'type': 'system_message',
+                'from': 'System',
+                'text': f'❌ Discovery error: {str(e)}',
+                'timestamp': datetime.now().isoformat()
+            })
+    
+    def send_probe(self, node_id):
+        """Queue one discovery probe; the result carries the packet id acks refer to"""
+        return self.transmit_data(
+            b"",
+            node_id,
+            meshtastic.portnums_pb2.ROUTING_APP,
+            PRIORITY_DISCOVERY,
+            wantAck=True,
+            wantResponse=True
+        )
     
     async def simulate_discovery(self):
         """Simulate discovery in demo mode"""
@@ -376,19 +1633,17 @@ class MeshtasticServer:
             }
         ]
         
-        for node in demo_nodes:
+        for data in demo_nodes:
             await asyncio.sleep(1)
-            node['first_seen'] = datetime.now().isoformat()
-            node['last_seen'] = datetime.now().isoformat()
-            node['packets'] = 1
+            node = NodeRecord.from_dict(data)
+            node.packets = 1
             
-            self.nodes[node['id']] = node
+            self.nodes[node.id] = node
+            self.spatial.update(node.id, node.latitude, node.longitude)
             self.stats['total_nodes'] = len(self.nodes)
+            self.stats_dirty = True
             
-            await self.broadcast_to_clients({
-                'type': 'node_update',
-                'node': node
-            })
+            self.queue_node_update(node.id)
     
     async def ping_all_nodes(self):
         """Ping all discovered nodes"""
@@ -401,13 +1656,11 @@ class MeshtasticServer:
             'timestamp': datetime.now().isoformat()
         })
         
-        if self.interface:
-            for node_id in self.nodes.keys():
-                try:
-                    self.interface.sendText("PING", destinationId=node_id, wantAck=True)
-                    await asyncio.sleep(1)
-                except Exception as e:
-                    logger.error(f"Error pinging {node_id}: {e}")
+        if self.radio_connected():
+            await self.await_transmissions({
+                node_id: self.transmit_text("PING", PRIORITY_BULK, node_id, wantAck=True)
+                for node_id in list(self.nodes)
+            }, 'pinging')
         
         await asyncio.sleep(2)
         await self.broadcast_to_clients({
@@ -419,15 +1672,15 @@ class MeshtasticServer:
     
     async def send_message(self, text, target='broadcast'):
         """Send a text message"""
-        if not self.interface:
-            logger.warning("No Meshtastic interface available")
+        if not self.radio_connected():
+            logger.warning("No Meshtastic radio connected")
             return
         
         try:
             if target == 'broadcast':
-                self.interface.sendText(text, channelIndex=0)
+                await self.transmit_text(text, PRIORITY_BROADCAST)
             else:
-                self.interface.sendText(text, destinationId=target, wantAck=True)
+                await self.transmit_text(text, PRIORITY_DM, target, wantAck=True)
             
             logger.info(f"Sent message: {text}")
             
@@ -445,18 +1698,16 @@ class MeshtasticServer:
             'timestamp': datetime.now().isoformat()
         })
         
-        if self.interface:
+        if self.radio_connected():
             try:
                 # Send to broadcast channel
-                self.interface.sendText(text, channelIndex=0)
+                await self.transmit_text(text, PRIORITY_BROADCAST)
                 
                 # Also send directly to each known node
-                for node_id in self.nodes.keys():
-                    try:
-                        self.interface.sendText(text, destinationId=node_id, wantAck=True)
-                        await asyncio.sleep(1)
-                    except Exception as e:
-                        logger.error(f"Error sending to {node_id}: {e}")
+                await self.await_transmissions({
+                    node_id: self.transmit_text(text, PRIORITY_BULK, node_id, wantAck=True)
+                    for node_id in list(self.nodes)
+                }, 'sending to')
                 
                 await self.broadcast_to_clients({
                     'type': 'system_message',
@@ -473,10 +1724,14 @@ class MeshtasticServer:
         logger.info(f"Connecting to device on {port} (Region: {region})")
         
         try:
-            if self.interface:
-                self.interface.close()
-            
-            self.interface = meshtastic.serial_interface.SerialInterface(port)
+            # Reconnect a known radio or add another one to the gateway
+            radio = self.radios.get(port)
+            if radio is None:
+                radio = RadioWorker(port, on_change=self.on_radio_change)
+                self.radios[port] = radio
+                pub.subscribe(radio.on_connection_lost, "meshtastic.connection.lost")
+            await radio.connect()
+            self.tx.configure(region=region)
             
             await self.broadcast_to_clients({
                 'type': 'system_message',
@@ -494,30 +1749,160 @@ class MeshtasticServer:
                 'timestamp': datetime.now().isoformat()
             })
     
+    def transmit_text(self, text, priority, destination=None, **kwargs):
+        """Queue a sendText through the transmit scheduler"""
+        if destination:
+            kwargs['destinationId'] = destination
+        else:
+            kwargs.setdefault('channelIndex', 0)
+        
+        return self.tx.submit(
+            priority,
+            lambda: self.radio_send(destination, 'send_text', text, **kwargs),
+            len(text.encode('utf-8')),
+            f"text to {destination or 'channel'}"
+        )
+    
+    def transmit_data(self, data, destination, port_num, priority, **kwargs):
+        """Queue a sendData through the transmit scheduler"""
+        return self.tx.submit(
+            priority,
+            lambda: self.radio_send(
+                destination, 'send_data', data, destinationId=destination, portNum=port_num, **kwargs
+            ),
+            len(data),
+            f"data to {destination}"
+        )
+    
+    async def radio_send(self, destination, method, *args, **kwargs):
+        """Send through the best radio for destination, timing the send"""
+        radio = self.pick_radio(destination)
+        started = time.perf_counter()
+        result = 'ok'
+        try:
+            return await getattr(radio, method)(*args, **kwargs)
+        except Exception:
+            result = 'error'
+            raise
+        finally:
+            self.radio_send_metric.labels(radio.port, result).observe(time.perf_counter() - started)
+    
+    async def await_transmissions(self, futures, action):
+        """Wait for queued per-node transmissions and log the failures"""
+        results = await asyncio.gather(*futures.values(), return_exceptions=True)
+        for node_id, result in zip(futures, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error {action} {node_id}: {result}")
+    
+    def on_radio_change(self, radio):
+        """Radio link state changed; tell clients, who keep seeing cached state"""
+        self.stats['radios'][radio.port] = radio.describe()
+        self.stats_dirty = True
+        
+        # The radio's interface is known (or its open failed), so events
+        # held for it can be credited now
+        if self.unclaimed_events and radio.state != 'connecting':
+            self.claim_events()
+        
+        if radio.state == 'reconnecting':
+            text = f'⚠️ Radio on {radio.port} disconnected, reconnecting...'
+        elif radio.state == 'connected' and radio.stats['connects'] > 1:
+            text = f'✅ Radio on {radio.port} reconnected'
+        else:
+            return
+        
+        self.publish({
+            'type': 'system_message',
+            'from': 'System',
+            'text': text,
+            'timestamp': datetime.now().isoformat()
+        })
+    
+    def on_tx_change(self):
+        """Transmit queue changed; report it with the next stats update"""
+        self.tx_dirty = True
+    
     async def broadcast_to_clients(self, data):
         """Broadcast data to all connected clients"""
+        self.publish(data)
+    
+    def publish(self, data, node_portnums=None, moved_from=None):
+        """Queue a frame for every connected client without waiting on sends"""
+        if self.hub:
+            self.hub.publish(data, node_portnums, moved_from)
         if not self.connected_clients:
             return
         
-        message = json.dumps(data)
+        started = time.perf_counter()
+        self.fanout_stats['frames_broadcast'] += 1
         
-        # Create tasks for sending to all clients
-        tasks = [client.send(message) for client in self.connected_clients]
+        # Apply subscription filters before serializing, then encode each
+        # distinct (filter, encoding) variant once and hand the same payload
+        # to every matching client's queue; each writer sends at its own pace
+        payloads = {}
+        filtered = {}
+        for session in list(self.connected_clients.values()):
+            frame = data
+            key = (None, session.encoding)
+            if session.filter is not None:
+                # Many map clients share a viewport; filter once per distinct filter
+                filter_key = session.filter.key
+                if filter_key in filtered:
+                    frame = filtered[filter_key]
+                else:
+                    frame = filtered[filter_key] = session.filter.apply(data, node_portnums, moved_from)
+                if frame is None:
+                    self.fanout_stats['frames_filtered'] += 1
+                    continue
+                if frame is not data:
+                    key = (session.filter.key, session.encoding)
+            
+            payload = payloads.get(key)
+            if payload is None:
+                # Broadcast nodes have just changed, so cached fragments
+                # would all be misses; encode them directly
+                payload = payloads[key] = wire_protocol.encode(frame, session.encoding)
+            session.enqueue(frame, payload)
         
-        # Wait for all sends to complete
-        if tasks:
-            await asyncio.gather(*tasks, return_exceptions=True)
+        self.broadcast_metric.labels(data.get('type')).observe(time.perf_counter() - started)
     
     def cleanup(self):
         """Cleanup on shutdown"""
         logger.info("Shutting down...")
         
-        if self.interface:
-            try:
-                self.interface.close()
-                logger.info("✓ Meshtastic interface closed")
-            except Exception as e:
-                logger.error(f"Error closing interface: {e}")
+        if self.flush_task:
+            self.flush_task.cancel()
+        if self.ingest_task:
+            self.ingest_task.cancel()
+        if self.discovery_task:
+            self.discovery_task.cancel()
+        if self.supervisor_task:
+            self.supervisor_task.cancel()
+        self.tx.stop()
+        
+        if self.hub:
+            self.hub.close()
+        for process in self.worker_processes:
+            process.terminate()
+        if self.fanout_dir:
+            shutil.rmtree(self.fanout_dir, ignore_errors=True)
+        
+        self.messages.close()
+        if self.store:
+            self.store.close()
+        
+        for radio in self.radios.values():
+            radio.close()
+        logger.info("✓ Meshtastic interfaces closed")
+
+
+def run_fanout_worker(index, hub_path, options):
+    """Entry point of a fan-out worker process"""
+    server = MeshtasticServer(**options)
+    try:
+        asyncio.run(server.serve_worker(index, hub_path))
+    except KeyboardInterrupt:
+        pass
 
 
 async def main():
@@ -525,7 +1910,34 @@ async def main():
     server = MeshtasticServer(
         port='/dev/ttyACM0',
         ws_host='localhost',
-        ws_port=8765
+        ws_port=8765,
+        batch_window=0.1,
+        client_queue_size=256,
+        slow_client_policy='collapse',
+        ingest_batch_size=200,
+        history_size=1000,
+        history_overflow_path=None,
+        db_path='meshtastic.db',
+        export_chunk_size=64 * 1024,
+        compression=True,
+        journal_size=2000,
+        region='US',
+        modem_preset='LONG_FAST',
+        tx_share=0.5,
+        discovery_share=0.8,
+        bulk_share=0.5,
+        dedup_window=60.0,
+        dedup_size=10000,
+        merge_duplicates=True,
+        link_window=600.0,
+        metrics_path='/metrics',
+        plugins=(),
+        disabled_handlers=(),
+        discovery_window=8,
+        discovery_retries=2,
+        fanout_workers=0,
+        static_dir=os.path.dirname(os.path.abspath(__file__)),
+        static_files=('meshtastic_command_center.html', 'meshtastic_standalone.html')
     )
     
     # Setup signal handlers for graceful shutdown
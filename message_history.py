@@ -0,0 +1,159 @@
+"""
+Message History for Meshtastic Command Center
+Fixed-capacity ring buffer of text messages with optional overflow to disk
+"""
+
+import json
+import os
+from array import array
+from collections import deque
+from datetime import datetime
+
+
+class MessageHistory:
+    """Bounded message store that pages backwards by message ID or timestamp"""
+
+    def __init__(self, capacity=1000, overflow_path=None):
+        self.capacity = capacity
+        self.overflow_path = overflow_path
+
+        # Newest messages stay in memory; every message gets a sequential ID,
+        # so the ring always holds IDs first_id..next_id-1
+        self.buffer = deque(maxlen=capacity)
+        self.next_id = 1
+
+        # Messages evicted from the ring are appended to a JSON Lines spill
+        # file. Only one byte offset per spilled message is kept in memory.
+        self.overflow_file = None
+        self.overflow_offsets = array('Q')
+        if overflow_path:
+            self.overflow_file = open(overflow_path, 'w+', encoding='utf-8')
+
+    def __len__(self):
+        """Number of messages retrievable from memory and disk"""
+        return len(self.overflow_offsets) + len(self.buffer)
+
+    def __iter__(self):
+        """Iterate over in-memory messages, oldest first"""
+        return iter(self.buffer)
+
+    @property
+    def first_id(self):
+        """Oldest message ID still held in memory"""
+        return self.next_id - len(self.buffer)
+
+    def append(self, message):
+        """Store a message, assigning it the next ID"""
+        message['id'] = self.next_id
+        self.next_id += 1
+
+        if len(self.buffer) == self.capacity:
+            self.spill(self.buffer[0])
+
+        self.buffer.append(message)
+        return message
+
+    def replicate(self, message):
+        """Store a message that already has an ID from another history (fan-out workers)"""
+        self.next_id = message['id']
+        return self.append(message)
+
+    def spill(self, message):
+        """Write a message that is about to leave the ring to the overflow file"""
+        if not self.overflow_file:
+            return
+
+        self.overflow_file.seek(0, os.SEEK_END)
+        self.overflow_offsets.append(self.overflow_file.tell())
+        self.overflow_file.write(json.dumps(message) + '\n')
+
+    def recent(self, count):
+        """The newest count messages, oldest first"""
+        start = max(len(self.buffer) - count, 0)
+        return [self.buffer[i] for i in range(start, len(self.buffer))]
+
+    def page(self, before=None, before_time=None, limit=50):
+        """
+        Return up to limit messages older than a cursor, oldest first
+
+        before is a message ID and before_time an ISO timestamp or epoch
+        seconds; with neither, the newest page is returned. The second value
+        is the cursor for the next (older) page, or None when exhausted.
+        """
+        end_id = self.next_id
+        if before is not None:
+            end_id = min(int(before), end_id)
+        if before_time is not None:
+            end_id = min(self.id_before_time(normalize_timestamp(before_time)), end_id)
+
+        oldest_id = self.next_id - len(self)
+        start_id = max(end_id - limit, oldest_id)
+        if start_id >= end_id:
+            return [], None
+
+        messages = [self.get(message_id) for message_id in range(start_id, end_id)]
+        next_cursor = start_id if start_id > oldest_id else None
+        return messages, next_cursor
+
+    def iter_messages(self, since=None, until=None):
+        """Lazily yield messages in [since, until), oldest first, from disk then memory"""
+        start_id = self.next_id - len(self)
+        end_id = self.next_id
+        if since is not None:
+            start_id = self.id_before_time(normalize_timestamp(since))
+        if until is not None:
+            end_id = self.id_before_time(normalize_timestamp(until))
+
+        for message_id in range(start_id, end_id):
+            message = self.get(message_id)
+            if message is not None:
+                yield message
+
+    def get(self, message_id):
+        """Fetch a single message by ID from memory or the overflow file"""
+        if message_id >= self.first_id:
+            return self.buffer[message_id - self.first_id]
+        if not self.overflow_file:
+            # Evicted while a reader was iterating and not kept on disk
+            return None
+
+        self.overflow_file.seek(self.overflow_offsets[message_id - 1])
+        return json.loads(self.overflow_file.readline())
+
+    def id_before_time(self, timestamp):
+        """First message ID whose timestamp is not older than timestamp"""
+        low = self.next_id - len(self)
+        high = self.next_id
+        while low < high:
+            mid = (low + high) // 2
+            if self.get(mid)['timestamp'] < timestamp:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def close(self):
+        """Close the overflow file"""
+        if self.overflow_file:
+            self.overflow_file.close()
+            self.overflow_file = None
+
+
+# Epoch values this large are milliseconds (e.g. JavaScript Date.now());
+# in seconds they would be past the year 5000
+EPOCH_MILLISECONDS = 1e11
+
+
+def normalize_timestamp(value):
+    """Accept ISO strings or epoch seconds/milliseconds and return an ISO string"""
+    if isinstance(value, (int, float)):
+        return datetime.fromtimestamp(epoch_seconds(value)).isoformat()
+    return str(value)
+
+
+def epoch_seconds(value):
+    """Accept ISO strings or epoch seconds/milliseconds and return epoch seconds (ValueError if neither)"""
+    if isinstance(value, (int, float)):
+        value = float(value)
+        return value / 1000 if abs(value) >= EPOCH_MILLISECONDS else value
+    return datetime.fromisoformat(str(value)).timestamp()
@@ -0,0 +1,194 @@
+"""
+Metrics for Meshtastic Command Center
+Counters, gauges and latency histograms rendered in the Prometheus text
+exposition format, with no client library or external service required
+"""
+
+from bisect import bisect_left
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Seconds; spans sub-millisecond handlers up to multi-second radio sends
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+def escape(value):
+    """Escape a label value for the text format"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(names, values, extra=None):
+    """{name="value",...} or an empty string"""
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def format_value(value):
+    """Render a sample value the way Prometheus expects"""
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Value:
+    """One counter or gauge series"""
+
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def set(self, value):
+        self.value = value
+
+
+class HistogramValue:
+    """One histogram series: per-bucket counts, sum and count"""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    """
+    A named metric with optional labels. Series are either updated in place
+    (inc, set, observe) or read from collect, a callable returning a value
+    or a {label values tuple: value} dict when the metric is scraped
+    """
+
+    kind = 'untyped'
+
+    def __init__(self, name, help_text, labels=(), collect=None):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self.collect = collect
+        self.series = {}
+
+    def new_series(self):
+        return Value()
+
+    def labels(self, *values):
+        """The series for one set of label values, created on first use"""
+        series = self.series.get(values)
+        if series is None:
+            series = self.series[values] = self.new_series()
+        return series
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def set(self, value):
+        self.labels().set(value)
+
+    def samples(self):
+        """(label values, value) pairs to render"""
+        if self.collect is None:
+            return [(values, series.value) for values, series in self.series.items()]
+        collected = self.collect()
+        if isinstance(collected, dict):
+            return list(collected.items())
+        return [((), collected)]
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.help}',
+            f'# TYPE {self.name} {self.kind}'
+        ]
+        for values, value in self.samples():
+            if value is None:
+                continue
+            lines.append(f'{self.name}{format_labels(self.label_names, values)} {format_value(value)}')
+        return lines
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def new_series(self):
+        return HistogramValue(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.help}',
+            f'# TYPE {self.name} histogram'
+        ]
+        names = self.label_names
+        for values, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series.counts):
+                cumulative += count
+                labels = format_labels(names, values, f'le="{format_value(float(bound))}"')
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = format_labels(names, values)
+            lines.append(f'{self.name}_sum{labels} {format_value(series.sum)}')
+            lines.append(f'{self.name}_count{labels} {series.count}')
+        return lines
+
+
+class MetricsRegistry:
+    """Every metric the process exposes, in registration order"""
+
+    def __init__(self, prefix=''):
+        self.prefix = prefix
+        self.metrics = {}
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labels=(), collect=None):
+        return self.register(Counter(self.prefix + name, help_text, labels, collect))
+
+    def gauge(self, name, help_text, labels=(), collect=None):
+        return self.register(Gauge(self.prefix + name, help_text, labels, collect))
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(self.prefix + name, help_text, labels, buckets))
+
+    def render(self):
+        """The whole registry in the Prometheus text format"""
+        lines = []
+        for metric in self.metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                lines.append(f'# {metric.name} unavailable: {escape(e)}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,131 @@
+"""
+Node Records for Meshtastic Command Center
+Compact per-node state shared by the server and the cascade discovery
+script; times are epoch seconds and only become ISO strings when a node
+is serialized
+"""
+
+import time
+
+from message_history import epoch_seconds, normalize_timestamp
+
+
+class NodeRecord:
+    """Latest known state of one mesh node"""
+
+    __slots__ = (
+        'id', 'name', 'short_name', 'hw_model',
+        'first_seen', 'last_seen', 'packets',
+        'snr', 'rssi', 'hops',
+        'latitude', 'longitude', 'altitude',
+        'battery', 'voltage', 'channel_utilization', 'air_util_tx',
+        'radios', 'best_radio'
+    )
+
+    # Optional fields, in the order they appear in serialized nodes
+    OPTIONAL = ('snr', 'rssi', 'hops')
+    TELEMETRY = ('battery', 'voltage', 'channel_utilization', 'air_util_tx')
+
+    def __init__(self, node_id, now=None):
+        if now is None:
+            now = time.time()
+        self.id = node_id
+        self.name = node_id
+        self.short_name = None
+        self.hw_model = None
+        self.first_seen = now
+        self.last_seen = now
+        self.packets = 0
+        self.snr = None
+        self.rssi = None
+        self.hops = None
+        self.latitude = None
+        self.longitude = None
+        self.altitude = None
+        self.battery = None
+        self.voltage = None
+        self.channel_utilization = None
+        self.air_util_tx = None
+        self.radios = None
+        self.best_radio = None
+
+    @property
+    def has_position(self):
+        return self.latitude is not None or self.longitude is not None
+
+    def heard(self, now=None):
+        """Count one packet from this node"""
+        self.last_seen = time.time() if now is None else now
+        self.packets += 1
+
+    def set_position(self, latitude, longitude, altitude=None):
+        """Replace the last known position"""
+        self.latitude = latitude
+        self.longitude = longitude
+        self.altitude = altitude
+
+    def to_dict(self, epoch=False):
+        """Serialized form sent to clients and stored; ISO times unless epoch"""
+        data = {
+            'id': self.id,
+            'name': self.name
+        }
+        if self.short_name is not None:
+            data['short_name'] = self.short_name
+        if self.hw_model is not None:
+            data['hw_model'] = self.hw_model
+
+        data['first_seen'] = self.first_seen if epoch else normalize_timestamp(self.first_seen)
+        data['last_seen'] = self.last_seen if epoch else normalize_timestamp(self.last_seen)
+        data['packets'] = self.packets
+
+        for field in self.OPTIONAL:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+
+        if self.has_position:
+            data['position'] = {
+                'latitude': self.latitude,
+                'longitude': self.longitude,
+                'altitude': self.altitude
+            }
+
+        for field in self.TELEMETRY:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+
+        if self.radios:
+            data['radios'] = self.radios
+            data['best_radio'] = self.best_radio
+
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a record from its serialized form (e.g. the packet store)"""
+        record = cls(data['id'])
+        record.name = data.get('name', record.id)
+        record.short_name = data.get('short_name')
+        record.hw_model = data.get('hw_model')
+        if data.get('first_seen') is not None:
+            record.first_seen = epoch_seconds(data['first_seen'])
+        if data.get('last_seen') is not None:
+            record.last_seen = epoch_seconds(data['last_seen'])
+        record.packets = data.get('packets', 0)
+
+        for field in cls.OPTIONAL + cls.TELEMETRY:
+            setattr(record, field, data.get(field))
+
+        position = data.get('position')
+        if position:
+            record.set_position(
+                position.get('latitude'),
+                position.get('longitude'),
+                position.get('altitude')
+            )
+
+        record.radios = data.get('radios')
+        record.best_radio = data.get('best_radio')
+        return record
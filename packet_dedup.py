@@ -0,0 +1,81 @@
+"""
+Packet Dedup Cache for Meshtastic Command Center
+Remembers recently seen (from, id) packet keys so rebroadcast copies, and
+copies heard by more than one radio, are only processed once
+"""
+
+import time
+
+
+class PacketDedup:
+    """Time- and size-bounded set of recently seen packet keys"""
+
+    def __init__(self, ttl=60.0, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        # key -> (first seen, sources that heard it). Dicts keep insertion
+        # order, so the oldest entries are always at the front.
+        self.entries = {}
+
+        self.stats = {
+            'unique': 0,
+            'duplicates': 0,
+            'cross_source': 0,
+            'evicted': 0,
+            'size': 0
+        }
+
+    @staticmethod
+    def key(packet):
+        """(from, id) of a packet, or None when it carries no packet ID"""
+        packet_id = packet.get('id')
+        if not packet_id:
+            return None
+        return (packet.get('from', packet.get('fromId')), packet_id)
+
+    def check(self, packet, source=None):
+        """
+        Record one received copy of a packet. Returns (duplicate, new_source):
+        duplicate is False only for the first copy; new_source is True when
+        a duplicate arrived through a source that had not heard it before.
+        """
+        key = self.key(packet)
+        if key is None:
+            return False, False
+
+        now = time.monotonic()
+        self.expire(now)
+
+        entry = self.entries.get(key)
+        if entry is None:
+            self.entries[key] = (now, {source})
+            if len(self.entries) > self.max_entries:
+                del self.entries[next(iter(self.entries))]
+                self.stats['evicted'] += 1
+            self.stats['unique'] += 1
+            self.stats['size'] = len(self.entries)
+            return False, False
+
+        self.stats['duplicates'] += 1
+        sources = entry[1]
+        if source in sources:
+            return True, False
+
+        sources.add(source)
+        self.stats['cross_source'] += 1
+        return True, True
+
+    def expire(self, now=None):
+        """Drop entries older than the TTL"""
+        if now is None:
+            now = time.monotonic()
+        cutoff = now - self.ttl
+
+        entries = self.entries
+        while entries:
+            key = next(iter(entries))
+            if entries[key][0] > cutoff:
+                break
+            del entries[key]
+        self.stats['size'] = len(entries)
@@ -0,0 +1,265 @@
+"""
+Packet Store for Meshtastic Command Center
+Durable append-only SQLite (WAL) log of decoded packets, node state and messages
+"""
+
+import base64
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS packets (
+    seq INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    from_id TEXT,
+    to_id TEXT,
+    packet_id INTEGER,
+    portnum TEXT,
+    snr REAL,
+    rssi INTEGER,
+    hop_limit INTEGER,
+    hop_start INTEGER,
+    payload TEXT
+);
+CREATE INDEX IF NOT EXISTS packets_from_time ON packets (from_id, time);
+CREATE INDEX IF NOT EXISTS packets_portnum ON packets (portnum);
+
+CREATE TABLE IF NOT EXISTS nodes (
+    id TEXT PRIMARY KEY,
+    updated REAL NOT NULL,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS messages (
+    seq INTEGER PRIMARY KEY,
+    time REAL NOT NULL,
+    from_id TEXT,
+    data TEXT NOT NULL
+);
+"""
+
+
+def encode_value(value):
+    """JSON fallback for bytes and protobuf objects found in packet dicts"""
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode('ascii')
+    return str(value)
+
+
+def packet_to_json(packet):
+    """Serialize a packet dict, leaving out the raw protobuf"""
+    return json.dumps(
+        {key: value for key, value in packet.items() if key != 'raw'},
+        default=encode_value
+    )
+
+
+class PacketStore:
+    """SQLite packet log with all writes batched on a background thread"""
+
+    def __init__(self, path='meshtastic.db', batch_size=500, flush_interval=0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.queue = queue.SimpleQueue()
+        self.thread = None
+        self.local = threading.local()
+        self.stats = {
+            'packets_written': 0,
+            'transactions': 0,
+            'write_errors': 0,
+            'queue_depth': 0
+        }
+
+        conn = self.connect()
+        conn.executescript(SCHEMA)
+        conn.commit()
+
+    def connect(self):
+        """Open (once per thread) a connection in WAL mode"""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self.local.conn = conn
+        return conn
+
+    def start(self):
+        """Start the background writer thread"""
+        self.thread = threading.Thread(target=self.writer, name='packet-store', daemon=True)
+        self.thread.start()
+
+    # Producers: these only enqueue and never touch SQLite, so they are
+    # safe to call from the event loop or the radio reader thread
+
+    def append_packet(self, packet, received=None):
+        """Queue a decoded packet for the log"""
+        self.queue.put(('packet', (received or time.time(), packet)))
+
+    def save_node(self, node):
+        """Queue the latest state of a node (pass a copy if it will change)"""
+        self.queue.put(('node', (time.time(), node)))
+
+    def save_message(self, message):
+        """Queue a text message for history replay"""
+        self.queue.put(('message', (time.time(), message)))
+
+    def writer(self):
+        """Drain the queue and write each batch in one transaction"""
+        conn = self.connect()
+        running = True
+
+        while running:
+            try:
+                items = [self.queue.get(timeout=self.flush_interval)]
+            except queue.Empty:
+                continue
+
+            while len(items) < self.batch_size:
+                try:
+                    items.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if None in items:
+                running = False
+                items = [item for item in items if item is not None]
+
+            try:
+                self.write_batch(conn, items)
+            except Exception as e:
+                self.stats['write_errors'] += 1
+                logger.error(f"Packet store write failed: {e}")
+            self.stats['queue_depth'] = self.queue.qsize()
+
+    def write_batch(self, conn, items):
+        """Insert one batch of queued items"""
+        packets = []
+        nodes = []
+        messages = []
+
+        for kind, (received, data) in items:
+            if kind == 'packet':
+                decoded = data.get('decoded', {})
+                packets.append((
+                    received,
+                    data.get('fromId'),
+                    data.get('toId'),
+                    data.get('id'),
+                    decoded.get('portnum'),
+                    data.get('rxSnr'),
+                    data.get('rxRssi'),
+                    data.get('hopLimit'),
+                    data.get('hopStart'),
+                    packet_to_json(data)
+                ))
+            elif kind == 'node':
+                nodes.append((data['id'], received, json.dumps(data, default=encode_value)))
+            elif kind == 'message':
+                message = {key: value for key, value in data.items() if key != 'id'}
+                messages.append((received, data.get('from_id'), json.dumps(message)))
+
+        with conn:
+            if packets:
+                conn.executemany(
+                    'INSERT INTO packets (time, from_id, to_id, packet_id, portnum, '
+                    'snr, rssi, hop_limit, hop_start, payload) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    packets
+                )
+            if nodes:
+                conn.executemany(
+                    'INSERT OR REPLACE INTO nodes (id, updated, data) VALUES (?, ?, ?)',
+                    nodes
+                )
+            if messages:
+                conn.executemany(
+                    'INSERT INTO messages (time, from_id, data) VALUES (?, ?, ?)',
+                    messages
+                )
+
+        self.stats['packets_written'] += len(packets)
+        self.stats['transactions'] += 1
+
+    # Readers: these block on SQLite and should run in an executor when
+    # called from the event loop
+
+    def load_nodes(self):
+        """Latest stored state of every node"""
+        rows = self.connect().execute('SELECT id, data FROM nodes')
+        return {node_id: json.loads(data) for node_id, data in rows}
+
+    def load_messages(self, limit):
+        """The newest limit messages, oldest first"""
+        rows = self.connect().execute(
+            'SELECT data FROM messages ORDER BY seq DESC LIMIT ?', (limit,)
+        ).fetchall()
+        return [json.loads(data) for (data,) in reversed(rows)]
+
+    def read_messages(self, after_seq=0, limit=500, since=None, until=None, from_ids=None):
+        """One page of messages in log order after after_seq, as (seq, message) pairs"""
+        clauses = ['seq > ?']
+        params = [after_seq]
+        if since is not None:
+            clauses.append('time >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('time < ?')
+            params.append(until)
+        if from_ids:
+            clauses.append(f"from_id IN ({', '.join('?' * len(from_ids))})")
+            params.extend(from_ids)
+
+        params.append(limit)
+        rows = self.connect().execute(
+            f"SELECT seq, data FROM messages WHERE {' AND '.join(clauses)} ORDER BY seq LIMIT ?",
+            params
+        )
+        return [(seq, json.loads(data)) for seq, data in rows]
+
+    def count_messages(self):
+        """Total number of stored messages"""
+        return self.connect().execute('SELECT COUNT(*) FROM messages').fetchone()[0]
+
+    def query_packets(self, from_id=None, portnum=None, since=None, until=None, limit=100):
+        """Newest packets matching the filters, using the from/time and portnum indexes"""
+        clauses = []
+        params = []
+        if from_id is not None:
+            clauses.append('from_id = ?')
+            params.append(from_id)
+        if portnum is not None:
+            clauses.append('portnum = ?')
+            params.append(portnum)
+        if since is not None:
+            clauses.append('time >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('time < ?')
+            params.append(until)
+
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ''
+        params.append(limit)
+        rows = self.connect().execute(
+            f'SELECT seq, time, payload FROM packets {where}ORDER BY time DESC LIMIT ?',
+            params
+        )
+        return [
+            {'seq': seq, 'time': received, 'packet': json.loads(payload)}
+            for seq, received, payload in rows
+        ]
+
+    def close(self):
+        """Flush pending writes and stop the writer thread"""
+        if self.thread:
+            self.queue.put(None)
+            self.thread.join(timeout=10)
+            self.thread = None
@@ -0,0 +1,191 @@
+"""
+Radio Worker for Meshtastic Command Center
+Owns a Meshtastic serial interface on a dedicated thread so blocking serial
+I/O never runs on the event loop, and reconnects with exponential backoff
+"""
+
+import asyncio
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import meshtastic.serial_interface
+
+logger = logging.getLogger(__name__)
+
+# Ports served by mesh_simulator (its SCHEMES), which is only imported for them
+SIMULATED_SCHEMES = ('sim://', 'replay://')
+
+
+class RadioWorker:
+    """Async facade over one SerialInterface running on its own thread"""
+
+    def __init__(self, port, on_change=None, min_backoff=1.0, max_backoff=60.0):
+        self.port = port
+        self.on_change = on_change
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+
+        # One thread owns the interface: connects, sends and closes are
+        # serialized there, never on the event loop
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='radio')
+        self.interface = None
+        self.loop = None
+        self.state = 'disconnected'
+        self.reconnect_task = None
+        self.last_error = None
+
+        self.stats = {
+            'connects': 0,
+            'disconnects': 0,
+            'send_errors': 0
+        }
+
+    @property
+    def connected(self):
+        return self.state == 'connected'
+
+    async def run_on_radio(self, func, *args, **kwargs):
+        """Run a blocking call on the radio thread"""
+        self.loop = asyncio.get_running_loop()
+        return await self.loop.run_in_executor(self.executor, lambda: func(*args, **kwargs))
+
+    async def connect(self, port=None):
+        """Open (or reopen) the serial interface; raises on failure"""
+        if port:
+            self.port = port
+
+        self.cancel_reconnect()
+        self.set_state('connecting')
+        try:
+            await self.run_on_radio(self.open_interface, self.port)
+        except Exception as e:
+            self.last_error = str(e)
+            self.set_state('disconnected')
+            raise
+
+        self.stats['connects'] += 1
+        self.last_error = None
+        self.set_state('connected')
+
+    def open_interface(self, port):
+        """Close any old interface and open a new one (radio thread)"""
+        self.close_interface()
+        if isinstance(port, str) and port.startswith(SIMULATED_SCHEMES):
+            import mesh_simulator
+            self.interface = mesh_simulator.open_interface(port)
+            self.interface.start()
+        else:
+            self.interface = meshtastic.serial_interface.SerialInterface(port)
+
+    def close_interface(self):
+        """Close the current interface, ignoring errors (radio thread)"""
+        if self.interface:
+            try:
+                self.interface.close()
+            except Exception as e:
+                logger.debug(f"Error closing interface: {e}")
+            self.interface = None
+
+    async def send_text(self, text, **kwargs):
+        """sendText on the radio thread"""
+        return await self.send(lambda: self.interface.sendText(text, **kwargs))
+
+    async def send_data(self, data, **kwargs):
+        """sendData on the radio thread"""
+        return await self.send(lambda: self.interface.sendData(data, **kwargs))
+
+    async def send(self, call):
+        """Run a send on the radio thread, treating I/O errors as a lost link"""
+        if not self.connected:
+            raise ConnectionError(f"Radio on {self.port} is {self.state}")
+
+        try:
+            return await self.run_on_radio(call)
+        except (OSError, ConnectionError) as e:
+            self.stats['send_errors'] += 1
+            self.connection_lost(str(e))
+            raise
+        except Exception:
+            self.stats['send_errors'] += 1
+            raise
+
+    def on_connection_lost(self, interface, topic=None):
+        """pubsub handler for meshtastic.connection.lost (reader thread)"""
+        if interface is not self.interface or self.loop is None:
+            return
+        self.loop.call_soon_threadsafe(self.connection_lost, 'connection lost')
+
+    def connection_lost(self, reason):
+        """Mark the link down and start reconnecting (event loop)"""
+        if self.state in ('reconnecting', 'closed'):
+            return
+
+        logger.warning(f"Radio on {self.port} disconnected: {reason}")
+        self.stats['disconnects'] += 1
+        self.last_error = reason
+        self.set_state('reconnecting')
+        self.start_reconnect()
+
+    def start_reconnect(self):
+        """Start the background reconnect loop if it is not already running"""
+        if self.reconnect_task is None or self.reconnect_task.done():
+            self.set_state('reconnecting')
+            self.reconnect_task = asyncio.create_task(self.reconnect())
+
+    def cancel_reconnect(self):
+        """Stop a running reconnect loop (e.g. before an explicit connect)"""
+        task = self.reconnect_task
+        self.reconnect_task = None
+        try:
+            current = asyncio.current_task()
+        except RuntimeError:
+            current = None
+        if task and not task.done() and task is not current:
+            task.cancel()
+
+    async def reconnect(self):
+        """Retry opening the interface with exponential backoff and jitter"""
+        delay = self.min_backoff
+        while self.state != 'closed':
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+            try:
+                await self.run_on_radio(self.open_interface, self.port)
+            except Exception as e:
+                self.last_error = str(e)
+                delay = min(delay * 2, self.max_backoff)
+                logger.info(f"Reconnect to {self.port} failed, retrying in ~{delay:.0f}s: {e}")
+                continue
+
+            self.stats['connects'] += 1
+            self.last_error = None
+            self.set_state('connected')
+            logger.info(f"✓ Reconnected to {self.port}")
+            return
+
+    def set_state(self, state):
+        """Update link state and notify the owner"""
+        if state == self.state:
+            return
+        self.state = state
+        if self.on_change:
+            self.on_change(self)
+
+    def close(self):
+        """Close the interface and stop the radio thread (safe to call from sync code)"""
+        self.state = 'closed'
+        self.cancel_reconnect()
+        try:
+            self.executor.submit(self.close_interface).result(timeout=5)
+        except Exception as e:
+            logger.error(f"Error closing interface: {e}")
+        self.executor.shutdown(wait=False)
+
+    def describe(self):
+        """Link status for clients"""
+        return {
+            'port': self.port,
+            'state': self.state,
+            'last_error': self.last_error,
+            **self.stats
+        }
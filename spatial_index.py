@@ -0,0 +1,197 @@
+"""
+Spatial Index for Meshtastic Command Center
+Grid of fixed-size latitude/longitude cells over node positions, updated on
+every position report, for bounding box, radius and nearest-node queries
+"""
+
+import heapq
+import math
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+
+def haversine(latitude1, longitude1, latitude2, longitude2):
+    """Great-circle distance in meters"""
+    phi1 = math.radians(latitude1)
+    phi2 = math.radians(latitude2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(longitude2 - longitude1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def in_bbox(latitude, longitude, south, west, north, east):
+    """Whether a point is inside [south, west, north, east], which may cross the antimeridian"""
+    if not south <= latitude <= north:
+        return False
+    if west <= east:
+        return west <= longitude <= east
+    return longitude >= west or longitude <= east
+
+
+class SpatialIndex:
+    """
+    Positions bucketed into cell_degrees square cells. Queries visit only the
+    cells overlapping the query area, or every occupied cell when that is
+    fewer, so cost follows the number of nearby nodes rather than all nodes.
+    """
+
+    def __init__(self, cell_degrees=0.05):
+        self.cell_degrees = cell_degrees
+        self.columns = math.ceil(360 / cell_degrees)
+        self.cells = {}
+        self.positions = {}
+        self.stats = {
+            'nodes': 0,
+            'cells': 0,
+            'updates': 0,
+            'queries': 0
+        }
+
+    def cell(self, latitude, longitude):
+        """(row, column) of the cell holding a point"""
+        return (
+            math.floor((latitude + 90) / self.cell_degrees),
+            min(math.floor((longitude + 180) / self.cell_degrees), self.columns - 1)
+        )
+
+    def update(self, node_id, latitude, longitude):
+        """Move a node to a new position; returns its previous (lat, lon) or None"""
+        previous = self.positions.get(node_id)
+        if latitude is None or longitude is None:
+            self.remove(node_id)
+            return previous and previous[:2]
+
+        if previous and previous[0] == latitude and previous[1] == longitude:
+            return previous[:2]
+
+        self.stats['updates'] += 1
+        cell = self.cell(latitude, longitude)
+        if previous and previous[2] != cell:
+            self.discard(node_id, previous[2])
+        self.cells.setdefault(cell, {})[node_id] = (latitude, longitude)
+        self.positions[node_id] = (latitude, longitude, cell)
+        self.stats['nodes'] = len(self.positions)
+        self.stats['cells'] = len(self.cells)
+        return previous and previous[:2]
+
+    def remove(self, node_id):
+        """Forget a node's position"""
+        previous = self.positions.pop(node_id, None)
+        if previous:
+            self.discard(node_id, previous[2])
+            self.stats['nodes'] = len(self.positions)
+            self.stats['cells'] = len(self.cells)
+
+    def discard(self, node_id, cell):
+        members = self.cells[cell]
+        del members[node_id]
+        if not members:
+            del self.cells[cell]
+
+    def cells_in(self, south, west, north, east):
+        """Occupied cells overlapping a bounding box"""
+        row_start, column_start = self.cell(max(south, -90.0), west)
+        row_end, column_end = self.cell(min(north, 90.0), east)
+        if west <= east:
+            column_ranges = ((column_start, column_end),)
+        else:
+            column_ranges = ((column_start, self.columns - 1), (0, column_end))
+        area = (row_end - row_start + 1) * sum(end - start + 1 for start, end in column_ranges)
+
+        if area > len(self.cells):
+            for (row, column), members in self.cells.items():
+                if row_start <= row <= row_end and any(start <= column <= end for start, end in column_ranges):
+                    yield members
+            return
+
+        for row in range(row_start, row_end + 1):
+            for start, end in column_ranges:
+                for column in range(start, end + 1):
+                    members = self.cells.get((row, column))
+                    if members:
+                        yield members
+
+    def bbox(self, south, west, north, east):
+        """Node ids inside [south, west, north, east]"""
+        self.stats['queries'] += 1
+        return [
+            node_id
+            for members in self.cells_in(south, west, north, east)
+            for node_id, (latitude, longitude) in members.items()
+            if in_bbox(latitude, longitude, south, west, north, east)
+        ]
+
+    def radius(self, latitude, longitude, meters):
+        """(distance, node id) for nodes within meters of a point, nearest first"""
+        self.stats['queries'] += 1
+        dlat = meters / METERS_PER_DEGREE
+        south, north = latitude - dlat, latitude + dlat
+        if south <= -90 or north >= 90:
+            west, east = -180.0, 180.0
+        else:
+            # Widest longitude span at the box edge nearest a pole
+            dlon = dlat / math.cos(math.radians(max(abs(south), abs(north))))
+            if dlon >= 180:
+                west, east = -180.0, 180.0
+            else:
+                west = (longitude - dlon + 180) % 360 - 180
+                east = (longitude + dlon + 180) % 360 - 180
+
+        found = []
+        for members in self.cells_in(south, west, north, east):
+            for node_id, (node_latitude, node_longitude) in members.items():
+                distance = haversine(latitude, longitude, node_latitude, node_longitude)
+                if distance <= meters:
+                    found.append((distance, node_id))
+        found.sort()
+        return found
+
+    def nearest(self, latitude, longitude, k):
+        """(distance, node id) for the k nodes nearest a point, nearest first"""
+        self.stats['queries'] += 1
+        if k <= 0 or not self.positions:
+            return []
+
+        center_row, center_column = self.cell(latitude, longitude)
+        best = []  # max-heap of (-distance, node_id)
+        for ring in range(self.columns):
+            # Once the rings cover more cells than are occupied, just check
+            # every node
+            if (2 * ring + 1) ** 2 > 4 * len(self.cells):
+                return heapq.nsmallest(k, (
+                    (haversine(latitude, longitude, node_latitude, node_longitude), node_id)
+                    for node_id, (node_latitude, node_longitude, _) in self.positions.items()
+                ))
+
+            for row, column in self.ring(center_row, center_column, ring):
+                for node_id, (node_latitude, node_longitude) in self.cells.get((row, column), {}).items():
+                    distance = haversine(latitude, longitude, node_latitude, node_longitude)
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, node_id))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, node_id))
+
+            # Anything outside the rings seen so far is at least ring cells
+            # away; cells are narrowest toward the pole
+            if len(best) == k:
+                edge = min(abs(latitude) + (ring + 1) * self.cell_degrees, 90.0)
+                reach = ring * self.cell_degrees * METERS_PER_DEGREE * math.cos(math.radians(edge))
+                if -best[0][0] <= reach:
+                    break
+
+        return sorted((-distance, node_id) for distance, node_id in best)
+
+    def ring(self, center_row, center_column, ring):
+        """Cells at Chebyshev distance ring from a center cell"""
+        if ring == 0:
+            yield center_row, center_column
+            return
+        columns = self.columns
+        for offset in range(-ring, ring + 1):
+            yield center_row - ring, (center_column + offset) % columns
+            yield center_row + ring, (center_column + offset) % columns
+        for offset in range(-ring + 1, ring):
+            yield center_row + offset, (center_column - ring) % columns
+            yield center_row + offset, (center_column + ring) % columns
@@ -0,0 +1,143 @@
+"""
+Static Assets for Meshtastic Command Center
+Web pages served over plain HTTP on the WebSocket port, compressed once at
+startup and revalidated by ETag so repeat loads cost a 304
+"""
+
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+from http import HTTPStatus
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FILES = ('meshtastic_command_center.html', 'meshtastic_standalone.html')
+
+# Pages are not fingerprinted, so browsers must revalidate them; the ETag
+# makes that a bodiless 304 while the file is unchanged
+CACHE_CONTROL = 'no-cache'
+
+# Best compression first
+ENCODINGS = ('br', 'gzip') if brotli else ('gzip',)
+
+
+def accepted_encodings(header):
+    """Content codings an Accept-Encoding header allows (q > 0)"""
+    accepted = set()
+    for item in (header or '').split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name and quality > 0:
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class StaticAsset:
+    """One file with its precompressed variants"""
+
+    __slots__ = ('name', 'content_type', 'etags', 'variants')
+
+    def __init__(self, name, body):
+        self.name = name
+        content_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        if content_type.startswith('text/'):
+            content_type += '; charset=utf-8'
+        self.content_type = content_type
+
+        # Only keep a compressed variant when it is actually smaller
+        self.variants = {'identity': body}
+        compressed = {'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli:
+            compressed['br'] = brotli.compress(body, quality=11)
+        for encoding, data in compressed.items():
+            if len(data) < len(body):
+                self.variants[encoding] = data
+
+        # Each encoding is its own representation and gets its own tag
+        digest = hashlib.sha256(body).hexdigest()[:20]
+        self.etags = {
+            encoding: f'"{digest}"' if encoding == 'identity' else f'"{digest}-{encoding}"'
+            for encoding in self.variants
+        }
+
+    def pick(self, accept_encoding):
+        """Smallest variant the client accepts"""
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ENCODINGS:
+            if encoding in self.variants and (encoding in accepted or '*' in accepted):
+                return encoding
+        return 'identity'
+
+
+class StaticAssets:
+    """
+    A fixed set of files read and compressed when the server starts; only
+    those names are served, so request paths never touch the filesystem
+    """
+
+    def __init__(self, directory, files=DEFAULT_FILES, index=None):
+        self.directory = directory
+        self.assets = {}
+        self.stats = {
+            'requests': 0,
+            'not_modified': 0,
+            'bytes_sent': 0
+        }
+
+        for name in files:
+            try:
+                with open(os.path.join(directory, name), 'rb') as f:
+                    body = f.read()
+            except OSError as e:
+                logger.warning(f"Not serving {name}: {e}")
+                continue
+            asset = self.assets['/' + name] = StaticAsset(name, body)
+            sizes = ', '.join(f'{encoding} {len(data)}' for encoding, data in asset.variants.items())
+            logger.info(f"Serving /{name} ({sizes} bytes)")
+
+        index = index or (files[0] if files else None)
+        if '/' + str(index) in self.assets:
+            self.assets['/'] = self.assets['/' + index]
+
+    def respond(self, path, request_headers):
+        """(status, headers, body) for a known asset path, else None"""
+        asset = self.assets.get(path)
+        if asset is None:
+            return None
+        self.stats['requests'] += 1
+
+        encoding = asset.pick(request_headers.get('Accept-Encoding'))
+        headers = [
+            ('ETag', asset.etags[encoding]),
+            ('Cache-Control', CACHE_CONTROL),
+            ('Vary', 'Accept-Encoding')
+        ]
+
+        # Any of the file's tags means the client's copy is current
+        tags = {tag.strip() for tag in request_headers.get('If-None-Match', '').split(',')}
+        tags |= {tag[2:] for tag in tags if tag.startswith('W/')}
+        if '*' in tags or tags & set(asset.etags.values()):
+            self.stats['not_modified'] += 1
+            return HTTPStatus.NOT_MODIFIED, headers, b''
+
+        body = asset.variants[encoding]
+        headers.append(('Content-Type', asset.content_type))
+        if encoding != 'identity':
+            headers.append(('Content-Encoding', encoding))
+        headers.append(('Content-Length', str(len(body))))
+        self.stats['bytes_sent'] += len(body)
+        return HTTPStatus.OK, headers, body
@@ -0,0 +1,142 @@
+"""
+Subscription Filters for Meshtastic Command Center
+Per-client predicates compiled from a 'subscribe' command and applied to
+broadcast frames before they are serialized
+"""
+
+from spatial_index import in_bbox
+
+EVENT_TYPES = ('node_update', 'message', 'stats_update', 'system_message')
+
+
+class SubscriptionFilter:
+    """Compiled filter over event types, node IDs, portnums and a bounding box"""
+
+    def __init__(self, events=None, nodes=None, portnums=None, bbox=None):
+        if events:
+            unknown = set(events) - set(EVENT_TYPES)
+            if unknown:
+                raise ValueError(f"Unknown event types: {sorted(unknown)}")
+
+        self.events = frozenset(events) if events else frozenset(EVENT_TYPES)
+        self.nodes = frozenset(nodes) if nodes else None
+        self.portnums = frozenset(portnums) if portnums else None
+        self.bbox = tuple(float(value) for value in bbox) if bbox else None
+        if self.bbox and len(self.bbox) != 4:
+            raise ValueError("bbox must be [south, west, north, east]")
+
+        # Identical filters share one encoded payload per frame
+        self.key = (
+            self.events,
+            self.nodes,
+            self.portnums,
+            self.bbox
+        )
+
+        self.node_checks = self.compile_node_checks()
+
+    @classmethod
+    def from_command(cls, data):
+        """Build a filter from a subscribe command"""
+        return cls(
+            events=data.get('events'),
+            nodes=data.get('nodes'),
+            portnums=data.get('portnums'),
+            bbox=data.get('bbox')
+        )
+
+    def compile_node_checks(self):
+        """Build the list of predicates a node must pass, skipping unused ones"""
+        checks = []
+
+        if self.nodes is not None:
+            nodes = self.nodes
+            checks.append(lambda node, portnums, previous: node.id in nodes)
+
+        if self.portnums is not None:
+            wanted = self.portnums
+            checks.append(lambda node, portnums, previous: bool(portnums and wanted & portnums))
+
+        if self.bbox is not None:
+            bbox = self.bbox
+
+            def in_view(node, portnums, previous):
+                # A node that just left the box is sent once more so the
+                # client sees it go
+                if node.latitude is not None and node.longitude is not None:
+                    if in_bbox(node.latitude, node.longitude, *bbox):
+                        return True
+                return previous is not None and in_bbox(*previous, *bbox)
+
+            checks.append(in_view)
+
+        return checks
+
+    def wants_node(self, node, portnums=None, previous=None):
+        """
+        Whether a node change (caused by the given portnums, moving from the
+        previous (lat, lon)) passes the filter
+        """
+        return all(check(node, portnums, previous) for check in self.node_checks)
+
+    def wants_message(self, message):
+        """Whether a text message passes the filter"""
+        if 'message' not in self.events:
+            return False
+        if self.nodes is not None and message.get('from_id') not in self.nodes:
+            return False
+        if self.portnums is not None and 'TEXT_MESSAGE_APP' not in self.portnums:
+            return False
+        return True
+
+    def apply(self, data, node_portnums=None, moved_from=None):
+        """
+        Return the frame this client should get: data itself, a reduced
+        copy, or None when nothing in it was asked for
+        """
+        frame_type = data.get('type')
+
+        if frame_type == 'batch_update':
+            node_portnums = node_portnums or {}
+            moved_from = moved_from or {}
+            nodes = []
+            if 'node_update' in self.events:
+                nodes = [
+                    node for node in data['nodes']
+                    if self.wants_node(node, node_portnums.get(node.id), moved_from.get(node.id))
+                ]
+            messages = [message for message in data['messages'] if self.wants_message(message)]
+            with_stats = 'stats_update' in self.events
+
+            if not nodes and not messages and not with_stats:
+                return None
+            if (len(nodes) == len(data['nodes']) and len(messages) == len(data['messages'])
+                    and with_stats):
+                return data
+
+            frame = dict(data, nodes=nodes, messages=messages)
+            if not with_stats:
+                del frame['stats']
+            return frame
+
+        if frame_type == 'node_update':
+            if 'node_update' not in self.events or not self.wants_node(data['node']):
+                return None
+            return data
+
+        if frame_type == 'stats_update':
+            return data if 'stats_update' in self.events else None
+
+        if frame_type == 'system_message':
+            return data if 'system_message' in self.events else None
+
+        return data
+
+    def describe(self):
+        """JSON-friendly form of the filter"""
+        return {
+            'events': sorted(self.events),
+            'nodes': sorted(self.nodes) if self.nodes is not None else None,
+            'portnums': sorted(self.portnums) if self.portnums is not None else None,
+            'bbox': list(self.bbox) if self.bbox else None
+        }
@@ -0,0 +1,106 @@
+"""
+Shared fixtures for the Meshtastic Command Center tests
+A server without radios (as the benchmarks use it) and a fake WebSocket
+that records every frame sent to it
+"""
+
+import asyncio
+import logging
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from node_record import NodeRecord
+
+logging.disable(logging.INFO)
+
+
+class RecordingSocket:
+    """Stands in for a client connection: collects sent payloads and yields queued commands"""
+
+    remote_address = ('test', 0)
+
+    def __init__(self, subprotocol=None):
+        self.subprotocol = subprotocol
+        self.sent = []
+        self.incoming = asyncio.Queue()
+
+    async def send(self, payload):
+        self.sent.append(payload)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = await self.incoming.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+    async def close(self, code=1000, reason=''):
+        self.incoming.put_nowait(None)
+
+
+class FakeClient:
+    """One connection driven through MeshtasticServer.handle_client"""
+
+    def __init__(self, server, path='/', subprotocol=None):
+        self.server = server
+        self.path = path
+        self.socket = RecordingSocket(subprotocol)
+        self.task = None
+
+    @property
+    def sent(self):
+        return self.socket.sent
+
+    async def open(self):
+        self.task = asyncio.create_task(self.server.handle_client(self.socket, self.path))
+        await asyncio.sleep(0)
+        return self
+
+    async def command(self, data):
+        await self.socket.incoming.put(data)
+
+    async def frames(self, count, timeout=2.0):
+        """Wait until at least count payloads were sent, and return them"""
+        deadline = time.monotonic() + timeout
+        while len(self.sent) < count:
+            assert time.monotonic() < deadline, f"only {len(self.sent)} of {count} frames arrived"
+            await asyncio.sleep(0.01)
+        return self.sent
+
+    async def close(self):
+        await self.socket.close()
+        await self.task
+
+
+def make_node(i, now=None):
+    """A positioned node record"""
+    now = now or time.time()
+    node = NodeRecord(f'!{i:08x}', now - 60)
+    node.name = f'Node {i}'
+    node.last_seen = now
+    node.snr = 6.25
+    node.rssi = -92
+    node.set_position(45.4981 + i * 1e-4, -122.4404, 61)
+    return node
+
+
+@pytest.fixture
+def client(server):
+    """Factory for fake connections to the server fixture"""
+    return lambda path='/', subprotocol=None: FakeClient(server, path, subprotocol)
+
+
+@pytest.fixture
+def server():
+    """A server with no radio connection and no packet store"""
+    from meshtastic_server import MeshtasticServer
+    server = MeshtasticServer(db_path=None, ws_port=0, journal_size=8)
+    yield server
+    server.messages.close()
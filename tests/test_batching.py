@@ -0,0 +1,103 @@
+"""Batched fan-out: a burst of packets reaches each client as one batch_update"""
+
+import asyncio
+import json
+
+import pytest
+
+# The server needs the packages in tests/requirements.txt
+pytest.importorskip('meshtastic_server')
+
+
+def position_packet(packet_id, node):
+    return {
+        'id': packet_id,
+        'from': node,
+        'fromId': f'!{node:08x}',
+        'decoded': {'portnum': 'POSITION_APP', 'position': {'latitude': 45.5, 'longitude': -122.6 + packet_id * 1e-5}},
+        'rxSnr': 5.0,
+        'rxRssi': -90,
+        'hopStart': 3,
+        'hopLimit': 3
+    }
+
+
+def text_packet(packet_id, node, text):
+    return {
+        'id': packet_id,
+        'from': node,
+        'fromId': f'!{node:08x}',
+        'decoded': {'portnum': 'TEXT_MESSAGE_APP', 'text': text},
+        'rxSnr': 5.0,
+        'rxRssi': -90
+    }
+
+
+def burst(server, client, packets, clients=3):
+    """Connect clients, feed packets, flush one tick; returns (frames per client, stats delta)"""
+    async def scenario():
+        connections = [await client('/').open() for _ in range(clients)]
+        for connection in connections:
+            await connection.frames(1)
+        before = dict(server.fanout_stats)
+
+        for packet in packets:
+            server.on_receive(packet)
+        await server.flush_pending()
+
+        for connection in connections:
+            await connection.frames(2)
+        delta = {key: server.fanout_stats[key] - before.get(key, 0) for key in server.fanout_stats}
+        frames = [[json.loads(payload) for payload in connection.sent[1:]] for connection in connections]
+        for connection in connections:
+            await connection.close()
+        return frames, delta
+
+    return asyncio.run(scenario())
+
+
+def test_burst_goes_out_as_one_frame_per_client(server, client):
+    packets = [position_packet(i, 0x10 + i % 5) for i in range(1, 201)]
+    frames, delta = burst(server, client, packets)
+
+    for received in frames:
+        [frame] = received
+        assert frame['type'] == 'batch_update'
+        assert sorted(node['id'] for node in frame['nodes']) == [f'!{0x10 + i:08x}' for i in range(5)]
+
+    # Every update past the first per node was folded into its entry
+    assert delta['updates_queued'] >= 200
+    assert delta['updates_queued'] - delta['updates_coalesced'] == 5
+    # One frame broadcast, one send per client, and no task per packet
+    assert delta['frames_broadcast'] == 1
+    assert delta['frames_sent'] == 3
+    assert delta['tasks_created'] == 0
+    assert delta['frames_dropped'] == 0
+
+
+def test_messages_ride_in_the_same_frame(server, client):
+    packets = [position_packet(1, 0x10), text_packet(2, 0x11, 'hello'), text_packet(3, 0x10, 'world')]
+    frames, delta = burst(server, client, packets, clients=1)
+
+    [[frame]] = frames
+    assert [message['text'] for message in frame['messages']] == ['hello', 'world']
+    assert {node['id'] for node in frame['nodes']} == {'!00000010', '!00000011'}
+    assert delta['frames_broadcast'] == 1
+
+
+def test_each_tick_is_a_new_frame(server, client):
+    async def scenario():
+        connection = await client('/').open()
+        await connection.frames(1)
+        for tick in range(3):
+            for i in range(10):
+                server.on_receive(position_packet(tick * 10 + i + 1, 0x20))
+            await server.flush_pending()
+        sent = await connection.frames(4)
+        await connection.close()
+        return [json.loads(payload) for payload in sent[1:]]
+
+    frames = asyncio.run(scenario())
+    assert [len(frame['nodes']) for frame in frames] == [1, 1, 1]
+    stats = server.fanout_stats
+    assert stats['updates_queued'] - stats['updates_coalesced'] == 3
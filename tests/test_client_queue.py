@@ -0,0 +1,114 @@
+"""Per-client send queues: what each slow-client policy does when the queue is full"""
+
+import asyncio
+import json
+
+import pytest
+
+# The server needs the packages in tests/requirements.txt
+pytest.importorskip('meshtastic_server')
+
+from conftest import RecordingSocket, make_node
+from meshtastic_server import ClientSession
+
+
+def update(seq, *indexes):
+    return {
+        'type': 'batch_update',
+        'seq': seq,
+        'nodes': [make_node(i) for i in indexes],
+        'messages': [{'text': f'message {seq}'}],
+        'stats': {'seq': seq}
+    }
+
+
+def session(policy, max_queue=4):
+    """A session whose writer is never started, so frames stay queued"""
+    stats = {'frames_dropped': 0, 'tasks_created': 0}
+    return ClientSession(RecordingSocket(), stats, max_queue=max_queue, policy=policy)
+
+
+def fill(client, frames):
+    for frame in frames:
+        client.send(frame)
+
+
+def queued(client):
+    return [data for data, _ in client.queue]
+
+
+def test_drop_oldest_keeps_the_newest_frames():
+    client = session('drop_oldest')
+    fill(client, [update(seq, seq) for seq in range(1, 8)])
+
+    assert [frame['seq'] for frame in queued(client)] == [4, 5, 6, 7]
+    assert client.stats['dropped'] == 3
+    assert client.fanout_stats['frames_dropped'] == 3
+    assert client.stats['collapsed'] == 0
+
+
+def test_collapse_merges_only_neighbouring_updates():
+    client = session('collapse')
+    reply = {'type': 'history', 'messages': []}
+    system = {'type': 'system_message', 'text': 'radio reconnected'}
+    fill(client, [update(1, 1), update(2, 2), reply, update(3, 1)])
+    # Full: the next frame collapses the queue before it is added
+    client.send(system)
+
+    frames = queued(client)
+    assert [frame['type'] for frame in frames] == ['batch_update', 'history', 'batch_update', 'system_message']
+    first = frames[0]
+    assert first['seq'] == 2
+    assert sorted(node.id for node in first['nodes']) == ['!00000001', '!00000002']
+    assert [message['text'] for message in first['messages']] == ['message 1', 'message 2']
+    assert first['stats'] == {'seq': 2}
+    # The reply stays between the updates it was queued between
+    assert frames[1] is reply
+    assert frames[2]['seq'] == 3
+    assert client.stats['collapsed'] == 1
+    assert client.stats['dropped'] == 0
+
+
+def test_collapsed_frame_is_reencoded():
+    client = session('collapse')
+    fill(client, [update(seq, seq) for seq in range(1, 6)])
+
+    frame, payload = client.queue[0]
+    decoded = json.loads(payload)
+    assert decoded['seq'] == frame['seq'] == 4
+    assert [node['id'] for node in decoded['nodes']] == [f'!{i:08x}' for i in range(1, 5)]
+
+
+def test_collapse_drops_the_oldest_when_nothing_merges():
+    client = session('collapse')
+    replies = [{'type': 'history', 'page': page} for page in range(6)]
+    fill(client, replies)
+
+    assert [frame['page'] for frame in queued(client)] == [2, 3, 4, 5]
+    assert client.stats['collapsed'] == 0
+    assert client.stats['dropped'] == 2
+
+
+def test_disconnect_closes_with_1013():
+    closed = []
+
+    class ClosingSocket(RecordingSocket):
+        async def close(self, code=1000, reason=''):
+            closed.append((code, reason))
+
+    async def scenario():
+        client = ClientSession(ClosingSocket(), {'frames_dropped': 0, 'tasks_created': 0},
+                               max_queue=4, policy='disconnect')
+        fill(client, [update(seq, seq) for seq in range(1, 6)])
+        await asyncio.sleep(0)
+        return client
+
+    client = asyncio.run(scenario())
+    assert client.closed
+    assert not client.queue
+    assert client.stats['dropped'] == 4
+    assert closed == [(1013, 'slow consumer')]
+
+    # Nothing more is queued for a closed client
+    client.send(update(6, 6))
+    assert not client.queue
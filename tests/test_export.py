@@ -0,0 +1,132 @@
+"""export_data streaming: NDJSON chunk frames bounded by export_chunk_size"""
+
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+# The server needs the packages in tests/requirements.txt
+pytest.importorskip('meshtastic_server')
+
+from conftest import RecordingSocket, make_node
+from meshtastic_server import ClientSession
+
+
+def fill(server, node_count=20, message_count=200):
+    """Nodes plus one message per second ending now"""
+    for i in range(node_count):
+        node = make_node(i)
+        server.nodes[node.id] = node
+
+    start = datetime.now() - timedelta(seconds=message_count)
+    for i in range(message_count):
+        server.messages.append({
+            'from': f'Node {i % node_count}',
+            'from_id': f'!{i % node_count:08x}',
+            'text': f'Status report {i}',
+            'timestamp': (start + timedelta(seconds=i)).isoformat()
+        })
+
+
+def export(server, options=None):
+    """Run one export through a client session and return the decoded frames"""
+    async def scenario():
+        socket = RecordingSocket()
+        session = ClientSession(socket, server.fanout_stats, max_queue=4, fragments=server.fragments)
+        session.start()
+        await server.stream_export(session, options or {})
+        while session.queue:
+            await asyncio.sleep(0)
+        session.close()
+        return [json.loads(payload) for payload in socket.sent]
+
+    return asyncio.run(scenario())
+
+
+def test_chunks_are_bounded_and_complete(server):
+    server.export_chunk_size = 1024
+    fill(server)
+
+    start, *chunks, end = export(server)
+    assert start['type'] == 'export_start'
+    assert end['type'] == 'export_end'
+    assert all(frame['type'] == 'export_chunk' for frame in chunks)
+    assert len(chunks) == end['chunks'] > 1
+    assert [frame['index'] for frame in chunks] == list(range(len(chunks)))
+    assert {frame['export_id'] for frame in chunks} == {start['export_id']}
+
+    # A chunk is sent once it reaches the size, so it overshoots by at most one line
+    longest_line = max(len(line) + 1 for frame in chunks for line in frame['data'].splitlines())
+    for frame in chunks:
+        assert frame['data'].endswith('\n')
+        assert len(frame['data']) < server.export_chunk_size + longest_line
+
+    body = ''.join(frame['data'] for frame in chunks)
+    assert end['bytes'] == len(body)
+    assert end['sha256'] == hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+    records = [json.loads(line) for line in body.splitlines()]
+    assert [record['kind'] for record in records] == ['node'] * 20 + ['message'] * 200
+    assert (end['nodes'], end['messages']) == (20, 200)
+    assert [record['text'] for record in records[20:]] == [f'Status report {i}' for i in range(200)]
+
+
+def test_small_export_is_one_chunk(server):
+    fill(server, node_count=2, message_count=3)
+    start, chunk, end = export(server)
+    assert chunk['type'] == 'export_chunk'
+    assert chunk['index'] == 0
+    assert len(chunk['data'].splitlines()) == 5
+    assert end['chunks'] == 1
+
+
+def test_empty_export_has_no_chunks(server):
+    start, end = export(server)
+    assert end['type'] == 'export_end'
+    assert (end['chunks'], end['bytes'], end['nodes'], end['messages']) == (0, 0, 0, 0)
+
+
+def test_filters_apply_before_chunking(server):
+    server.export_chunk_size = 256
+    fill(server)
+    since = (datetime.now() - timedelta(seconds=50)).isoformat()
+
+    start, *chunks, end = export(server, {'nodes': ['!00000001'], 'since': since})
+    assert start['filters']['nodes'] == ['!00000001']
+    records = [json.loads(line) for frame in chunks for line in frame['data'].splitlines()]
+    nodes = [record for record in records if record['kind'] == 'node']
+    messages = [record for record in records if record['kind'] == 'message']
+    assert [node['id'] for node in nodes] == ['!00000001']
+    assert {message['from_id'] for message in messages} == {'!00000001'}
+    assert all(message['timestamp'] >= since for message in messages)
+    assert (end['nodes'], end['messages']) == (1, len(messages))
+    assert messages
+
+
+def test_slow_client_gets_every_chunk(server):
+    """Export waits for the queue to drain instead of overflowing it"""
+    server.export_chunk_size = 512
+    fill(server, message_count=500)
+
+    class SlowSocket(RecordingSocket):
+        async def send(self, payload):
+            await asyncio.sleep(0.001)
+            await super().send(payload)
+
+    async def scenario():
+        socket = SlowSocket()
+        session = ClientSession(socket, server.fanout_stats, max_queue=4, fragments=server.fragments)
+        session.start()
+        await server.stream_export(session, {})
+        # The writer pops the last frame before its send finishes
+        while not (socket.sent and 'export_end' in socket.sent[-1]):
+            await asyncio.sleep(0.001)
+        session.close()
+        return [json.loads(payload) for payload in socket.sent]
+
+    start, *chunks, end = asyncio.run(scenario())
+    assert end['type'] == 'export_end'
+    assert len(chunks) == end['chunks'] > 4
+    assert server.fanout_stats['frames_dropped'] == 0
@@ -0,0 +1,105 @@
+"""Incremental path trees agree with a full Dijkstra after any sequence of link changes"""
+
+import heapq
+import math
+import random
+
+import pytest
+
+from mesh_topology import MeshTopology
+
+
+def dijkstra(adjacency, roots, weight):
+    """Reference costs computed from scratch"""
+    cost = {root: 0.0 for root in roots}
+    heap = [(0.0, root) for root in roots]
+    while heap:
+        distance, node = heapq.heappop(heap)
+        if distance > cost[node]:
+            continue
+        for neighbor, link in adjacency[node].items():
+            candidate = distance + weight(link)
+            if candidate < cost.get(neighbor, math.inf):
+                cost[neighbor] = candidate
+                heapq.heappush(heap, (candidate, neighbor))
+    return cost
+
+
+def check(topology):
+    """Every tree matches Dijkstra and holds no stale or inconsistent entries"""
+    adjacency = topology.adjacency
+    for tree in topology.trees:
+        expected = dijkstra(adjacency, topology.roots, tree.weight)
+        assert tree.cost.keys() == expected.keys()
+        for node, cost in expected.items():
+            assert tree.cost[node] == pytest.approx(cost, abs=1e-6)
+
+        assert tree.parent.keys() == tree.cost.keys()
+        for node, parent in tree.parent.items():
+            if parent is None:
+                assert node in topology.roots
+                continue
+            link = adjacency[parent][node]
+            assert tree.cost[node] == pytest.approx(tree.cost[parent] + tree.weight(link), abs=1e-6)
+            assert node in tree.children[parent]
+
+        for parent, children in tree.children.items():
+            assert parent in adjacency
+            assert all(tree.parent.get(child) == parent for child in children)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_changes_match_full_dijkstra(seed):
+    rng = random.Random(seed)
+    topology = MeshTopology(prune_interval=math.inf)
+    nodes = [f'!{i:08x}' for i in range(25)]
+    topology.add_root(nodes[0])
+    topology.add_root(nodes[1])
+
+    for step in range(400):
+        links = [(a, b) for a, neighbors in topology.adjacency.items() for b in neighbors if a < b]
+        action = rng.random()
+        if action < 0.45 or not links:
+            a, b = rng.sample(nodes, 2)
+            snr = rng.choice([None, rng.uniform(-20, 10)])
+            topology.link(a, b, snr, 'neighbor', now=1000.0 + step)
+        elif action < 0.75:
+            # A new reading moves the smoothed SNR either way
+            a, b = rng.choice(links)
+            topology.link(a, b, rng.uniform(-20, 10), 'direct', now=1000.0 + step)
+        else:
+            topology.unlink(*rng.choice(links))
+        check(topology)
+
+
+def test_isolated_nodes_are_forgotten():
+    topology = MeshTopology(prune_interval=math.inf)
+    topology.add_root('!root')
+    topology.link('!root', '!a', 5.0, 'direct', now=1.0)
+    topology.link('!a', '!b', 5.0, 'neighbor', now=1.0)
+    assert topology.path('!b') == ['!root', '!a', '!b']
+
+    topology.unlink('!a', '!b')
+    assert '!b' not in topology.adjacency
+    assert topology.path('!b') is None
+    check(topology)
+
+    # The root keeps its entry even with no links left
+    topology.unlink('!root', '!a')
+    assert list(topology.adjacency) == ['!root']
+    assert all(tree.cost == {'!root': 0.0} for tree in topology.trees)
+    check(topology)
+
+
+def test_dearer_tree_link_reroutes_the_subtree():
+    topology = MeshTopology(prune_interval=math.inf, snr_gain=1.0)
+    topology.add_root('!root')
+    for a, b in (('!root', '!a'), ('!a', '!b'), ('!b', '!c'), ('!root', '!d'), ('!d', '!b')):
+        topology.link(a, b, 8.0, 'neighbor', now=1.0)
+    topology.link('!root', '!a', 10.0, 'neighbor', now=1.0)
+    assert topology.path('!c', reliable=True) == ['!root', '!a', '!b', '!c']
+
+    # The link the subtree hangs from gets much worse
+    topology.link('!root', '!a', -19.0, 'neighbor', now=2.0)
+    assert topology.path('!c', reliable=True) == ['!root', '!d', '!b', '!c']
+    check(topology)
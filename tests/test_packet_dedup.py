@@ -0,0 +1,123 @@
+"""Packet dedup: TTL expiry, the size bound, and merging later copies into the node"""
+
+import types
+
+import pytest
+
+import packet_dedup
+from packet_dedup import PacketDedup
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A fake monotonic clock for the dedup module only"""
+    clock = types.SimpleNamespace(now=100.0)
+    monkeypatch.setattr(packet_dedup, 'time', types.SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def packet(packet_id, sender=0x42, **fields):
+    return {'id': packet_id, 'from': sender, 'fromId': f'!{sender:08x}', **fields}
+
+
+def test_copies_within_the_ttl_are_duplicates(clock):
+    dedup = PacketDedup(ttl=60.0)
+    assert dedup.check(packet(1), 'a') == (False, False)
+    clock.now += 59.0
+    assert dedup.check(packet(1), 'a') == (True, False)
+    assert dedup.check(packet(1), 'b') == (True, True)
+    # Same id from another sender is a different packet
+    assert dedup.check(packet(1, sender=0x43), 'a') == (False, False)
+    assert dedup.stats['duplicates'] == 2
+    assert dedup.stats['cross_source'] == 1
+
+
+def test_entries_expire_after_the_ttl(clock):
+    dedup = PacketDedup(ttl=60.0)
+    dedup.check(packet(1))
+    clock.now += 30.0
+    dedup.check(packet(2))
+
+    clock.now += 30.0
+    assert dedup.check(packet(1)) == (False, False)
+    assert dedup.check(packet(2)) == (True, False)
+
+    clock.now += 120.0
+    dedup.expire()
+    assert dedup.entries == {}
+    assert dedup.stats['size'] == 0
+
+
+def test_size_bound_evicts_the_oldest(clock):
+    dedup = PacketDedup(ttl=3600.0, max_entries=100)
+    for packet_id in range(1, 251):
+        dedup.check(packet(packet_id))
+        clock.now += 0.01
+
+    assert len(dedup.entries) == dedup.stats['size'] == 100
+    assert dedup.stats['evicted'] == 150
+    assert dedup.check(packet(250)) == (True, False)
+    # Evicted keys are treated as new again
+    assert dedup.check(packet(1)) == (False, False)
+
+
+def test_packets_without_an_id_are_never_duplicates(clock):
+    dedup = PacketDedup()
+    assert dedup.check({'from': 1}) == (False, False)
+    assert dedup.check({'from': 1}) == (False, False)
+    assert dedup.entries == {}
+
+
+def text_packet(hops, snr, rssi):
+    return packet(
+        77,
+        decoded={'portnum': 'TEXT_MESSAGE_APP', 'text': 'hello'},
+        rxSnr=snr,
+        rxRssi=rssi,
+        hopStart=3,
+        hopLimit=3 - hops
+    )
+
+
+@pytest.fixture
+def gateway():
+    pytest.importorskip('meshtastic_server')
+    from meshtastic_server import MeshtasticServer
+
+    server = MeshtasticServer(db_path=None, ws_port=0)
+    yield server
+    server.messages.close()
+
+
+def test_later_copy_improves_hops_and_link_without_double_counting(gateway):
+    gateway.process_packet(text_packet(hops=3, snr=-10.0, rssi=-120), '/dev/a')
+    node = gateway.nodes['!00000042']
+    counted = (node.packets, gateway.stats['total_messages'], len(gateway.messages))
+    assert node.hops == 3
+
+    # The same packet over a shorter path, heard by a second radio
+    gateway.process_packet(text_packet(hops=1, snr=6.0, rssi=-80), '/dev/b')
+    assert node.hops == 1
+    assert set(node.radios) == {'/dev/a', '/dev/b'}
+    assert node.best_radio == '/dev/b'
+    assert node.snr == 6.0
+
+    # A copy the same radio already heard only updates the hop count
+    gateway.process_packet(text_packet(hops=0, snr=-15.0, rssi=-125), '/dev/b')
+    assert node.hops == 0
+    assert node.snr == 6.0
+
+    assert (node.packets, gateway.stats['total_messages'], len(gateway.messages)) == counted
+    assert gateway.dedup.stats['duplicates'] == 2
+    assert gateway.dedup.stats['cross_source'] == 1
+
+
+def test_duplicates_are_dropped_when_merging_is_off(gateway):
+    gateway.merge_duplicates = False
+    gateway.process_packet(text_packet(hops=3, snr=-10.0, rssi=-120), '/dev/a')
+    gateway.process_packet(text_packet(hops=1, snr=6.0, rssi=-80), '/dev/b')
+
+    node = gateway.nodes['!00000042']
+    assert node.hops == 3
+    assert list(node.radios) == ['/dev/a']
+    assert len(gateway.messages) == 1
@@ -0,0 +1,24 @@
+"""get_packets answers with an error frame when there is no packet log"""
+
+import asyncio
+import json
+
+import pytest
+
+# The server needs the packages in tests/requirements.txt
+pytest.importorskip('meshtastic_server')
+
+
+def test_get_packets_without_store_is_an_error(server, client):
+    async def scenario():
+        connection = await client('/').open()
+        await connection.frames(1)
+        await connection.command(json.dumps({'command': 'get_packets', 'limit': 10}))
+        sent = await connection.frames(2)
+        await connection.close()
+        return json.loads(sent[1])
+
+    frame = asyncio.run(scenario())
+    assert frame['type'] == 'error'
+    assert frame['command'] == 'get_packets'
+    assert 'db_path' in frame['error']
@@ -0,0 +1,92 @@
+"""Multi-radio ingest: packets are credited to the radio whose interface heard them"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+# The server needs the packages in tests/requirements.txt
+pytest.importorskip('meshtastic_server')
+
+import mesh_simulator
+import radio_worker
+from meshtastic_server import MeshtasticServer
+
+
+def position_packet(snr=5.0):
+    return {
+        'id': 7,
+        'from': 0x42,
+        'fromId': '!00000042',
+        'decoded': {'portnum': 'POSITION_APP', 'position': {'latitude': 45.5, 'longitude': -122.6}},
+        'rxSnr': snr,
+        'rxRssi': -90,
+        'hopStart': 3,
+        'hopLimit': 3
+    }
+
+
+@pytest.fixture
+def gateway():
+    """Two radios that are never actually opened"""
+    server = MeshtasticServer(port=['/dev/ttyACM0', '/dev/ttyUSB0'], db_path=None, ws_port=0)
+    yield server
+    server.cleanup()
+
+
+def test_packet_before_interface_is_recorded_waits_for_its_radio(gateway):
+    _, second = gateway.radios.values()
+    interface = object()
+
+    # SerialInterface() is still being constructed on the radio thread
+    second.set_state('connecting')
+    gateway.on_receive(position_packet(), interface)
+    assert '!00000042' not in gateway.nodes
+
+    second.interface = interface
+    second.set_state('connected')
+    node = gateway.nodes['!00000042']
+    assert list(node.radios) == ['/dev/ttyUSB0']
+    assert node.best_radio == '/dev/ttyUSB0'
+    assert gateway.ingest_stats['events_received'] == 1
+
+
+def test_held_events_fall_back_to_primary_when_no_radio_claims_them(gateway):
+    _, second = gateway.radios.values()
+    second.set_state('connecting')
+    gateway.on_receive(position_packet(), object())
+
+    # The open failed, so the interface that sent the packet is gone
+    second.set_state('disconnected')
+    assert list(gateway.nodes['!00000042'].radios) == ['/dev/ttyACM0']
+    assert not gateway.unclaimed_events
+
+
+def test_known_interfaces_are_credited_at_once(gateway):
+    primary, second = gateway.radios.values()
+    primary.interface, second.interface = object(), object()
+    primary.state = second.state = 'connected'
+
+    gateway.on_receive(position_packet(snr=2.0), primary.interface)
+    gateway.on_receive(dict(position_packet(snr=8.0), id=8), second.interface)
+
+    node = gateway.nodes['!00000042']
+    assert set(node.radios) == {'/dev/ttyACM0', '/dev/ttyUSB0'}
+    assert node.best_radio == '/dev/ttyUSB0'
+
+
+def test_packets_without_an_interface_go_to_primary(gateway):
+    _, second = gateway.radios.values()
+    second.set_state('connecting')
+    gateway.on_receive(position_packet())
+    assert list(gateway.nodes['!00000042'].radios) == ['/dev/ttyACM0']
+
+
+def test_simulator_is_imported_only_for_simulated_ports():
+    assert radio_worker.SIMULATED_SCHEMES == mesh_simulator.SCHEMES
+    # A fresh interpreter shows what importing the worker pulls in
+    script = "import sys, radio_worker; print('mesh_simulator' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True,
+                            cwd=os.path.dirname(radio_worker.__file__), check=True)
+    assert result.stdout.strip() == 'False'
@@ -0,0 +1,138 @@
+"""Batch sequence numbers and resume_from reconnects"""
+
+import asyncio
+import json
+
+import pytest
+
+# The server needs the packages in tests/requirements.txt
+pytest.importorskip('meshtastic_server')
+
+from conftest import make_node
+
+
+def flush(server, *indexes):
+    """Mark nodes as changed and send one batch_update; returns its seq"""
+    for i in indexes:
+        node = server.nodes.setdefault(f'!{i:08x}', make_node(i))
+        server.queue_node_update(node.id)
+    asyncio.run(server.flush_pending())
+    return server.seq
+
+
+def resume_path(server, seq, instance=None):
+    return f'/?resume_from={seq}&instance={instance or server.instance_id}'
+
+
+def test_seq_increases_by_one_per_batch(server, client):
+    async def scenario():
+        connection = await client('/').open()
+        await connection.frames(1)
+        for i in range(5):
+            server.queue_node_update(server.nodes.setdefault(f'!{i:08x}', make_node(i)).id)
+            await server.flush_pending()
+        sent = await connection.frames(6)
+        await connection.close()
+        return [json.loads(payload) for payload in sent]
+
+    init, *updates = asyncio.run(scenario())
+    assert init['type'] == 'init'
+    assert [frame['type'] for frame in updates] == ['batch_update'] * 5
+    assert [frame['seq'] for frame in updates] == list(range(init['seq'] + 1, init['seq'] + 6))
+
+
+def test_empty_tick_does_not_use_a_seq(server):
+    seq = flush(server, 1)
+    asyncio.run(server.flush_pending())
+    assert server.seq == seq
+    assert flush(server, 2) == seq + 1
+
+
+def test_snapshot_carries_instance_and_latest_seq(server):
+    flush(server, 1)
+    flush(server, 2)
+    frame = server.snapshot_frame('/')
+    assert frame['type'] == 'init'
+    assert frame['instance'] == server.instance_id
+    assert frame['seq'] == server.seq
+
+
+def test_resume_sends_only_missed_changes(server):
+    flush(server, 1, 2)
+    seen = flush(server, 3)
+    flush(server, 1)
+    flush(server, 4)
+
+    frame = server.snapshot_frame(resume_path(server, seen))
+    assert frame['type'] == 'resume'
+    assert frame['from_seq'] == seen
+    assert frame['seq'] == server.seq
+    assert sorted(node.id for node in frame['nodes']) == ['!00000001', '!00000004']
+    assert server.fanout_stats['resumes'] == 1
+
+
+def test_resume_when_up_to_date_is_empty(server):
+    seen = flush(server, 1)
+    frame = server.snapshot_frame(resume_path(server, seen))
+    assert frame['type'] == 'resume'
+    assert frame['nodes'] == []
+    assert frame['messages'] == []
+
+
+def test_resume_continues_the_sequence(server, client):
+    seen = flush(server, 1)
+    flush(server, 2)
+
+    async def scenario():
+        connection = await client(resume_path(server, seen)).open()
+        await connection.frames(1)
+        server.queue_node_update('!00000001')
+        await server.flush_pending()
+        sent = await connection.frames(2)
+        await connection.close()
+        return [json.loads(payload) for payload in sent]
+
+    resume, update = asyncio.run(scenario())
+    assert resume['type'] == 'resume'
+    assert update['seq'] == resume['seq'] + 1
+
+
+def test_other_instance_gets_full_snapshot(server):
+    seen = flush(server, 1)
+    frame = server.snapshot_frame(resume_path(server, seen, instance='0123456789ab'))
+    assert frame['type'] == 'init'
+
+
+def test_seq_older_than_journal_gets_full_snapshot(server):
+    # The fixture journal holds 8 frames
+    for i in range(12):
+        flush(server, i)
+    oldest = server.journal[0]['seq']
+
+    assert server.snapshot_frame(resume_path(server, oldest - 1))['type'] == 'resume'
+    assert server.snapshot_frame(resume_path(server, oldest - 2))['type'] == 'init'
+
+
+def test_bad_or_future_seq_gets_full_snapshot(server):
+    flush(server, 1)
+    assert server.snapshot_frame(resume_path(server, server.seq + 1))['type'] == 'init'
+    assert server.snapshot_frame(resume_path(server, 'abc'))['type'] == 'init'
+    assert server.snapshot_frame('/?resume_from=1')['type'] == 'init'
+
+
+def test_resume_replays_missed_messages_in_order(server):
+    seen = flush(server, 1)
+    for i, text in enumerate(['first', 'second', 'third']):
+        server.on_receive({
+            'id': 100 + i,
+            'from': 2,
+            'fromId': '!00000002',
+            'decoded': {'portnum': 'TEXT_MESSAGE_APP', 'text': text}
+        })
+        asyncio.run(server.flush_pending())
+
+    frame = server.snapshot_frame(resume_path(server, seen))
+    assert frame['type'] == 'resume'
+    assert [message['text'] for message in frame['messages']] == ['first', 'second', 'third']
+    # The node changed in every frame but is sent once, in its latest state
+    assert [node.id for node in frame['nodes']] == ['!00000002']
@@ -0,0 +1,125 @@
+"""Grid index queries agree with a brute-force scan, including across the antimeridian and near the poles"""
+
+import random
+
+import pytest
+
+from spatial_index import SpatialIndex, haversine
+
+
+def random_points(rng, count):
+    """Uniform points plus clusters on the antimeridian and at both poles"""
+    points = []
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            latitude, longitude = rng.uniform(-90, 90), rng.uniform(-180, 180)
+        elif kind == 1:
+            latitude, longitude = rng.uniform(-60, 60), rng.choice([rng.uniform(177, 180), rng.uniform(-180, -177)])
+        elif kind == 2:
+            latitude, longitude = rng.uniform(87, 90), rng.uniform(-180, 180)
+        else:
+            latitude, longitude = rng.uniform(-90, -87), rng.uniform(-180, 180)
+        points.append((f'!{i:08x}', latitude, longitude))
+    return points
+
+
+def build(points, cell_degrees):
+    index = SpatialIndex(cell_degrees)
+    for node_id, latitude, longitude in points:
+        index.update(node_id, latitude, longitude)
+    return index
+
+
+def brute_bbox(points, south, west, north, east):
+    found = set()
+    for node_id, latitude, longitude in points:
+        if not south <= latitude <= north:
+            continue
+        if west <= east:
+            inside = west <= longitude <= east
+        else:
+            inside = longitude >= west or longitude <= east
+        if inside:
+            found.add(node_id)
+    return found
+
+
+def brute_distances(points, latitude, longitude):
+    return sorted((haversine(latitude, longitude, node_latitude, node_longitude), node_id)
+                  for node_id, node_latitude, node_longitude in points)
+
+
+QUERY_POINTS = [
+    (0.0, 179.9), (10.0, -179.95), (89.9, 45.0), (-89.99, -120.0),
+    (90.0, 0.0), (-90.0, 180.0), (45.5, -122.6), (0.0, 0.0)
+]
+
+
+@pytest.fixture(params=[0.5, 2.0, 10.0], ids=lambda degrees: f'{degrees}deg')
+def grid(request):
+    rng = random.Random(request.param)
+    points = random_points(rng, 600)
+    return points, build(points, request.param)
+
+
+def test_bbox_matches_brute_force(grid):
+    points, index = grid
+    boxes = [
+        (-10, 170, 10, -170),       # across the antimeridian
+        (-60, 179, 60, -179),
+        (85, -180, 90, 180),        # polar caps
+        (-90, -180, -88, 180),
+        (86, 100, 90, -100),        # polar and across the antimeridian
+        (-90, -180, 90, 180),       # whole world
+        (40, -125, 50, -120),
+        (0, 0, 0, 0)
+    ]
+    rng = random.Random(7)
+    for _ in range(40):
+        south, north = sorted(rng.uniform(-90, 90) for _ in range(2))
+        boxes.append((south, rng.uniform(-180, 180), north, rng.uniform(-180, 180)))
+
+    for box in boxes:
+        assert set(index.bbox(*box)) == brute_bbox(points, *box), box
+
+
+def test_radius_matches_brute_force(grid):
+    points, index = grid
+    for latitude, longitude in QUERY_POINTS:
+        distances = brute_distances(points, latitude, longitude)
+        for meters in (1e3, 50e3, 300e3, 2000e3):
+            expected = [entry for entry in distances if entry[0] <= meters]
+            assert index.radius(latitude, longitude, meters) == expected, (latitude, longitude, meters)
+
+
+def test_nearest_matches_brute_force(grid):
+    points, index = grid
+    for latitude, longitude in QUERY_POINTS:
+        distances = brute_distances(points, latitude, longitude)
+        for k in (1, 5, 40):
+            found = index.nearest(latitude, longitude, k)
+            assert [distance for distance, _ in found] == pytest.approx([d for d, _ in distances[:k]])
+
+
+def test_moving_a_node_leaves_its_old_cell():
+    index = SpatialIndex(0.05)
+    index.update('!a', 45.5, -122.6)
+    old_cell = index.cell(45.5, -122.6)
+    assert index.cells[old_cell] == {'!a': (45.5, -122.6)}
+
+    assert index.update('!a', 45.72, -122.92) == (45.5, -122.6)
+    assert old_cell not in index.cells
+    assert index.bbox(45.4, -122.7, 45.6, -122.5) == []
+    assert index.bbox(45.6, -123.0, 45.8, -122.8) == ['!a']
+    assert index.stats['cells'] == 1
+
+    # A move within the cell keeps one entry, with the new position
+    index.update('!b', 45.721, -122.921)
+    index.update('!a', 45.722, -122.922)
+    assert index.cells[index.cell(45.72, -122.92)] == {'!a': (45.722, -122.922), '!b': (45.721, -122.921)}
+
+    # Losing the position removes the node entirely
+    index.update('!a', None, None)
+    assert '!a' not in index.positions
+    assert index.bbox(-90, -180, 90, 180) == ['!b']
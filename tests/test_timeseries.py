@@ -0,0 +1,121 @@
+"""Metric history: ring wraparound, rollup buckets and eviction of idle or excess series"""
+
+import random
+
+import pytest
+
+from timeseries import MetricSeries, Ring, Rollup, TimeSeriesStore, downsample
+
+
+def test_ring_grows_then_overwrites_the_oldest():
+    ring = Ring(2, capacity=20)
+    assert ring.allocated == 8
+
+    for i in range(9):
+        ring.append((i, -i))
+    assert ring.allocated == 16
+    assert [tuple(row) for row in ring.rows()] == [(i, -i) for i in range(9)]
+
+    for i in range(9, 53):
+        ring.append((i, -i))
+    assert ring.full
+    assert len(ring) == 20
+    # Allocation stops at capacity
+    assert ring.allocated == 20
+    assert len(ring.data) == 20 * 2
+    assert [tuple(row) for row in ring.rows()] == [(i, -i) for i in range(33, 53)]
+    assert ring.first() == 33
+
+
+def test_rollup_buckets_match_the_samples():
+    rng = random.Random(3)
+    rollup = Rollup(60, capacity=100)
+    samples = [(1000 + i * 7, rng.uniform(-20, 10)) for i in range(200)]
+    for timestamp, value in samples:
+        rollup.add(timestamp, value)
+
+    expected = {}
+    for timestamp, value in samples:
+        expected.setdefault(timestamp - timestamp % 60, []).append(value)
+
+    points = rollup.points(0, 10 ** 9)
+    assert [point[0] for point in points] == sorted(expected)
+    for start, low, high, mean, count in points:
+        values = expected[start]
+        assert (low, high, count) == (min(values), max(values), len(values))
+        assert mean == pytest.approx(sum(values) / len(values))
+
+
+def test_late_sample_joins_the_open_bucket():
+    rollup = Rollup(60, capacity=10)
+    rollup.add(120, 1.0)
+    rollup.add(185, 3.0)
+    # Belongs to the closed 120 s bucket, but is not allowed to reopen it
+    rollup.add(170, 5.0)
+
+    assert rollup.points(0, 1000) == [[120, 1.0, 1.0, 1.0, 1], [180, 3.0, 5.0, 4.0, 2]]
+
+
+def test_rollup_keeps_only_its_capacity():
+    rollup = Rollup(60, capacity=5)
+    for minute in range(12):
+        rollup.add(minute * 60, float(minute))
+
+    # Five closed buckets plus the open one
+    points = rollup.points(0, 10 ** 9)
+    assert [point[0] for point in points] == [minute * 60 for minute in range(6, 12)]
+    assert not rollup.covers(0)
+    assert rollup.covers(6 * 60)
+
+
+def test_query_picks_the_finest_resolution_that_covers_the_range():
+    series = MetricSeries(raw_samples=10, resolutions=((60, 5), (600, 10)))
+    for i in range(30):
+        series.add(i * 30, float(i))
+
+    # Raw now holds only the last 10 samples (from 600 s on)
+    assert series.query(600, 900, 100)[0] == 'raw'
+    # 60 s rollups hold five closed buckets plus the open one (from 540 s on)
+    assert series.query(540, 900, 100)[0] == 60
+    assert series.query(0, 900, 100)[0] == 600
+
+    resolution, points = series.query(0, 900, 100)
+    assert sum(point[4] for point in points) == 30
+
+
+def test_downsample_keeps_counts_and_weighted_means():
+    points = [[i * 60, float(i), float(i) + 1, float(i) + 0.5, i + 1] for i in range(10)]
+    merged = downsample(points, 3)
+
+    assert len(merged) == 3
+    assert sum(point[4] for point in merged) == sum(point[4] for point in points)
+    first = points[:4]
+    assert merged[0][:3] == [0, 0.0, 4.0]
+    assert merged[0][3] == pytest.approx(sum(p[3] * p[4] for p in first) / sum(p[4] for p in first))
+
+
+def test_idle_series_are_evicted():
+    store = TimeSeriesStore(idle_seconds=100)
+    store.record('!a', 'snr', 1.0, timestamp=0)
+    store.record('!b', 'snr', 1.0, timestamp=50)
+    store.record('!c', 'snr', 1.0, timestamp=150)
+
+    assert list(store.series) == [('!b', 'snr'), ('!c', 'snr')]
+    assert store.stats['evicted'] == 1
+    assert store.stats['series'] == 2
+
+
+def test_excess_series_evict_the_least_recently_updated():
+    store = TimeSeriesStore(max_series=3)
+    for i, node in enumerate(['!a', '!b', '!c']):
+        store.record(node, 'snr', 1.0, timestamp=i)
+    # Touching !a makes !b the least recently updated
+    store.record('!a', 'snr', 2.0, timestamp=3)
+    store.record('!d', 'snr', 1.0, timestamp=4)
+    store.record('!e', 'rssi', -90, timestamp=5)
+
+    assert list(store.series) == [('!a', 'snr'), ('!d', 'snr'), ('!e', 'rssi')]
+    assert store.stats['evicted'] == 2
+    assert store.stats['series'] == 3
+    assert store.metrics('!a') == ['snr']
+    assert store.query('!b', since=0, until=10) == {}
@@ -0,0 +1,172 @@
+"""Airtime pacing: one duty-cycle-capped bucket shared by every priority class"""
+
+import asyncio
+import types
+
+import pytest
+
+import tx_scheduler
+from tx_scheduler import (
+    PRIORITY_BROADCAST, PRIORITY_BULK, PRIORITY_DISCOVERY, PRIORITY_DM,
+    TxScheduler, estimate_airtime
+)
+
+PING = estimate_airtime(0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A fake monotonic clock for the scheduler module only"""
+    clock = types.SimpleNamespace(now=0.0)
+    monkeypatch.setattr(tx_scheduler, 'time', types.SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def schedule(scheduler, clock, jobs, until, arrivals=()):
+    """
+    Feed jobs (priority, size, label) to the scheduler and run its pacing on
+    the fake clock until the given time. arrivals is a list of (time, job)
+    submitted later. Returns (time, label, airtime) for every job sent.
+    """
+    async def scenario():
+        scheduler.wakeup = asyncio.Event()
+        for priority, size, label in jobs:
+            scheduler.submit(priority, None, size, label)
+        pending = sorted(arrivals, key=lambda arrival: arrival[0])
+
+        sent = []
+        while clock.now < until:
+            while pending and pending[0][0] <= clock.now:
+                priority, size, label = pending.pop(0)[1]
+                scheduler.submit(priority, None, size, label)
+            job, airtime = scheduler.next_job()
+            if job is not None:
+                sent.append((clock.now, job.label, airtime))
+                continue
+            next_arrival = pending[0][0] if pending else until
+            # A wait can round to nothing in floating point; real sleeps always advance
+            step = max(airtime, 1e-6) if airtime is not None else until
+            clock.now = min(clock.now + step, next_arrival)
+        return sent
+
+    return asyncio.run(scenario())
+
+
+def flood(count=2000):
+    """Plenty of every class, most urgent first"""
+    return [
+        (priority, 20, name)
+        for priority, name in ((PRIORITY_DM, 'dm'), (PRIORITY_BROADCAST, 'broadcast'),
+                               (PRIORITY_DISCOVERY, 'discovery'), (PRIORITY_BULK, 'bulk'))
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize('region, tx_share, limit', [
+    ('US', 0.5, 0.5),
+    ('EU_868', 0.5, 0.1),
+    ('UA_868', 0.5, 0.01),
+    ('EU_868', 0.05, 0.05)
+])
+def test_total_airtime_stays_within_duty_cycle(clock, region, tx_share, limit):
+    scheduler = TxScheduler(region=region, tx_share=tx_share)
+    seconds = 3600
+    sent = schedule(scheduler, clock, flood(), seconds)
+
+    airtime = sum(airtime for *_, airtime in sent)
+    assert airtime <= limit * seconds + scheduler.burst_seconds + 1e-6
+    # ...and the allowed airtime is actually used
+    assert airtime >= limit * seconds - PING
+
+
+def test_classes_go_out_in_priority_order(clock):
+    scheduler = TxScheduler(region='US')
+    jobs = flood(20)
+    sent = schedule(scheduler, clock, jobs, 600)
+
+    assert [label for _, label, _ in sent] == [label for *_, label in jobs]
+
+
+def test_bulk_is_limited_to_its_share(clock):
+    scheduler = TxScheduler(region='US', tx_share=0.5, bulk_share=0.5)
+    seconds = 3600
+    sent = schedule(scheduler, clock, [(PRIORITY_BULK, 0, 'bulk')] * 10000, seconds)
+
+    airtime = sum(airtime for *_, airtime in sent)
+    assert 0.25 * seconds - PING <= airtime <= 0.25 * seconds + 0.5 * scheduler.burst_seconds
+
+
+def test_bulk_over_its_share_does_not_hold_back_others(clock):
+    scheduler = TxScheduler(region='US', tx_share=0.5, bulk_share=0.2)
+    # The bulk allowance (1 s) runs out long before the shared bucket (5 s)
+    sent = schedule(scheduler, clock, [(PRIORITY_BULK, 0, 'bulk')] * 100, 0.5,
+                    arrivals=[(0.1, (PRIORITY_DISCOVERY, 0, 'probe'))])
+
+    probe = [time for time, label, _ in sent if label == 'probe']
+    assert probe == [pytest.approx(0.1)]
+
+
+def test_message_waits_only_for_owed_airtime(clock):
+    scheduler = TxScheduler(region='US', tx_share=0.5)
+    message = (PRIORITY_DM, 100, 'dm')
+    sent = schedule(scheduler, clock, [(PRIORITY_DISCOVERY, 0, 'probe')] * 500, 120,
+                    arrivals=[(60.0, message)])
+
+    [(time, _, airtime)] = [entry for entry in sent if entry[1] == 'dm']
+    # The bucket is empty while probes are queued, so the message waits
+    # for its own airtime to accrue, but not behind the remaining probes
+    assert 60.0 <= time <= 60.0 + airtime / 0.5 + 1e-6
+    assert any(label == 'probe' for when, label, _ in sent if when > time)
+
+
+def test_messages_are_paced_too(clock):
+    scheduler = TxScheduler(region='US', tx_share=0.5)
+    seconds = 600
+    sent = schedule(scheduler, clock, [(PRIORITY_DM, 100, 'dm')] * 5000, seconds)
+
+    assert sum(airtime for *_, airtime in sent) <= 0.5 * seconds + scheduler.burst_seconds
+
+
+def test_busy_channel_slows_the_shared_bucket(clock):
+    scheduler = TxScheduler(region='US', tx_share=0.5)
+    idle = scheduler.rate
+    for _ in range(30):
+        scheduler.report_utilization(channel_utilization=70.0)
+
+    assert scheduler.rate < idle
+    seconds = 600
+    sent = schedule(scheduler, clock, [(PRIORITY_DM, 20, 'dm')] * 5000, seconds)
+    assert sum(airtime for *_, airtime in sent) <= scheduler.rate * seconds + scheduler.burst_seconds
+
+
+def test_status_reports_depth_and_drain(clock):
+    scheduler = TxScheduler(region='EU_868')
+
+    async def scenario():
+        scheduler.wakeup = asyncio.Event()
+        for _ in range(10):
+            scheduler.submit(PRIORITY_BULK, None, 0, 'ping')
+        scheduler.submit(PRIORITY_DM, None, 50, 'dm')
+        return scheduler.status()
+
+    status = asyncio.run(scenario())
+    assert status['queue_depth'] == 11
+    assert status['by_priority'] == {'dm': 1, 'broadcast': 0, 'discovery': 0, 'bulk': 10}
+    assert status['airtime_rate'] == 0.1
+    # Bulk pings drain at half the bucket's rate
+    assert status['expected_drain_seconds'] == pytest.approx((10 * PING / 0.5 - 5.0) / 0.1, abs=0.1)
+
+
+def test_discovery_leaves_room_for_bulk_pings(clock):
+    scheduler = TxScheduler(region='US', tx_share=0.5, discovery_share=0.8, bulk_share=0.5)
+    seconds = 3600
+    jobs = [(PRIORITY_DISCOVERY, 0, 'probe')] * 10000 + [(PRIORITY_BULK, 0, 'ping')] * 10000
+    sent = schedule(scheduler, clock, jobs, seconds)
+
+    probes = sum(airtime for _, label, airtime in sent if label == 'probe')
+    pings = sum(airtime for _, label, airtime in sent if label == 'ping')
+    assert probes <= 0.4 * seconds + 0.8 * scheduler.burst_seconds
+    assert probes >= 0.4 * seconds - PING
+    # Bulk pings get what discovery leaves, and the total stays capped
+    assert pings >= 0.1 * seconds - 2 * PING
+    assert probes + pings <= 0.5 * seconds + scheduler.burst_seconds
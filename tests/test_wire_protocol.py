@@ -0,0 +1,123 @@
+"""Encoding negotiation: ?encoding= and subprotocols pick the frames a client gets"""
+
+import asyncio
+import json
+
+import pytest
+
+# The server needs the packages in tests/requirements.txt
+pytest.importorskip('meshtastic_server')
+
+import wire_protocol
+from conftest import make_node
+
+TYPE_NAMES = {tag: name for name, tag in wire_protocol.TYPE_TAGS.items()}
+
+
+def unpack(payload):
+    """Decode a server msgpack frame back to field and type names"""
+    msgpack = pytest.importorskip('msgpack')
+    frame = wire_protocol.expand(msgpack.unpackb(payload, raw=False, strict_map_key=False))
+    frame['type'] = TYPE_NAMES.get(frame['type'], frame['type'])
+    return frame
+
+
+def test_query_selects_encoding():
+    assert wire_protocol.negotiate_encoding(None, '/') == 'json'
+    assert wire_protocol.negotiate_encoding(None, '/?encoding=json') == 'json'
+    assert wire_protocol.negotiate_encoding(None, '/?encoding=cbor') == 'json'
+
+
+def test_msgpack_query_and_subprotocol():
+    pytest.importorskip('msgpack')
+    assert wire_protocol.negotiate_encoding(None, '/?encoding=msgpack') == 'msgpack'
+    assert wire_protocol.negotiate_encoding('meshtastic.msgpack', '/') == 'msgpack'
+    # A subprotocol is an explicit agreement and wins over the query
+    assert wire_protocol.negotiate_encoding('meshtastic.json', '/?encoding=msgpack') == 'json'
+
+
+def test_json_client_gets_text_frames(server, client):
+    server.nodes['!00000001'] = make_node(1)
+
+    async def scenario():
+        connection = await client('/').open()
+        sent = await connection.frames(1)
+        await connection.close()
+        return sent
+
+    sent = asyncio.run(scenario())
+    assert isinstance(sent[0], str)
+    init = json.loads(sent[0])
+    assert init['type'] == 'init'
+    assert [node['id'] for node in init['nodes']] == ['!00000001']
+
+
+def test_msgpack_client_gets_msgpack_frames(server, client):
+    pytest.importorskip('msgpack')
+    server.nodes['!00000001'] = make_node(1)
+
+    async def scenario():
+        connection = await client('/?encoding=msgpack').open()
+        await connection.frames(2)
+        server.queue_node_update('!00000001')
+        await server.flush_pending()
+        sent = await connection.frames(3)
+        await connection.close()
+        return sent
+
+    sent = asyncio.run(scenario())
+
+    # The tag tables come first as JSON text so the client can decode the rest
+    protocol = json.loads(sent[0])
+    assert protocol['type'] == 'protocol'
+    assert protocol['encoding'] == 'msgpack'
+
+    assert all(isinstance(payload, bytes) for payload in sent[1:])
+    init = unpack(sent[1])
+    update = unpack(sent[2])
+    assert init['type'] == 'init'
+    assert update['type'] == 'batch_update'
+    assert update['seq'] == init['seq'] + 1
+    assert [node['id'] for node in update['nodes']] == ['!00000001']
+
+
+def test_msgpack_commands_are_decoded(server, client):
+    msgpack = pytest.importorskip('msgpack')
+
+    async def scenario():
+        connection = await client('/?encoding=msgpack').open()
+        await connection.frames(2)
+        await connection.command(msgpack.packb({'command': 'client_stats'}))
+        sent = await connection.frames(3)
+        await connection.close()
+        return sent
+
+    sent = asyncio.run(scenario())
+    reply = unpack(sent[2])
+    assert reply['type'] == 'client_stats'
+    assert reply['clients'][0]['encoding'] == 'msgpack'
+
+
+@pytest.mark.parametrize('encoding', wire_protocol.ENCODINGS)
+def test_cached_fragments_encode_like_a_full_frame(encoding):
+    fragments = wire_protocol.FragmentCache()
+    frame = {'type': 'batch_update', 'seq': 3, 'nodes': [make_node(i) for i in range(5)], 'messages': []}
+
+    # Second encode is served from the cache
+    wire_protocol.encode(frame, encoding, fragments)
+    cached = wire_protocol.encode(frame, encoding, fragments)
+    assert fragments.stats['hits'] >= 5
+
+    plain = wire_protocol.encode(frame, encoding)
+    if encoding == 'msgpack':
+        assert unpack(cached) == unpack(plain)
+    else:
+        assert json.loads(cached) == json.loads(plain)
+
+
+def test_msgpack_frames_are_smaller():
+    pytest.importorskip('msgpack')
+    frame = {'type': 'init', 'nodes': [make_node(i) for i in range(50)], 'messages': []}
+    packed = wire_protocol.encode(frame, 'msgpack')
+    text = wire_protocol.encode(frame, 'json')
+    assert len(packed) < 0.7 * len(text.encode('utf-8'))
@@ -0,0 +1,252 @@
+"""
+Time Series Store for Meshtastic Command Center
+Bounded per-node, per-metric history: recent raw samples plus 1 min, 15 min
+and 1 h rollups (min, max, mean, count) that charts can query downsampled
+"""
+
+import math
+import time
+from array import array
+from collections import OrderedDict
+
+# Metrics the server records as they arrive
+METRICS = ('snr', 'rssi', 'battery', 'voltage', 'channel_utilization', 'air_util_tx')
+
+# Raw samples kept per series
+RAW_SAMPLES = 256
+
+# (bucket seconds, buckets kept): 6 hours of minutes, 4 days of quarter
+# hours and 30 days of hours
+RESOLUTIONS = ((60, 360), (900, 384), (3600, 720))
+
+# Series are dropped once their newest sample is older than the longest
+# rollup keeps, and the least recently updated go first past MAX_SERIES, so
+# transient or spoofed node ids cannot grow the store without bound
+IDLE_SECONDS = max(seconds * capacity for seconds, capacity in RESOLUTIONS)
+MAX_SERIES = 20000
+
+
+class Ring:
+    """
+    Fixed-width rows of floats in one flat array('d'); grows by doubling
+    up to capacity, then overwrites the oldest row
+    """
+
+    def __init__(self, width, capacity, initial=8):
+        self.width = width
+        self.capacity = capacity
+        self.allocated = min(initial, capacity)
+        self.data = array('d', bytes(8 * width * self.allocated))
+        self.head = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def append(self, row):
+        """Add a row, evicting the oldest when full"""
+        if self.size < self.capacity:
+            if self.size == self.allocated:
+                self.grow()
+            index = self.size
+            self.size += 1
+        else:
+            index = self.head
+            self.head = (self.head + 1) % self.capacity
+
+        offset = index * self.width
+        for column, value in enumerate(row):
+            self.data[offset + column] = value
+
+    def grow(self):
+        """Double the allocation, never beyond capacity"""
+        rows = min(self.allocated * 2, self.capacity)
+        self.data.frombytes(bytes(8 * self.width * (rows - self.allocated)))
+        self.allocated = rows
+
+    @property
+    def full(self):
+        return self.size == self.capacity
+
+    def first(self, column=0):
+        """A column of the oldest row"""
+        return self.data[self.head * self.width + column]
+
+    def rows(self):
+        """All rows, oldest first"""
+        width = self.width
+        data = self.data
+        for i in range(self.size):
+            offset = ((self.head + i) % self.allocated) * width
+            yield data[offset:offset + width]
+
+
+class Rollup:
+    """Fixed-length time buckets of min, max, sum and count"""
+
+    def __init__(self, seconds, capacity):
+        self.seconds = seconds
+        self.buckets = Ring(5, capacity)  # start, min, max, sum, count
+        self.current = None
+
+    def add(self, timestamp, value):
+        """Fold a sample into its bucket, closing the previous bucket if needed"""
+        start = timestamp - timestamp % self.seconds
+        current = self.current
+
+        # Late samples are folded into the open bucket rather than reopening
+        # one that has already been closed
+        if current is None or start > current[0]:
+            if current is not None:
+                self.buckets.append(current)
+            self.current = [start, value, value, value, 1]
+            return
+
+        if value < current[1]:
+            current[1] = value
+        if value > current[2]:
+            current[2] = value
+        current[3] += value
+        current[4] += 1
+
+    def covers(self, since):
+        """True when no bucket at or after since has been evicted yet"""
+        return not self.buckets.full or self.buckets.first() <= since
+
+    def points(self, since, until):
+        """[start, min, max, mean, count] for buckets overlapping [since, until)"""
+        rows = list(self.buckets.rows())
+        if self.current:
+            rows.append(self.current)
+        return [
+            [row[0], row[1], row[2], row[3] / row[4], int(row[4])]
+            for row in rows
+            if row[0] + self.seconds > since and row[0] < until
+        ]
+
+
+class MetricSeries:
+    """Raw samples and rollups for one metric of one node"""
+
+    def __init__(self, raw_samples=RAW_SAMPLES, resolutions=RESOLUTIONS):
+        self.raw = Ring(2, raw_samples)
+        self.rollups = [Rollup(seconds, capacity) for seconds, capacity in resolutions]
+        self.last = 0.0
+
+    def add(self, timestamp, value):
+        """Record one sample"""
+        self.last = max(self.last, timestamp)
+        self.raw.append((timestamp, value))
+        for rollup in self.rollups:
+            rollup.add(timestamp, value)
+
+    def query(self, since, until, max_points):
+        """
+        Points from the finest resolution that still holds everything since
+        since, merged further if there are more than max_points of them
+        """
+        raw = self.raw
+        if not raw.full or raw.first() <= since:
+            resolution = 'raw'
+            points = [
+                [timestamp, value, value, value, 1]
+                for timestamp, value in raw.rows()
+                if since <= timestamp < until
+            ]
+        else:
+            rollup = next(
+                (candidate for candidate in self.rollups if candidate.covers(since)),
+                self.rollups[-1]
+            )
+            resolution = rollup.seconds
+            points = rollup.points(since, until)
+
+        return resolution, downsample(points, max_points)
+
+
+def downsample(points, max_points):
+    """Merge runs of consecutive [start, min, max, mean, count] points"""
+    if len(points) <= max_points:
+        return points
+
+    size = math.ceil(len(points) / max_points)
+    merged = []
+    for i in range(0, len(points), size):
+        group = points[i:i + size]
+        count = sum(point[4] for point in group)
+        merged.append([
+            group[0][0],
+            min(point[1] for point in group),
+            max(point[2] for point in group),
+            sum(point[3] * point[4] for point in group) / count,
+            count
+        ])
+    return merged
+
+
+class TimeSeriesStore:
+    """Bounded history of every metric of every node"""
+
+    def __init__(self, raw_samples=RAW_SAMPLES, resolutions=RESOLUTIONS,
+                 max_series=MAX_SERIES, idle_seconds=IDLE_SECONDS):
+        self.raw_samples = raw_samples
+        self.resolutions = resolutions
+        self.max_series = max_series
+        self.idle_seconds = idle_seconds
+
+        # Least recently updated first
+        self.series = OrderedDict()
+        self.stats = {
+            'series': 0,
+            'samples': 0,
+            'evicted': 0
+        }
+
+    def record(self, node_id, metric, value, timestamp=None):
+        """Add one sample; None values are ignored"""
+        if value is None:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        key = (node_id, metric)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = MetricSeries(self.raw_samples, self.resolutions)
+        else:
+            self.series.move_to_end(key)
+        series.add(timestamp, float(value))
+        self.stats['samples'] += 1
+        self.evict(timestamp)
+
+    def evict(self, now):
+        """Drop idle series, then the least recently updated beyond max_series"""
+        cutoff = now - self.idle_seconds
+        series = self.series
+        while series:
+            key, oldest = next(iter(series.items()))
+            if oldest.last >= cutoff and len(series) <= self.max_series:
+                break
+            del series[key]
+            self.stats['evicted'] += 1
+        self.stats['series'] = len(series)
+
+    def metrics(self, node_id):
+        """Metrics recorded for a node"""
+        return [metric for metric in METRICS if (node_id, metric) in self.series]
+
+    def query(self, node_id, metrics=None, since=None, until=None, max_points=200):
+        """Downsampled series per metric for one node and time range (epoch seconds)"""
+        now = time.time()
+        until = now if until is None else until
+        since = until - 3600 if since is None else since
+
+        result = {}
+        for metric in metrics or self.metrics(node_id):
+            series = self.series.get((node_id, metric))
+            if series is None:
+                continue
+            resolution, points = series.query(since, until, max_points)
+            result[metric] = {
+                'resolution': resolution,
+                'points': points
+            }
+        return result
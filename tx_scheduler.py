@@ -0,0 +1,314 @@
+"""
+Transmit Scheduler for Meshtastic Command Center
+Single priority queue for all outbound radio traffic, paced by a token
+bucket of LoRa airtime and backed off when the channel gets busy
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, most urgent first
+PRIORITY_DM = 0
+PRIORITY_BROADCAST = 1
+PRIORITY_DISCOVERY = 2
+PRIORITY_BULK = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_DM: 'dm',
+    PRIORITY_BROADCAST: 'broadcast',
+    PRIORITY_DISCOVERY: 'discovery',
+    PRIORITY_BULK: 'bulk'
+}
+
+
+# Meshtastic modem presets: (spreading factor, bandwidth Hz, coding rate 4/x)
+MODEM_PRESETS = {
+    'SHORT_TURBO': (7, 500000, 5),
+    'SHORT_FAST': (7, 250000, 5),
+    'SHORT_SLOW': (8, 250000, 5),
+    'MEDIUM_FAST': (9, 250000, 5),
+    'MEDIUM_SLOW': (10, 250000, 5),
+    'LONG_FAST': (11, 250000, 5),
+    'LONG_MODERATE': (11, 125000, 8),
+    'LONG_SLOW': (12, 125000, 8),
+    'VERY_LONG_SLOW': (12, 62500, 8)
+}
+
+# Regulatory duty cycle per region (fraction of time we may transmit)
+REGION_DUTY_CYCLE = {
+    'US': 1.0,
+    'EU_433': 0.1,
+    'EU_868': 0.1,
+    'UA_433': 0.1,
+    'UA_868': 0.01,
+    'CN': 1.0,
+    'JP': 1.0,
+    'ANZ': 1.0,
+    'KR': 1.0,
+    'TW': 1.0,
+    'RU': 1.0,
+    'IN': 1.0,
+    'NZ_865': 1.0,
+    'TH': 1.0,
+    'MY_433': 1.0,
+    'MY_919': 1.0,
+    'SG_923': 1.0,
+    'LORA_24': 1.0
+}
+
+PREAMBLE_SYMBOLS = 16
+PACKET_OVERHEAD_BYTES = 32  # Meshtastic header plus protobuf framing
+
+
+def estimate_airtime(payload_bytes, preset='LONG_FAST'):
+    """Seconds on air for one packet, using the Semtech SX127x/SX126x formula"""
+    spreading_factor, bandwidth, coding_rate = MODEM_PRESETS[preset]
+    symbol_time = (2 ** spreading_factor) / bandwidth
+    low_data_rate = 1 if symbol_time > 0.016 else 0
+
+    length = payload_bytes + PACKET_OVERHEAD_BYTES
+    numerator = 8 * length - 4 * spreading_factor + 28 + 16
+    denominator = 4 * (spreading_factor - 2 * low_data_rate)
+    payload_symbols = 8 + max(math.ceil(numerator / denominator) * coding_rate, 0)
+
+    return (PREAMBLE_SYMBOLS + 4.25 + payload_symbols) * symbol_time
+
+
+class TxJob:
+    """One queued transmission"""
+
+    def __init__(self, priority, send, size, label, future):
+        self.priority = priority
+        self.send = send
+        self.size = size
+        self.label = label
+        self.future = future
+        self.queued_at = time.monotonic()
+
+
+class TxScheduler:
+    """
+    Priority transmit queue paced by one airtime token bucket for the whole
+    gateway, filled at tx_share capped by the region's duty cycle. Discovery
+    probes and bulk pings are limited to a share of that bucket's rate
+    (discovery_share, bulk_share); direct messages and broadcasts may use
+    all of it and always go first.
+    """
+
+    def __init__(self, region='US', modem_preset='LONG_FAST', tx_share=0.5,
+                 discovery_share=0.8, bulk_share=0.5, burst_seconds=5.0,
+                 busy_threshold=25.0, on_change=None):
+        self.region = region
+        self.modem_preset = modem_preset
+        self.tx_share = tx_share
+        self.shares = {
+            PRIORITY_DM: 1.0,
+            PRIORITY_BROADCAST: 1.0,
+            PRIORITY_DISCOVERY: discovery_share,
+            PRIORITY_BULK: bulk_share
+        }
+        self.burst_seconds = burst_seconds
+        self.busy_threshold = busy_threshold
+        self.on_change = on_change
+
+        # FIFO per priority class, most urgent first
+        self.queues = {priority: deque() for priority in sorted(PRIORITY_NAMES)}
+        self.wakeup = None
+        self.task = None
+
+        # Token bucket of airtime seconds shared by all traffic, plus each
+        # class's allowance within it (share of the rate and of the burst)
+        now = time.monotonic()
+        self.tokens = burst_seconds
+        self.allowance = {priority: burst_seconds * share for priority, share in self.shares.items()}
+        self.refilled_at = now
+
+        # Smoothed channel load reported by node telemetry (percent)
+        self.channel_utilization = 0.0
+        self.air_util_tx = 0.0
+
+        self.stats = {
+            'sent': 0,
+            'failed': 0,
+            'airtime_seconds': 0.0
+        }
+
+    @property
+    def base_rate(self):
+        """Airtime seconds we may use per second before backoff"""
+        return min(self.tx_share, REGION_DUTY_CYCLE.get(self.region, 1.0))
+
+    @property
+    def rate(self):
+        """Current airtime rate after backing off for a busy channel"""
+        rate = self.base_rate
+        if self.channel_utilization > self.busy_threshold:
+            overload = (self.channel_utilization - self.busy_threshold) / (100 - self.busy_threshold)
+            rate *= max(0.1, 1 - 2 * overload)
+        duty_cycle = REGION_DUTY_CYCLE.get(self.region, 1.0)
+        if self.air_util_tx / 100 > duty_cycle * 0.9:
+            rate *= 0.25
+        return rate
+
+    def start(self):
+        """Start the transmit loop"""
+        self.wakeup = asyncio.Event()
+        self.task = asyncio.create_task(self.run())
+
+    @property
+    def queue_depth(self):
+        """Jobs waiting for airtime"""
+        return sum(len(queue) for queue in self.queues.values())
+
+    def stop(self):
+        """Stop the loop and fail anything still queued"""
+        if self.task:
+            self.task.cancel()
+        for queue in self.queues.values():
+            for job in queue:
+                if not job.future.done():
+                    job.future.cancel()
+            queue.clear()
+
+    def configure(self, region=None, modem_preset=None):
+        """Change region or modem preset (e.g. after connect_device)"""
+        if region:
+            self.region = region
+        if modem_preset and modem_preset in MODEM_PRESETS:
+            self.modem_preset = modem_preset
+        self.changed()
+
+    def report_utilization(self, channel_utilization=None, air_util_tx=None):
+        """Feed channel load from telemetry into the backoff estimate"""
+        if channel_utilization is not None:
+            self.channel_utilization += 0.3 * (channel_utilization - self.channel_utilization)
+        if air_util_tx is not None:
+            self.air_util_tx += 0.3 * (air_util_tx - self.air_util_tx)
+
+    def submit(self, priority, send, size, label=''):
+        """Queue a transmission and return a future for its result"""
+        future = asyncio.get_running_loop().create_future()
+        job = TxJob(priority, send, size, label, future)
+        self.queues[priority].append(job)
+        self.wakeup.set()
+        self.changed()
+        return future
+
+    def refill(self):
+        """Add airtime to the shared bucket and every class allowance for the time elapsed"""
+        now = time.monotonic()
+        earned = (now - self.refilled_at) * self.rate
+        self.refilled_at = now
+        self.tokens = min(self.burst_seconds, self.tokens + earned)
+        for priority, share in self.shares.items():
+            self.allowance[priority] = min(
+                self.burst_seconds * share,
+                self.allowance[priority] + earned * share
+            )
+
+    def next_job(self):
+        """
+        Take the most urgent job that may go out now and charge its airtime:
+        (job, airtime), or (None, seconds until one might)
+
+        A class that has used up its allowance is skipped, so it does not
+        hold back the classes queued behind it. A class that only lacks
+        shared tokens stops the search: the tokens it is waiting for are
+        not handed to less urgent traffic.
+        """
+        self.refill()
+        rate = self.rate
+        wait = None
+        for priority, queue in self.queues.items():
+            while queue and queue[0].future.cancelled():
+                queue.popleft()
+                self.changed()
+            if not queue:
+                continue
+
+            # Packets longer than the bucket may go out once it is full
+            airtime = estimate_airtime(queue[0].size, self.modem_preset)
+            share = self.shares[priority]
+            needed = min(airtime, self.burst_seconds * share)
+            if self.allowance[priority] < needed:
+                seconds = (needed - self.allowance[priority]) / (rate * share)
+                wait = seconds if wait is None else min(wait, seconds)
+                continue
+
+            needed = min(airtime, self.burst_seconds)
+            if self.tokens < needed:
+                seconds = (needed - self.tokens) / rate
+                return None, seconds if wait is None else min(wait, seconds)
+
+            self.tokens -= airtime
+            self.allowance[priority] -= airtime
+            return queue.popleft(), airtime
+        return None, wait
+
+    async def run(self):
+        """Send queued jobs in priority order as airtime allows"""
+        while True:
+            job, airtime = self.next_job()
+            if job is None:
+                # Sleep until enough airtime accrues (or forever when idle),
+                # but wake early if a new job arrives
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), airtime)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            try:
+                result = job.send()
+                if asyncio.iscoroutine(result) or isinstance(result, asyncio.Future):
+                    result = await result
+                self.stats['sent'] += 1
+                self.stats['airtime_seconds'] += airtime
+                if not job.future.done():
+                    job.future.set_result(result)
+            except Exception as e:
+                self.stats['failed'] += 1
+                logger.error(f"Transmit failed ({job.label}): {e}")
+                if not job.future.done():
+                    job.future.set_exception(e)
+
+            self.changed()
+
+    def changed(self):
+        """Notify the owner that queue status changed"""
+        if self.on_change:
+            self.on_change()
+
+    def status(self):
+        """Queue depth per priority and expected time to drain at the current rate"""
+        by_priority = {}
+        total = 0.0
+        slowest = 0.0
+        rate = self.rate
+        for priority, queue in self.queues.items():
+            by_priority[PRIORITY_NAMES[priority]] = len(queue)
+            airtime = sum(estimate_airtime(job.size, self.modem_preset) for job in queue)
+            total += airtime
+            # A class limited to a share of the bucket drains no faster than that share
+            slowest = max(slowest, airtime / self.shares[priority])
+        drain = max(max(total, slowest) - self.tokens, 0.0) / rate
+
+        return {
+            'queue_depth': self.queue_depth,
+            'by_priority': by_priority,
+            'expected_drain_seconds': round(drain, 1),
+            'airtime_rate': round(rate, 4),
+            'shares': {PRIORITY_NAMES[priority]: share for priority, share in self.shares.items()},
+            'region': self.region,
+            'modem_preset': self.modem_preset,
+            'channel_utilization': round(self.channel_utilization, 1),
+            'sent': self.stats['sent'],
+            'failed': self.stats['failed'],
+            'airtime_seconds': round(self.stats['airtime_seconds'], 1)
+        }
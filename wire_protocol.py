@@ -0,0 +1,291 @@
+"""
+Wire Protocol for Meshtastic Command Center
+Frame encodings negotiated per WebSocket connection: JSON (default) or
+compact MessagePack with integer field tags and epoch timestamps, plus a
+cache of encoded node fragments reused across frames
+"""
+
+import json
+from datetime import datetime
+from urllib.parse import parse_qs, urlparse
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ENCODINGS = ('json', 'msgpack') if msgpack else ('json',)
+JSON_ENCODERS = ('json', 'orjson') if orjson else ('json',)
+
+# WebSocket subprotocols a client can offer to pick an encoding
+SUBPROTOCOLS = {
+    'meshtastic.msgpack': 'msgpack',
+    'meshtastic.json': 'json'
+}
+
+# Integer tags for the keys repeated in every frame. Keys not listed here
+# are sent as strings, so the table can grow without breaking old clients.
+FIELD_TAGS = {
+    'type': 0,
+    'node': 1,
+    'nodes': 2,
+    'messages': 3,
+    'stats': 4,
+    'timestamp': 5,
+    'id': 6,
+    'name': 7,
+    'short_name': 8,
+    'hw_model': 9,
+    'first_seen': 10,
+    'last_seen': 11,
+    'packets': 12,
+    'snr': 13,
+    'rssi': 14,
+    'hops': 15,
+    'position': 16,
+    'latitude': 17,
+    'longitude': 18,
+    'altitude': 19,
+    'battery': 20,
+    'voltage': 21,
+    'channel_utilization': 22,
+    'air_util_tx': 23,
+    'from': 24,
+    'from_id': 25,
+    'text': 26,
+    'total_messages': 27,
+    'total_nodes': 28,
+    'start_time': 29,
+    'export_id': 30,
+    'index': 31,
+    'data': 32,
+    'seq': 33,
+    'instance': 34,
+    'from_seq': 35,
+    'radios': 36,
+    'best_radio': 37
+}
+
+TYPE_TAGS = {
+    'init': 0,
+    'batch_update': 1,
+    'node_update': 2,
+    'stats_update': 3,
+    'message': 4,
+    'system_message': 5,
+    'history': 6,
+    'export_start': 7,
+    'export_chunk': 8,
+    'export_end': 9,
+    'resume': 10
+}
+
+TIMESTAMP_FIELDS = {'timestamp', 'first_seen', 'last_seen', 'start_time'}
+
+FIELD_NAMES = {tag: name for name, tag in FIELD_TAGS.items()}
+
+
+def to_plain(value):
+    """JSON fallback for objects with a to_dict() method, such as node records"""
+    to_dict = getattr(value, 'to_dict', None)
+    if to_dict is None:
+        raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+    return to_dict()
+
+
+def stdlib_dumps(data):
+    """Compact JSON text with the standard library encoder"""
+    return json.dumps(data, separators=(',', ':'), default=to_plain)
+
+
+def orjson_dumps(data):
+    """Compact JSON text with orjson"""
+    return orjson.dumps(data, default=to_plain, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+
+dumps = orjson_dumps if orjson else stdlib_dumps
+
+
+def set_json_encoder(name):
+    """Switch the JSON encoder used for every frame ('json' or 'orjson')"""
+    global dumps
+    if name not in JSON_ENCODERS:
+        raise ValueError(f"JSON encoder not available: {name}")
+    dumps = orjson_dumps if name == 'orjson' else stdlib_dumps
+
+
+def json_encoder():
+    """Name of the JSON encoder in use"""
+    return 'orjson' if dumps is orjson_dumps else 'json'
+
+
+def available_subprotocols():
+    """Subprotocols the server can actually honour with the installed packages"""
+    return [name for name, encoding in SUBPROTOCOLS.items() if encoding in ENCODINGS]
+
+
+def negotiate_encoding(subprotocol=None, path=None):
+    """Pick a connection's encoding from its subprotocol or ?encoding= query"""
+    requested = SUBPROTOCOLS.get(subprotocol)
+
+    if requested is None and path:
+        values = parse_qs(urlparse(path).query).get('encoding')
+        if values:
+            requested = values[0]
+
+    return requested if requested in ENCODINGS else 'json'
+
+
+def describe(encoding):
+    """Frame sent (as JSON text) to non-JSON clients so they can decode the rest"""
+    return {
+        'type': 'protocol',
+        'encoding': encoding,
+        'fields': FIELD_TAGS,
+        'types': TYPE_TAGS,
+        'timestamps': 'epoch_seconds'
+    }
+
+
+def encode(data, encoding='json', fragments=None):
+    """Serialize a frame for the wire, splicing in cached node fragments if given"""
+    if fragments is not None and node_key(data):
+        return fragments.encode_frame(data, encoding)
+    if encoding == 'msgpack':
+        return msgpack.packb(compact(data), use_bin_type=True)
+    return dumps(data)
+
+
+def decode(message):
+    """Parse a client command from a text (JSON) or binary (MessagePack) frame"""
+    if isinstance(message, (bytes, bytearray)):
+        if not msgpack:
+            raise ValueError("Binary frame received but msgpack is not installed")
+        return expand(msgpack.unpackb(message, raw=False, strict_map_key=False))
+    return json.loads(message)
+
+
+def compact(value):
+    """Replace known keys with integer tags and ISO timestamps with epoch seconds"""
+    if isinstance(value, dict):
+        result = {}
+        for key, item in value.items():
+            if key in TIMESTAMP_FIELDS and isinstance(item, str):
+                item = iso_to_epoch(item)
+            elif key == 'type':
+                item = TYPE_TAGS.get(item, item)
+            else:
+                item = compact(item)
+            result[FIELD_TAGS.get(key, key)] = item
+        return result
+    if isinstance(value, (list, tuple)):
+        return [compact(item) for item in value]
+    if hasattr(value, 'to_dict'):
+        # Records already hold epoch times, so skip the ISO round trip
+        return compact(value.to_dict(epoch=True))
+    return value
+
+
+def expand(value):
+    """Inverse of compact for the key tags (used for binary client commands)"""
+    if isinstance(value, dict):
+        return {FIELD_NAMES.get(key, key): expand(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [expand(item) for item in value]
+    return value
+
+
+def iso_to_epoch(value):
+    """Convert an ISO timestamp to epoch seconds, leaving anything else alone"""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        return value
+
+
+def node_key(data):
+    """'nodes' or 'node' when a frame carries nodes, else None"""
+    if isinstance(data.get('nodes'), list):
+        return 'nodes'
+    if data.get('node') is not None and not isinstance(data['node'], (str, int, float)):
+        return 'node'
+    return None
+
+
+def map_body(data):
+    """MessagePack bytes of a compacted dict's entries, without the map header"""
+    packed = msgpack.packb(compact(data), use_bin_type=True)
+    return packed[len(msgpack.Packer().pack_map_header(len(data))):]
+
+
+class FragmentCache:
+    """
+    Encoded form of each node, per encoding, reused across snapshot, batch
+    and export frames until the owner reports the node changed
+    """
+
+    def __init__(self):
+        # node id -> {encoding: fragment}
+        self.entries = {}
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'invalidations': 0
+        }
+
+    def invalidate(self, node_id):
+        """Forget a node's fragments after any of its fields changed"""
+        if self.entries.pop(node_id, None) is not None:
+            self.stats['invalidations'] += 1
+
+    def fragment(self, node, encoding='json'):
+        """Encoded node (dict or record): a JSON object string or MessagePack map bytes"""
+        node_id = node['id'] if isinstance(node, dict) else node.id
+        entry = self.entries.get(node_id)
+        if entry is None:
+            entry = self.entries[node_id] = {}
+
+        cached = entry.get(encoding)
+        if cached is None:
+            self.stats['misses'] += 1
+            if encoding == 'msgpack':
+                cached = msgpack.packb(compact(node), use_bin_type=True)
+            else:
+                cached = dumps(node)
+            entry[encoding] = cached
+        else:
+            self.stats['hits'] += 1
+        return cached
+
+    def encode_frame(self, data, encoding='json'):
+        """Encode a frame whose 'nodes' list or 'node' entry is built from fragments"""
+        key = node_key(data)
+        rest = {name: value for name, value in data.items() if name != key}
+
+        if key == 'nodes':
+            parts = [self.fragment(node, encoding) for node in data['nodes']]
+        else:
+            part = self.fragment(data['node'], encoding)
+
+        if encoding == 'msgpack':
+            packer = msgpack.Packer(use_bin_type=True)
+            if key == 'nodes':
+                value = packer.pack_array_header(len(parts)) + b''.join(parts)
+            else:
+                value = part
+            return (
+                packer.pack_map_header(len(rest) + 1)
+                + map_body(rest)
+                + packer.pack(FIELD_TAGS[key])
+                + value
+            )
+
+        value = '[' + ','.join(parts) + ']' if key == 'nodes' else part
+        head = dumps(rest)
+        separator = ',' if rest else ''
+        return f'{head[:-1]}{separator}"{key}":{value}}}'